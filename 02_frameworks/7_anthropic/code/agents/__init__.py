@@ -1,6 +1,16 @@
 """Core agent implementations."""
 
-from .agent import Agent, ModelConfig
+from .agent import Agent, ModelConfig, StreamEvent
+from .runtime import AdmissionError, AgentDefinition, AgentRuntime, Session
 from .tools.base import Tool
 
-__all__ = ["Agent", "ModelConfig", "Tool"]
+__all__ = [
+    "AdmissionError",
+    "Agent",
+    "AgentDefinition",
+    "AgentRuntime",
+    "ModelConfig",
+    "Session",
+    "StreamEvent",
+    "Tool",
+]
@@ -2,16 +2,24 @@
 
 import asyncio
 import os
-from contextlib import AsyncExitStack
+import time
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, aclosing
 from dataclasses import dataclass
 from typing import Any
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 
 from .tools.base import Tool
-from .utils.connections import setup_mcp_connections
+from .tools.registry import ToolRegistry
+from .utils.cache_util import CachePlanner, CacheStats
+from .utils.compaction_util import SummaryCompactor
+from .utils.connections import MCPConnectionPool, setup_mcp_connections
 from .utils.history_util import MessageHistory
-from .utils.tool_util import execute_tools
+from .utils.retry_util import ModelCallGuard, default_call_guard
+from .utils.token_util import TokenEstimator
+from .utils.tool_util import ToolPipeline, ToolScheduler, execute_tools
+from .utils.trace_util import NULL_OBSERVER, AgentObserver
 
 
 @dataclass
@@ -24,6 +32,23 @@ class ModelConfig:
     context_window_tokens: int = 180000
 
 
+@dataclass
+class StreamEvent:
+    """Incremental event yielded by Agent.run_stream().
+
+    Types:
+    - text: a text delta from the model (``text``)
+    - tool_use: a complete tool_use block (``block``)
+    - tool_result: the result of executing a tool (``block``)
+    - message: the final assistant message of a turn (``message``)
+    """
+
+    type: str
+    text: str | None = None
+    block: Any = None
+    message: Any = None
+
+
 class Agent:
     """Claude-powered agent with tool use capabilities."""
 
@@ -35,8 +60,18 @@ class Agent:
         mcp_servers: list[dict[str, Any]] | None = None,
         config: ModelConfig | None = None,
         verbose: bool = False,
-        client: Anthropic | None = None,
+        client: AsyncAnthropic | None = None,
         message_params: dict[str, Any] | None = None,
+        stream: bool = True,
+        pipeline_tools: bool = True,
+        token_estimator: TokenEstimator | None = None,
+        compactor: SummaryCompactor | None = None,
+        cache_planner: CachePlanner | None = None,
+        mcp_pool: MCPConnectionPool | None = None,
+        mcp_startup_timeout: float | None = 5.0,
+        tool_scheduler: ToolScheduler | None = None,
+        observer: AgentObserver | None = None,
+        call_guard: ModelCallGuard | None = None,
     ):
         """Initialize an Agent.
         
@@ -47,25 +82,61 @@ class Agent:
             mcp_servers: MCP server configurations
             config: Model configuration with defaults
             verbose: Enable detailed logging
-            client: Anthropic client instance
+            client: AsyncAnthropic client instance
             message_params: Additional parameters for client.messages.create().
                            These override any conflicting parameters from config.
+            stream: Stream model responses (default) instead of waiting
+                    for the full message on each turn
+            pipeline_tools: Start each tool as soon as its tool_use block
+                            is complete instead of after the full response
+            token_estimator: Local token estimator for history accounting
+                             (defaults to a shared, self-calibrating one)
+            compactor: Summarize evicted turns instead of dropping them
+            cache_planner: Prompt cache breakpoint placement on tools,
+                           system and history
+            mcp_pool: Pool to borrow MCP connections from (defaults to a
+                      pool shared by all agents in the process)
+            mcp_startup_timeout: Seconds to wait for MCP servers before
+                                 starting with the tools that are ready;
+                                 slower servers join in the background
+            tool_scheduler: Concurrency limits, rate limits and timeouts
+                            for tool calls (share one to cap several agents)
+            observer: Hooks receiving model, tool, truncation and
+                      compaction events, e.g. a SpanRecorder (defaults to
+                      a no-op)
+            call_guard: Retries, rate limiting and circuit breaking for
+                        model calls (defaults to a guard shared by all
+                        agents in the process)
         """
         self.name = name
         self.system = system
         self.verbose = verbose
-        self.tools = list(tools or [])
+        self.tools = ToolRegistry(tools)
         self.config = config or ModelConfig()
         self.mcp_servers = mcp_servers or []
+        self.mcp_pool = mcp_pool
+        self.mcp_startup_timeout = mcp_startup_timeout
+        self.tool_scheduler = tool_scheduler or ToolScheduler()
+        self.observer = observer or NULL_OBSERVER
+        self.call_guard = call_guard or default_call_guard
         self.message_params = message_params or {}
-        self.client = client or Anthropic(
-            api_key=os.environ.get("ANTHROPIC_API_KEY", "")
+        self.stream = stream
+        self.pipeline_tools = pipeline_tools
+        self.cache_planner = cache_planner or CachePlanner()
+        self.cache_stats = CacheStats()
+        self.client = client or AsyncAnthropic(
+            api_key=os.environ.get("ANTHROPIC_API_KEY", ""),
+            # Retries are left to the call guard, which sees every failure
+            max_retries=0,
         )
         self.history = MessageHistory(
             model=self.config.model,
             system=self.system,
             context_window_tokens=self.config.context_window_tokens,
             client=self.client,
+            estimator=token_estimator,
+            compactor=compactor,
+            observer=self.observer,
         )
 
         if self.verbose:
@@ -77,32 +148,137 @@ class Agent:
         Returns a dict with base parameters from config, with any
         message_params overriding conflicting keys.
         """
+        tools = self.tools.to_list()
+        planner = self.cache_planner
+        breakpoints = planner.history_breakpoints(
+            has_tools=bool(tools), has_system=bool(self.system)
+        )
         return {
             "model": self.config.model,
             "max_tokens": self.config.max_tokens,
             "temperature": self.config.temperature,
-            "system": self.system,
-            "messages": self.history.format_for_api(),
-            "tools": [tool.to_dict() for tool in self.tools],
+            "system": planner.system(self.system),
+            "messages": self.history.format_for_api(breakpoints),
+            "tools": planner.tools(tools),
             **self.message_params,
         }
 
-    async def _agent_loop(self, user_input: str) -> list[dict[str, Any]]:
+    async def _call_model(
+        self, params: dict[str, Any]
+    ) -> AsyncIterator[StreamEvent]:
+        """Call the model and yield events as the response arrives.
+
+        The final event is always a ``message`` event carrying the
+        complete assistant message. Calls go through the call guard:
+        failures are retried with backoff as long as no event of the
+        failed attempt has been yielded yet.
+        """
+        guard = self.call_guard
+        attempt = 0
+        while True:
+            await guard.before_call(self.history.total_tokens)
+            started = False
+            try:
+                async for event in self._request_model(params):
+                    started = True
+                    yield event
+            except Exception as e:
+                delay = guard.on_failure(e, attempt, retry=not started)
+                if delay is None:
+                    raise
+                if self.verbose:
+                    print(
+                        f"\n[{self.name}] Model call failed ({e}); "
+                        f"retrying in {delay:.1f}s"
+                    )
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            guard.on_success()
+            return
+
+    async def _request_model(
+        self, params: dict[str, Any]
+    ) -> AsyncIterator[StreamEvent]:
+        """Send one model request and yield its events."""
+        params["extra_headers"] = {
+            "anthropic-beta": "code-execution-2025-05-22",
+            **params.get("extra_headers", {}),
+        }
+
+        if not self.stream:
+            response = await self.client.messages.create(**params)
+            for block in response.content:
+                if block.type == "text":
+                    yield StreamEvent("text", text=block.text)
+                elif block.type == "tool_use":
+                    yield StreamEvent("tool_use", block=block)
+            yield StreamEvent("message", message=response)
+            return
+
+        async with self.client.messages.stream(**params) as stream:
+            async for event in stream:
+                if event.type == "text":
+                    yield StreamEvent("text", text=event.text)
+                elif (
+                    event.type == "content_block_stop"
+                    and event.content_block.type == "tool_use"
+                ):
+                    yield StreamEvent("tool_use", block=event.content_block)
+            response = await stream.get_final_message()
+        yield StreamEvent("message", message=response)
+
+    async def _agent_loop(self, user_input: str) -> AsyncIterator[StreamEvent]:
         """Process user input and handle tool calls in a loop"""
+        observer = self.observer
+        observer.on_turn_start(self, user_input)
+        try:
+            async with aclosing(self._agent_turn(user_input)) as events:
+                async for event in events:
+                    yield event
+        except BaseException as e:
+            observer.on_turn_end(self, e)
+            raise
+        observer.on_turn_end(self)
+
+    async def _agent_turn(self, user_input: str) -> AsyncIterator[StreamEvent]:
         if self.verbose:
             print(f"\n[{self.name}] Received: {user_input}")
         await self.history.add_message("user", user_input, None)
-
-        tool_dict = {tool.name: tool for tool in self.tools}
+        observer = self.observer
+        # Only wrap tool calls in hooks when someone is listening
+        tool_observer = None if observer is NULL_OBSERVER else observer
 
         while True:
+            start = time.perf_counter()
+            tokens_before = self.history.total_tokens
             self.history.truncate()
+            prepared = time.perf_counter()
+            observer.on_truncate(
+                tokens_before, self.history.total_tokens, prepared - start
+            )
             params = self._prepare_message_params()
+            observer.on_model_start(params, time.perf_counter() - prepared)
+            pipeline = None
+            if self.pipeline_tools:
+                pipeline = ToolPipeline(
+                    self.tools, self.tool_scheduler, tool_observer
+                )
+
+            try:
+                async for event in self._call_model(params):
+                    if event.type == "tool_use" and pipeline:
+                        pipeline.submit(event.block)
+                    elif event.type == "message":
+                        response = event.message
+                    yield event
+            except BaseException as e:
+                observer.on_model_end(None, e)
+                if pipeline:
+                    pipeline.cancel()
+                raise
+            observer.on_model_end(response)
 
-            response = self.client.messages.create(
-                **params,
-                extra_headers={"anthropic-beta": "code-execution-2025-05-22"}
-            )
             tool_calls = [
                 block for block in response.content if block.type == "tool_use"
             ]
@@ -120,39 +296,79 @@ class Agent:
                             f"{block.name}({params_str})"
                         )
 
+            self.cache_stats.record(response.usage)
             await self.history.add_message(
                 "assistant", response.content, response.usage
             )
 
             if tool_calls:
-                tool_results = await execute_tools(
-                    tool_calls,
-                    tool_dict,
-                )
-                if self.verbose:
-                    for block in tool_results:
+                if pipeline:
+                    tool_results = await pipeline.results(tool_calls)
+                else:
+                    tool_results = await execute_tools(
+                        tool_calls,
+                        self.tools,
+                        scheduler=self.tool_scheduler,
+                        observer=tool_observer,
+                    )
+                for block in tool_results:
+                    if self.verbose:
                         print(
                             f"\n[{self.name}] Tool result: "
                             f"{block.get('content')}"
                         )
+                    yield StreamEvent("tool_result", block=block)
                 await self.history.add_message("user", tool_results)
             else:
-                return response
+                if self.verbose:
+                    print(f"\n[{self.name}] Cache usage: {self.cache_stats}")
+                return
 
-    async def run_async(self, user_input: str) -> list[dict[str, Any]]:
-        """Run agent with MCP tools asynchronously."""
+    async def run_stream(self, user_input: str) -> AsyncIterator[StreamEvent]:
+        """Run agent with MCP tools, yielding events as they arrive."""
+        self.cache_stats = CacheStats()
         async with AsyncExitStack() as stack:
-            original_tools = list(self.tools)
+            mcp_tools = []
+            # Local tools an MCP tool of the same name replaces for this run
+            shadowed: dict[str, Tool] = {}
+
+            def add_mcp_tools(tools: list[Tool]) -> None:
+                mcp_names = {tool.name for tool in mcp_tools}
+                for tool in tools:
+                    local = self.tools.get(tool.name)
+                    if local is not None and tool.name not in mcp_names:
+                        shadowed.setdefault(tool.name, local)
+                mcp_tools.extend(tools)
+                self.tools.extend(tools)
 
             try:
-                mcp_tools = await setup_mcp_connections(
-                    self.mcp_servers, stack
+                add_mcp_tools(
+                    await setup_mcp_connections(
+                        self.mcp_servers,
+                        stack,
+                        self.mcp_pool,
+                        startup_timeout=self.mcp_startup_timeout,
+                        on_late_tools=add_mcp_tools,
+                    )
                 )
-                self.tools.extend(mcp_tools)
-                return await self._agent_loop(user_input)
+                async for event in self._agent_loop(user_input):
+                    yield event
             finally:
-                self.tools = original_tools
+                for tool in mcp_tools:
+                    if tool.name in shadowed:
+                        # Put the local tool back in its original position
+                        self.tools.add(shadowed[tool.name])
+                    else:
+                        self.tools.remove(tool.name)
+
+    async def run_async(self, user_input: str) -> Any:
+        """Run agent with MCP tools asynchronously."""
+        response = None
+        async for event in self.run_stream(user_input):
+            if event.type == "message":
+                response = event.message
+        return response
 
-    def run(self, user_input: str) -> list[dict[str, Any]]:
+    def run(self, user_input: str) -> Any:
         """Run agent synchronously"""
         return asyncio.run(self.run_async(user_input))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Load test for AgentRuntime against the local mock Messages API.
+
+Each session runs a number of turns; every turn makes one tool call
+(model -> think tool -> model). Reports sessions/sec and turn latency
+percentiles.
+
+    python agents/load_test.py --sessions 500 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.runtime import AdmissionError, AgentDefinition, AgentRuntime
+from agents.testing import MockAnthropic, tool_loop_responder
+from agents.tools.think import ThinkTool
+
+
+def format_percentiles(latencies: list[float]) -> str:
+    """p50, p95 and p99 of turn latencies in milliseconds."""
+    if not latencies:
+        return "no turns completed"
+    if len(latencies) < 2:
+        # statistics.quantiles needs at least two data points
+        p50 = p95 = p99 = latencies[0]
+    else:
+        # Inclusive, so small samples are not extrapolated past the max
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = (cuts[i] for i in (49, 94, 98))
+    return (
+        f"p50 {p50 * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms, "
+        f"p99 {p99 * 1000:.1f} ms"
+    )
+
+
+async def run_load_test(
+    sessions: int,
+    concurrency: int,
+    turns: int,
+    latency: float,
+    max_concurrent: int,
+    max_pending: int,
+) -> None:
+    client = MockAnthropic(
+        responder=tool_loop_responder(
+            "think", {"thought": "Work through the request step by step."}
+        ),
+        latency=latency,
+    )
+    definition = AgentDefinition(
+        name="LoadTest",
+        system="You are a helpful assistant.",
+        tools=(ThinkTool(),),
+    )
+    latencies = []
+
+    async with AgentRuntime(
+        client=client,
+        max_sessions=concurrency,
+        max_concurrent=max_concurrent,
+        max_pending=max_pending,
+    ) as runtime:
+        queue = asyncio.Queue()
+        for i in range(sessions):
+            queue.put_nowait(i)
+
+        async def worker() -> None:
+            while not queue.empty():
+                session = runtime.create_session(
+                    definition, f"session-{queue.get_nowait()}"
+                )
+                try:
+                    for turn in range(turns):
+                        start = time.perf_counter()
+                        try:
+                            await runtime.run(session.id, f"Question {turn}")
+                        except AdmissionError:
+                            continue
+                        latencies.append(time.perf_counter() - start)
+                finally:
+                    runtime.close_session(session.id)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"sessions:       {sessions} ({turns} turns each)")
+    print(f"concurrency:    {concurrency} sessions, {max_concurrent} turns")
+    print(f"model latency:  {latency * 1000:.0f} ms, {client.calls} calls")
+    print(f"elapsed:        {elapsed:.2f} s")
+    print(f"sessions/sec:   {sessions / elapsed:.1f}")
+    print(f"turns/sec:      {len(latencies) / elapsed:.1f}")
+    print(f"turn latency:   {format_percentiles(latencies)}")
+    print(
+        f"admission:      {runtime.rejected} rejected, "
+        f"p95 wait <= {runtime.admission_wait.quantile(0.95) * 1000:.0f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Mock model latency (s)"
+    )
+    parser.add_argument("--max-concurrent", type=int, default=64)
+    parser.add_argument("--max-pending", type=int, default=128)
+    args = parser.parse_args()
+    asyncio.run(
+        run_load_test(
+            args.sessions,
+            args.concurrency,
+            args.turns,
+            args.latency,
+            args.max_concurrent,
+            args.max_pending,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
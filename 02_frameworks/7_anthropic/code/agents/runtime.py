@@ -0,0 +1,270 @@
+"""Runtime hosting many agent sessions in one event loop."""
+
+import asyncio
+import os
+import time
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from anthropic import AsyncAnthropic
+
+from .agent import Agent, ModelConfig, StreamEvent
+from .tools.base import Tool
+from .utils.cache_util import CachePlanner
+from .utils.compaction_util import SummaryCompactor
+from .utils.connections import MCPConnectionPool
+from .utils.metrics_util import LatencyHistogram
+from .utils.retry_util import ModelCallGuard
+from .utils.token_util import TokenEstimator
+from .utils.tool_util import ToolScheduler
+from .utils.trace_util import AgentObserver
+
+
+class AdmissionError(RuntimeError):
+    """Raised when the runtime is at capacity and rejects work."""
+
+
+@dataclass(frozen=True)
+class AgentDefinition:
+    """Immutable description of an agent, shared by all its sessions.
+
+    Tools are shared between sessions, so they should not keep
+    per-conversation state.
+    """
+
+    name: str
+    system: str
+    tools: tuple[Tool, ...] = ()
+    mcp_servers: tuple[dict[str, Any], ...] = ()
+    config: ModelConfig = field(default_factory=ModelConfig)
+    message_params: dict[str, Any] = field(default_factory=dict)
+    verbose: bool = False
+    stream: bool = True
+    pipeline_tools: bool = True
+    compactor: SummaryCompactor | None = None
+    cache_planner: CachePlanner | None = None
+    mcp_startup_timeout: float | None = 5.0
+    observer: AgentObserver | None = None
+
+    def create_agent(
+        self,
+        client: AsyncAnthropic,
+        mcp_pool: MCPConnectionPool | None = None,
+        tool_scheduler: ToolScheduler | None = None,
+        token_estimator: TokenEstimator | None = None,
+        call_guard: ModelCallGuard | None = None,
+    ) -> Agent:
+        """Create an Agent holding the state of one conversation."""
+        return Agent(
+            name=self.name,
+            system=self.system,
+            tools=list(self.tools),
+            mcp_servers=[dict(server) for server in self.mcp_servers],
+            config=self.config,
+            verbose=self.verbose,
+            client=client,
+            message_params=dict(self.message_params),
+            stream=self.stream,
+            pipeline_tools=self.pipeline_tools,
+            token_estimator=token_estimator,
+            compactor=self.compactor,
+            cache_planner=self.cache_planner,
+            mcp_pool=mcp_pool,
+            mcp_startup_timeout=self.mcp_startup_timeout,
+            tool_scheduler=tool_scheduler,
+            observer=self.observer,
+            call_guard=call_guard,
+        )
+
+
+@dataclass
+class Session:
+    """Per-conversation state: the history lives on the session's agent."""
+
+    id: str
+    definition: AgentDefinition
+    agent: Agent
+    created_at: float = field(default_factory=time.monotonic)
+    last_active: float = field(default_factory=time.monotonic)
+    turns: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+
+class AgentRuntime:
+    """Hosts many agent sessions in one event loop.
+
+    Sessions share one client, MCP connection pool, tool scheduler and
+    model call guard (retries, rate limit and circuit breaker).
+    Admission control bounds memory and load: at most ``max_sessions``
+    sessions are open and at most ``max_concurrent`` turns run at once.
+    Up to ``max_pending`` turns wait for a slot, for no longer than
+    ``admission_timeout`` seconds; anything beyond that is rejected with
+    AdmissionError straight away instead of queueing without bound.
+    Turns of one session run one at a time, in order.
+    """
+
+    def __init__(
+        self,
+        client: AsyncAnthropic | None = None,
+        mcp_pool: MCPConnectionPool | None = None,
+        tool_scheduler: ToolScheduler | None = None,
+        token_estimator: TokenEstimator | None = None,
+        call_guard: ModelCallGuard | None = None,
+        max_sessions: int = 1000,
+        max_concurrent: int = 32,
+        max_pending: int = 128,
+        admission_timeout: float | None = 30.0,
+    ):
+        self.client = client or AsyncAnthropic(
+            api_key=os.environ.get("ANTHROPIC_API_KEY", ""),
+            # Retries are left to the call guard, which sees every failure
+            max_retries=0,
+        )
+        self._owns_pool = mcp_pool is None
+        self.mcp_pool = mcp_pool or MCPConnectionPool()
+        self.tool_scheduler = tool_scheduler or ToolScheduler()
+        self.token_estimator = token_estimator
+        self.call_guard = call_guard
+        self.max_sessions = max_sessions
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.admission_timeout = admission_timeout
+        self.sessions: dict[str, Session] = {}
+        self.turn_latency = LatencyHistogram()
+        self.admission_wait = LatencyHistogram()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._slots: asyncio.Semaphore | None = None
+        self._active = 0
+        self._pending = 0
+
+    @property
+    def active(self) -> int:
+        """Turns currently running."""
+        return self._active
+
+    @property
+    def pending(self) -> int:
+        """Turns waiting for a slot."""
+        return self._pending
+
+    def create_session(
+        self, definition: AgentDefinition, session_id: str | None = None
+    ) -> Session:
+        """Open a session for a conversation with an agent definition."""
+        if len(self.sessions) >= self.max_sessions:
+            self.rejected += 1
+            raise AdmissionError(
+                f"Session limit of {self.max_sessions} reached"
+            )
+        session_id = session_id or uuid.uuid4().hex
+        if session_id in self.sessions:
+            raise ValueError(f"Session {session_id} already exists")
+
+        agent = definition.create_agent(
+            self.client,
+            mcp_pool=self.mcp_pool,
+            tool_scheduler=self.tool_scheduler,
+            token_estimator=self.token_estimator,
+            call_guard=self.call_guard,
+        )
+        session = Session(session_id, definition, agent)
+        self.sessions[session_id] = session
+        return session
+
+    def close_session(self, session_id: str) -> None:
+        """Drop a session and its history."""
+        self.sessions.pop(session_id, None)
+
+    def close_idle(self, max_idle: float) -> int:
+        """Close sessions without a turn for ``max_idle`` seconds."""
+        cutoff = time.monotonic() - max_idle
+        idle = [
+            session.id
+            for session in self.sessions.values()
+            if session.last_active < cutoff and not session.lock.locked()
+        ]
+        for session_id in idle:
+            del self.sessions[session_id]
+        return len(idle)
+
+    async def _admit(self) -> None:
+        """Wait for a turn slot, or raise AdmissionError."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        # Counted rather than read off the semaphore: turns arriving
+        # together all see it free until the first acquire() runs
+        waiting = self._active + self._pending - self.max_concurrent
+        if waiting >= self.max_pending:
+            self.rejected += 1
+            raise AdmissionError(
+                f"{waiting} turns already waiting for a slot"
+            )
+
+        self._pending += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                self._slots.acquire(), self.admission_timeout
+            )
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AdmissionError(
+                f"No turn slot free after {self.admission_timeout}s"
+            ) from None
+        finally:
+            self._pending -= 1
+        self.admission_wait.observe(time.monotonic() - start)
+        self._active += 1
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._slots.release()
+
+    async def run_stream(
+        self, session_id: str, user_input: str
+    ) -> AsyncIterator[StreamEvent]:
+        """Run one turn of a session, yielding the agent's events."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise KeyError(f"Unknown session {session_id}")
+
+        async with session.lock:
+            await self._admit()
+            start = time.monotonic()
+            try:
+                async for event in session.agent.run_stream(user_input):
+                    yield event
+            except BaseException:
+                self.failed += 1
+                raise
+            else:
+                self.completed += 1
+                self.turn_latency.observe(time.monotonic() - start)
+            finally:
+                self._release()
+                session.turns += 1
+                session.last_active = time.monotonic()
+
+    async def run(self, session_id: str, user_input: str) -> Any:
+        """Run one turn of a session and return the final message."""
+        response = None
+        async for event in self.run_stream(session_id, user_input):
+            if event.type == "message":
+                response = event.message
+        return response
+
+    async def close(self) -> None:
+        """Close all sessions and the MCP pool if the runtime created it."""
+        self.sessions.clear()
+        if self._owns_pool:
+            await self.mcp_pool.close()
+
+    async def __aenter__(self) -> "AgentRuntime":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
@@ -0,0 +1,85 @@
+"""Regression tests for Agent runs against the mock Messages API.
+
+    pytest agents/test_agent.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import agent as agent_module
+from agents.agent import Agent
+from agents.testing import MockAnthropic, tool_loop_responder
+from agents.tools.base import Tool
+from agents.tools.think import ThinkTool
+from agents.utils.tool_util import ToolScheduler
+
+
+class RemoteThinkTool(Tool):
+    """Stands in for an MCP tool that has the same name as a local one."""
+
+    def __init__(self):
+        super().__init__(
+            name="think",
+            description="Remote think tool.",
+            input_schema={"type": "object", "properties": {}},
+        )
+
+    async def execute(self, **kwargs) -> str:
+        return "Remote thinking complete!"
+
+
+def test_mcp_tool_shadowing_a_local_tool_is_undone(monkeypatch):
+    """A local tool replaced by an MCP tool for one run comes back."""
+    local = ThinkTool()
+
+    async def fake_setup(*args, **kwargs):
+        return [RemoteThinkTool()]
+
+    monkeypatch.setattr(agent_module, "setup_mcp_connections", fake_setup)
+    agent = Agent(
+        name="Shadowed",
+        system="You are a helpful assistant.",
+        tools=[local],
+        client=MockAnthropic(
+            responder=tool_loop_responder("think", {"thought": "x"})
+        ),
+    )
+
+    for _ in range(2):
+        agent.run("Hi")
+        assert agent.tools.get("think") is local
+        assert len(agent.tools) == 1
+
+
+def test_scheduler_limits_work_across_runs():
+    """Each run() has its own event loop; tool limits must follow it."""
+    scheduler = ToolScheduler(
+        max_concurrency=2,
+        tool_concurrency={"think": 1},
+        rate_limits={"think": 1000.0},
+    )
+    agent = Agent(
+        name="Scheduled",
+        system="You are a helpful assistant.",
+        tools=[ThinkTool()],
+        client=MockAnthropic(
+            responder=tool_loop_responder(
+                "think", {"thought": "x"}, parallel=6
+            )
+        ),
+        tool_scheduler=scheduler,
+    )
+
+    for _ in range(2):
+        response = agent.run("Hi")
+        assert response.stop_reason == "end_turn"
+        results = [
+            block
+            for block in agent.history.messages[-2]["content"]
+            if block["type"] == "tool_result"
+        ]
+        assert len(results) == 6
+        assert not any(block.get("is_error") for block in results)
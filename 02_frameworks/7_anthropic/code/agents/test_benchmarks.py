@@ -0,0 +1,346 @@
+"""Benchmarks for the agent loop, history management and tool execution.
+
+Everything runs against the in-process mock of the Messages API in
+agents.testing, so no API key or network is needed and results are
+repeatable. Requires pytest-benchmark:
+
+    pytest agents/test_benchmarks.py --benchmark-group-by=func
+
+Pass --benchmark-disable to run each case once as a plain test.
+"""
+
+import asyncio
+import os
+import re
+import sys
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.agent import Agent, ModelConfig
+from agents.testing import (
+    MockAnthropic,
+    text_block,
+    tool_loop_responder,
+    tool_use_block,
+)
+from agents.testing.mock_client import MockBlock, MockUsage
+from agents.tools.base import Tool
+from agents.tools.think import ThinkTool
+from agents.utils.compaction_util import (
+    SUMMARY_SYSTEM_PROMPT,
+    SummaryCompactor,
+)
+from agents.utils.history_util import MessageHistory
+from agents.utils.token_util import TokenEstimator
+from agents.utils.tool_util import ToolScheduler, execute_tools
+from agents.utils.trace_util import SpanRecorder
+
+TURN_SCALES = [10, 100, 1000]
+SYSTEM = "You are a helpful assistant. " * 100
+THOUGHT = "Consider the request carefully before answering. " * 20
+
+
+FACT = re.compile(r"Item \d+ code: \d+")
+RECALL_ITEMS = 50
+
+
+def summarizing(responder):
+    """Answer summary requests from the compactor, others with responder.
+
+    The summary keeps every fact found in the transcript, as the
+    summarizer is asked to.
+    """
+
+    def respond(params: dict[str, Any]) -> list[dict[str, Any]]:
+        if params.get("system") == SUMMARY_SYSTEM_PROMPT:
+            facts = FACT.findall(params["messages"][0]["content"])
+            return [
+                text_block(
+                    " ".join(
+                        ["The user asked questions; all answered.", *facts]
+                    )
+                )
+            ]
+        return responder(params)
+
+    return respond
+
+
+class LookupTool(Tool):
+    """Returns a long record holding the code of an item."""
+
+    def __init__(self):
+        super().__init__(
+            name="lookup",
+            description="Look up the record of an item.",
+            input_schema={
+                "type": "object",
+                "properties": {"item": {"type": "integer"}},
+                "required": ["item"],
+            },
+        )
+        self.calls = 0
+
+    async def execute(self, item: int) -> str:
+        self.calls += 1
+        return f"Item {item} code: {item * 7919 % 10000}. " + THOUGHT
+
+
+def recall_responder(params: dict[str, Any]) -> list[dict[str, Any]]:
+    """Answer from context if the asked-for code is there, else look it up.
+
+    Only user messages are searched: they hold the tasks, the tool
+    results and the summary.
+    """
+    messages = params["messages"]
+    last = messages[-1]["content"]
+    if last[0]["type"] == "tool_result":
+        return [text_block("Here is the code.")]
+    item = re.search(r"item (\d+)\?", last[-1]["text"]).group(1)
+    wanted = f"Item {item} code:"
+    for message in messages:
+        if message["role"] != "user":
+            continue
+        for block in message["content"]:
+            text = block.get("text") or block.get("content")
+            if isinstance(text, str) and wanted in text:
+                return [text_block("Here is the code.")]
+    return [tool_use_block("lookup", {"item": int(item)})]
+
+
+def make_agent(
+    context_window_tokens: int = 180000,
+    compactor: SummaryCompactor | None = None,
+    observer: SpanRecorder | None = None,
+    responder: Any = None,
+    tools: list[Tool] | None = None,
+) -> Agent:
+    client = MockAnthropic(
+        responder=summarizing(
+            responder or tool_loop_responder("think", {"thought": THOUGHT})
+        )
+    )
+    return Agent(
+        name="Bench",
+        system=SYSTEM,
+        tools=tools or [ThinkTool()],
+        config=ModelConfig(context_window_tokens=context_window_tokens),
+        client=client,
+        token_estimator=TokenEstimator(),
+        compactor=compactor,
+        observer=observer,
+    )
+
+
+async def run_turns(agent: Agent, turns: int) -> int:
+    """Drive the agent loop for a number of user turns; returns events."""
+    events = 0
+    for turn in range(turns):
+        async for _ in agent._agent_loop(f"Question {turn}"):
+            events += 1
+    return events
+
+
+def build_history(turns: int, context_window_tokens: int) -> MessageHistory:
+    """A history holding ``turns`` user turns with one tool call each."""
+    history = MessageHistory(
+        model="mock",
+        system=SYSTEM,
+        context_window_tokens=context_window_tokens,
+        client=MockAnthropic(),
+        estimator=TokenEstimator(smoothing=0),
+    )
+
+    async def fill() -> None:
+        billed = history.system_tokens
+        for turn in range(turns):
+            await history.add_message("user", f"Question {turn}")
+            billed += 10
+            tool_use = MockBlock(
+                type="tool_use",
+                id=f"toolu_{turn}",
+                name="think",
+                input={"thought": THOUGHT},
+            )
+            await history.add_message(
+                "assistant", [tool_use], MockUsage(billed, 260)
+            )
+            billed += 260
+            await history.add_message(
+                "user",
+                [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": f"toolu_{turn}",
+                        "content": "Thinking complete!",
+                    }
+                ],
+            )
+            billed += 12
+            answer = MockBlock(type="text", text="Here is the answer.")
+            await history.add_message(
+                "assistant", [answer], MockUsage(billed, 8)
+            )
+            billed += 8
+
+    asyncio.run(fill())
+    return history
+
+
+@pytest.mark.parametrize("turns", TURN_SCALES)
+def test_agent_loop(benchmark, turns):
+    """Full turns (model, tool, model) through _agent_loop."""
+
+    def setup():
+        return (make_agent(),), {}
+
+    def run(agent: Agent) -> None:
+        events = asyncio.run(run_turns(agent, turns))
+        assert events >= 4 * turns
+
+    benchmark.pedantic(
+        run, setup=setup, rounds=3 if turns < 1000 else 1, iterations=1
+    )
+
+
+def test_agent_loop_traced(benchmark):
+    """100 turns recorded as spans, to compare with test_agent_loop."""
+    holder = {}
+
+    def setup():
+        holder["recorder"] = SpanRecorder()
+        return (make_agent(observer=holder["recorder"]),), {}
+
+    def run(agent: Agent) -> None:
+        asyncio.run(run_turns(agent, 100))
+
+    benchmark.pedantic(run, setup=setup, rounds=3, iterations=1)
+    # A turn, two truncations, two model calls and a tool call per turn
+    assert len(holder["recorder"].spans) == 600
+
+
+def make_recall_agent(compactor: SummaryCompactor | None) -> Agent:
+    return make_agent(
+        20000, compactor, responder=recall_responder, tools=[LookupTool()]
+    )
+
+
+async def run_tasks(agent: Agent, tasks: int) -> None:
+    """Each task asks for the code of an item, cycling through them."""
+    for task in range(tasks):
+        item = task % RECALL_ITEMS
+        async for _ in agent._agent_loop(
+            f"Task {task}: what is the code of item {item}?"
+        ):
+            pass
+
+
+def per_task(agent: Agent, tasks: int) -> dict[str, float]:
+    """Tool calls and tokens, including the summarizer's, per task."""
+    tokens = agent.cache_stats.total_input_tokens
+    compactor = agent.history.compactor
+    if compactor is not None:
+        tokens += (
+            compactor.stats["input_tokens"] + compactor.stats["output_tokens"]
+        )
+    return {
+        "tool_calls": agent.tools.get("lookup").calls / tasks,
+        "tokens": tokens / tasks,
+    }
+
+
+def test_long_session_compaction(benchmark):
+    """1000 tasks in a small window, compacted against plain truncation.
+
+    Every task recalls a code looked up 50 tasks earlier, which plain
+    truncation has already dropped; the summary keeps it, so the
+    compacted session answers without calling the tool again.
+    """
+    tasks = 1000
+    truncated = make_recall_agent(None)
+    asyncio.run(run_tasks(truncated, tasks))
+    holder = {}
+
+    def setup():
+        holder["agent"] = make_recall_agent(SummaryCompactor())
+        return (holder["agent"],), {}
+
+    def run(agent: Agent) -> None:
+        asyncio.run(run_tasks(agent, tasks))
+        assert agent.history.total_tokens <= 20000
+
+    benchmark.pedantic(run, setup=setup, rounds=1, iterations=1)
+    compacted = holder["agent"]
+    assert compacted.history.compactor.stats["compactions"] > 0
+
+    baseline = per_task(truncated, tasks)
+    result = per_task(compacted, tasks)
+    benchmark.extra_info.update(
+        {f"truncation_{key}": value for key, value in baseline.items()}
+    )
+    benchmark.extra_info.update(
+        {f"compaction_{key}": value for key, value in result.items()}
+    )
+    assert result["tool_calls"] < baseline["tool_calls"]
+    assert result["tokens"] < baseline["tokens"]
+
+
+@pytest.mark.parametrize("turns", TURN_SCALES)
+def test_truncate_within_window(benchmark, turns):
+    """truncate() on a history that already fits: the per-turn cost."""
+    history = build_history(turns, context_window_tokens=10**9)
+    benchmark(history.truncate)
+    assert len(history.messages) == 4 * turns
+
+
+@pytest.mark.parametrize("turns", TURN_SCALES)
+def test_truncate_evict(benchmark, turns):
+    """truncate() evicting half of the history in one call."""
+    window = build_history(turns, 10**9).total_tokens // 2
+
+    def setup():
+        return (build_history(turns, window),), {}
+
+    def run(history: MessageHistory) -> None:
+        history.truncate()
+        assert history.total_tokens <= window
+
+    benchmark.pedantic(run, setup=setup, rounds=5, iterations=1)
+
+
+@pytest.mark.parametrize("turns", TURN_SCALES)
+def test_format_for_api(benchmark, turns):
+    """format_for_api() with cache breakpoints between two requests."""
+    history = build_history(turns, context_window_tokens=10**9)
+    history.format_for_api(2)
+
+    def run() -> list[dict[str, Any]]:
+        return history.format_for_api(2)
+
+    payload = benchmark(run)
+    assert len(payload) == 4 * turns
+
+
+@pytest.mark.parametrize("calls", TURN_SCALES)
+def test_execute_tools(benchmark, calls):
+    """A batch of parallel tool calls through the default scheduler."""
+    tools = {"think": ThinkTool()}
+    # The scheduler an Agent creates by default, reused across runs
+    scheduler = ToolScheduler()
+    tool_calls = [
+        SimpleNamespace(id=f"toolu_{i}", name="think", input={"thought": "x"})
+        for i in range(calls)
+    ]
+
+    def run() -> list[dict[str, Any]]:
+        return asyncio.run(
+            execute_tools(tool_calls, tools, scheduler=scheduler)
+        )
+
+    results = benchmark(run)
+    assert len(results) == calls
@@ -0,0 +1,160 @@
+"""Tests for summarizing compaction of the message history.
+
+    pytest agents/test_compaction.py
+"""
+
+import asyncio
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.testing import MockAnthropic
+from agents.testing.mock_client import MockUsage
+from agents.utils.compaction_util import SUMMARY_PREFIX, SummaryCompactor
+from agents.utils.history_util import TRUNCATION_MESSAGE, MessageHistory
+from agents.utils.token_util import TokenEstimator
+from agents.utils.trace_util import SpanRecorder
+
+WINDOW = 4000
+SUMMARY = {
+    "role": "user",
+    "content": [{"type": "text", "text": f"{SUMMARY_PREFIX}\nEarlier."}],
+}
+
+
+class ManualCompactor(SummaryCompactor):
+    """Summaries finish, or fail, when the test resolves them."""
+
+    def __init__(self):
+        super().__init__(max_summary_tokens=50)
+        self.requests: list[tuple[list, asyncio.Future]] = []
+
+    async def summarize(self, client, messages):
+        future = asyncio.get_running_loop().create_future()
+        self.requests.append((messages, future))
+        return await future
+
+
+def make_history(observer=None) -> MessageHistory:
+    return MessageHistory(
+        model="mock",
+        system="You are a helpful assistant.",
+        context_window_tokens=WINDOW,
+        client=MockAnthropic(),
+        estimator=TokenEstimator(smoothing=0),
+        compactor=ManualCompactor(),
+        observer=observer,
+    )
+
+
+async def add_turns(history: MessageHistory, turns: int) -> None:
+    """Add question/answer pairs, each answer billing the whole window."""
+    for _ in range(turns):
+        turn = len(history.messages) // 2
+        await history.add_message("user", f"Question {turn}. " + "x" * 400)
+        await history.add_message(
+            "assistant", f"Answer {turn}.", MockUsage(history.total_tokens, 5)
+        )
+
+
+async def start_compaction(history: MessageHistory) -> asyncio.Future:
+    """Fill the history past the trigger and return the pending summary."""
+    trigger = history.compactor.trigger_ratio * WINDOW
+    while history.total_tokens <= trigger:
+        await add_turns(history, 1)
+    history.truncate()
+    await asyncio.sleep(0)
+    assert len(history.compactor.requests) == 1
+    return history.compactor.requests[0][1]
+
+
+def test_finished_summary_replaces_the_oldest_turns():
+    recorder = SpanRecorder()
+    history = make_history(recorder)
+
+    async def run():
+        future = await start_compaction(history)
+        summarized = history.compactor.requests[0][0]
+        before = history.messages
+        # Turns added while summarizing are kept
+        await add_turns(history, 1)
+
+        future.set_result(SUMMARY)
+        await asyncio.sleep(0)
+        tokens_before = history.total_tokens
+        history.truncate()
+
+        assert history.messages[0] is SUMMARY
+        assert summarized == before[: len(summarized)]
+        assert history.messages[1:-2] == before[len(summarized) :]
+        assert history.total_tokens < tokens_before
+
+        (span,) = recorder.spans
+        assert span.name == "agent.compaction"
+        assert span.error is None
+        assert span.attributes == {
+            "agent.compaction.messages": len(summarized),
+            "agent.history.tokens_before": tokens_before,
+            "agent.history.tokens_after": history.total_tokens,
+        }
+
+    asyncio.run(run())
+
+
+def test_summary_is_cancelled_when_the_window_overflows():
+    recorder = SpanRecorder()
+    history = make_history(recorder)
+
+    async def run():
+        future = await start_compaction(history)
+        task = history._compaction
+        while history.total_tokens <= WINDOW:
+            await add_turns(history, 1)
+
+        history.truncate()
+        await asyncio.sleep(0)
+
+        assert task.cancelled() and future.cancelled()
+        assert history._compaction is None
+        assert history.messages[0] is TRUNCATION_MESSAGE
+        assert history.total_tokens <= WINDOW
+        assert not recorder.spans
+
+        # The cancelled summary is never applied
+        history.truncate()
+        assert history.messages[0] is TRUNCATION_MESSAGE
+        assert not recorder.spans
+
+    asyncio.run(run())
+
+
+def test_failed_summary_is_reported_and_retried():
+    recorder = SpanRecorder()
+    history = make_history(recorder)
+
+    async def run():
+        future = await start_compaction(history)
+        before = history.messages
+        tokens = history.total_tokens
+
+        future.set_exception(RuntimeError("overloaded"))
+        await asyncio.sleep(0)
+        history.truncate()
+
+        assert history.messages == before
+        assert history.total_tokens == tokens
+        (span,) = recorder.spans
+        assert span.error == "RuntimeError: overloaded"
+        assert span.attributes["agent.history.tokens_after"] == tokens
+
+        # Still above the trigger, so the next summary starts right away
+        await asyncio.sleep(0)
+        assert len(history.compactor.requests) == 2
+        history.compactor.requests[1][1].set_result(SUMMARY)
+        await asyncio.sleep(0)
+        history.truncate()
+        assert history.messages[0] is SUMMARY
+
+    asyncio.run(run())
@@ -0,0 +1,243 @@
+"""Tests for pooled MCP connections and servers that connect late.
+
+MCPConnection talks to a fake session in place of a real MCP server.
+
+    pytest agents/test_connections.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from contextlib import AsyncExitStack
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.agent import Agent
+from agents.testing import MockAnthropic, text_block, tool_use_block
+from agents.tools.think import ThinkTool
+from agents.utils import connections
+from agents.utils.connections import (
+    MCPConnection,
+    MCPConnectionPool,
+    setup_mcp_connections,
+)
+
+
+class FakeSession:
+    """The parts of an MCP ClientSession that MCPConnection uses."""
+
+    def __init__(self, server: "FakeServer"):
+        self.server = server
+
+    async def list_tools(self):
+        self.server.listings += 1
+        tool = SimpleNamespace(
+            name=f"{self.server.name}_lookup",
+            description=None,
+            inputSchema={"type": "object", "properties": {}},
+            annotations=None,
+        )
+        return SimpleNamespace(tools=[tool])
+
+    async def call_tool(self, tool_name, arguments):
+        self.server.calls += 1
+        text = SimpleNamespace(type="text", text=f"{tool_name} result")
+        return SimpleNamespace(content=[text], isError=False)
+
+    async def send_ping(self):
+        if not self.server.healthy:
+            raise ConnectionError("server went away")
+
+
+class FakeServer:
+    def __init__(self, name: str, delay: float = 0.0):
+        self.name = name
+        self.delay = delay
+        self.healthy = True
+        self.opened = 0
+        self.closed = 0
+        self.listings = 0
+        self.calls = 0
+
+
+class FakeConnection(MCPConnection):
+    """Opens a fake session after the server's startup delay."""
+
+    def __init__(self, server: FakeServer):
+        super().__init__()
+        self.server = server
+
+    async def _create_rw_context(self):
+        raise NotImplementedError
+
+    async def __aenter__(self):
+        await asyncio.sleep(self.server.delay)
+        self.server.opened += 1
+        self.session = FakeSession(self.server)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.server.closed += 1
+        self.session = None
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    """Fake servers by command name, created on first use."""
+    servers: dict[str, FakeServer] = {}
+
+    def create(config):
+        name = config["command"]
+        server = servers.setdefault(name, FakeServer(name))
+        return FakeConnection(server)
+
+    monkeypatch.setattr(connections, "create_mcp_connection", create)
+    return servers
+
+
+def test_pool_reuses_a_connection_per_config(servers):
+    async def run():
+        pool = MCPConnectionPool()
+        first = await pool.acquire({"command": "a", "args": ["--ro"]})
+        # The same config written in another key order
+        again = await pool.acquire({"args": ["--ro"], "command": "a"})
+        other = await pool.acquire({"command": "b"})
+
+        assert again is first
+        assert other is not first
+        assert (servers["a"].opened, servers["a"].listings) == (1, 1)
+        assert [tool.name for tool in first.tools] == ["a_lookup"]
+        assert await first.tools[0].execute() == "a_lookup result"
+
+        await pool.close()
+        assert servers["a"].closed == servers["b"].closed == 1
+
+    asyncio.run(run())
+
+
+def test_released_connection_is_evicted_when_idle(servers):
+    async def run():
+        pool = MCPConnectionPool(idle_timeout=60)
+        config = {"command": "a"}
+        async with pool.lease(config) as pooled:
+            assert pooled.leases == 1
+            pooled.last_used = time.monotonic() - 120
+            await pool.evict_idle()
+            assert servers["a"].closed == 0
+
+        assert pooled.leases == 0
+        await pool.evict_idle()
+        assert servers["a"].closed == 0
+
+        pooled.last_used = time.monotonic() - 120
+        await pool.evict_idle()
+        assert servers["a"].closed == 1
+        assert await pool.acquire(config) is not pooled
+        assert servers["a"].opened == 2
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_connection_failing_a_ping_is_reopened(servers):
+    async def run():
+        pool = MCPConnectionPool(health_check_interval=0)
+        pooled = await pool.acquire({"command": "a"})
+        await pool.acquire({"command": "a"})
+        assert servers["a"].opened == 1
+
+        servers["a"].healthy = False
+        assert await pool.acquire({"command": "a"}) is pooled
+        assert (servers["a"].opened, servers["a"].closed) == (2, 1)
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_late_server_tools_are_handed_over(servers):
+    servers["slow"] = FakeServer("slow", delay=0.05)
+    configs = [{"command": "fast"}, {"command": "slow"}]
+
+    async def run():
+        pool = MCPConnectionPool()
+        late = asyncio.Event()
+        late_tools = []
+
+        def on_late_tools(tools):
+            late_tools.extend(tools)
+            late.set()
+
+        async with AsyncExitStack() as stack:
+            tools = await setup_mcp_connections(
+                configs,
+                stack,
+                pool,
+                startup_timeout=0.01,
+                on_late_tools=on_late_tools,
+            )
+            assert [tool.name for tool in tools] == ["fast_lookup"]
+
+            await asyncio.wait_for(late.wait(), 1)
+            assert [tool.name for tool in late_tools] == ["slow_lookup"]
+            leased = [await pool.acquire(config) for config in configs]
+            assert [pooled.leases for pooled in leased] == [1, 1]
+
+        # Closing the run releases both leases but keeps the connections
+        assert [pooled.leases for pooled in leased] == [0, 0]
+        assert servers["slow"].closed == 0
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_late_tools_are_used_and_removed_after_the_run(servers):
+    """A server that connects during the first model call joins the run."""
+    servers["slow"] = FakeServer("slow", delay=0.02)
+    local = ThinkTool()
+
+    def respond(params):
+        rounds = sum(
+            message["content"][0]["type"] == "tool_result"
+            for message in params["messages"]
+            if message["role"] == "user"
+        )
+        names = [tool["name"] for tool in params["tools"]]
+        if rounds == 0:
+            return [tool_use_block("fast_lookup", {})]
+        if rounds == 1 and "slow_lookup" in names:
+            return [tool_use_block("slow_lookup", {})]
+        return [text_block("Done.")]
+
+    client = MockAnthropic(responder=respond, latency=0.2, record=True)
+    pool = MCPConnectionPool()
+    agent = Agent(
+        name="Late",
+        system="You are a helpful assistant.",
+        tools=[local],
+        client=client,
+        mcp_servers=[{"command": "fast"}, {"command": "slow"}],
+        mcp_pool=pool,
+        mcp_startup_timeout=0.01,
+    )
+
+    async def run():
+        response = await agent.run_async("Hi")
+        await pool.close()
+        return response
+
+    response = asyncio.run(run())
+
+    assert response.content[0].text == "Done."
+    tool_names = [
+        [tool["name"] for tool in request["tools"]]
+        for request in client.requests
+    ]
+    assert "slow_lookup" not in tool_names[0]
+    assert "slow_lookup" in tool_names[1]
+    assert (servers["fast"].calls, servers["slow"].calls) == (1, 1)
+    assert list(agent.tools) == [local]
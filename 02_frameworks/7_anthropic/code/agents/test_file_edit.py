@@ -0,0 +1,101 @@
+"""Tests for atomic file writes and edits.
+
+    pytest agents/test_file_edit.py
+"""
+
+import asyncio
+import os
+import stat
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.tools.file_edit import apply_edits
+from agents.tools.file_tools import FileWriteTool
+
+
+def write(path, content: str) -> str:
+    return asyncio.run(FileWriteTool().execute("write", str(path), content))
+
+
+def edit(path, old_text: str, new_text: str) -> str:
+    return asyncio.run(
+        FileWriteTool().execute(
+            "edit", str(path), old_text=old_text, new_text=new_text
+        )
+    )
+
+
+def mode(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@pytest.fixture
+def umask():
+    """The process umask, which can only be read by setting it."""
+    current = os.umask(0o022)
+    os.umask(current)
+    return current
+
+
+def test_new_file_mode_honours_umask(tmp_path, umask):
+    path = tmp_path / "new.txt"
+    assert write(path, "hello").startswith("Successfully")
+    assert path.read_text() == "hello"
+    assert mode(path) == 0o666 & ~umask
+
+
+def test_existing_file_keeps_its_mode(tmp_path):
+    path = tmp_path / "script.sh"
+    path.write_text("echo old\n")
+    path.chmod(0o750)
+
+    assert write(path, "echo new\n").startswith("Successfully")
+    assert mode(path) == 0o750
+    assert edit(path, "new", "newer").startswith("Successfully")
+    assert mode(path) == 0o750
+    assert path.read_text() == "echo newer\n"
+
+
+def test_write_through_symlink_updates_target(tmp_path):
+    target = tmp_path / "real" / "config.txt"
+    target.parent.mkdir()
+    target.write_text("old")
+    target.chmod(0o640)
+    link = tmp_path / "link.txt"
+    link.symlink_to(target)
+
+    assert write(link, "new").startswith("Successfully")
+    assert link.is_symlink()
+    assert target.read_text() == "new"
+    assert mode(target) == 0o640
+
+    assert edit(link, "new", "edited").startswith("Successfully")
+    assert link.is_symlink()
+    assert target.read_text() == "edited"
+    # No temp files left next to the link or the target
+    assert sorted(os.listdir(tmp_path)) == ["link.txt", "real"]
+    assert os.listdir(target.parent) == ["config.txt"]
+
+
+def test_apply_edits_through_dangling_symlink_creates_nothing(tmp_path):
+    link = tmp_path / "link.txt"
+    link.symlink_to(tmp_path / "missing.txt")
+
+    with pytest.raises(FileNotFoundError):
+        apply_edits(str(link), [("a", "b")])
+    assert os.listdir(tmp_path) == ["link.txt"]
+
+
+def test_failed_edit_leaves_file_untouched(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("alpha beta")
+    before = os.stat(path).st_mtime_ns
+
+    assert edit(path, "gamma", "delta").startswith("Error")
+    assert path.read_text() == "alpha beta"
+    assert os.stat(path).st_mtime_ns == before
+    assert os.listdir(tmp_path) == ["file.txt"]
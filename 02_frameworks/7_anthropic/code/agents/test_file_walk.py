@@ -0,0 +1,194 @@
+"""Tests for glob matching and .gitignore handling in directory walks.
+
+    pytest agents/test_file_walk.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.tools.file_tools import FileReadTool
+from agents.tools.file_walk import glob_to_regex, walk
+from agents.tools.result_cache import default_result_cache
+
+
+@pytest.mark.parametrize(
+    "pattern, path, matches",
+    [
+        ("*.py", "a.py", True),
+        ("*.py", "dir/a.py", False),
+        ("*", "dir/a.py", False),
+        ("?.py", "a.py", True),
+        ("?.py", "ab.py", False),
+        ("?", "/", False),
+        ("**/*.py", "a.py", True),
+        ("**/*.py", "x/y/a.py", True),
+        ("src/**/*.py", "src/a.py", True),
+        ("src/**/*.py", "src/x/y/a.py", True),
+        ("src/**/*.py", "lib/src/a.py", False),
+        ("src/**", "src/x/y", True),
+        ("a.py", "a.pyc", False),
+        ("a.py", "aXpy", False),
+        ("[ab].txt", "b.txt", True),
+        ("[ab].txt", "c.txt", False),
+        ("[!ab].txt", "c.txt", True),
+        ("[!ab].txt", "a.txt", False),
+        ("[]].txt", "].txt", True),
+        ("a+b(c).txt", "a+b(c).txt", True),
+    ],
+)
+def test_glob_to_regex(pattern, path, matches):
+    assert bool(glob_to_regex(pattern).match(path)) is matches
+
+
+def make_tree(root, files: dict[str, str]) -> None:
+    for relative, content in files.items():
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def walked(root, pattern: str = "**", **kwargs) -> list[str]:
+    return [
+        entry.path
+        for entry in walk(str(root), pattern, **kwargs)
+        if not entry.is_dir
+    ]
+
+
+def test_gitignore_negation_and_directories(tmp_path):
+    make_tree(
+        tmp_path,
+        {
+            ".gitignore": "*.log\n!keep.log\nbuild/\n# comment\n\n",
+            "a.log": "",
+            "keep.log": "",
+            "src/b.log": "",
+            "src/keep.log": "",
+            "src/main.py": "",
+            "build/out.py": "",
+            "src/build": "a file, not a directory",
+        },
+    )
+
+    assert walked(tmp_path) == [
+        "keep.log",
+        "src/build",
+        "src/keep.log",
+        "src/main.py",
+    ]
+
+
+def test_gitignore_anchoring(tmp_path):
+    make_tree(
+        tmp_path,
+        {
+            ".gitignore": "/top.txt\ndocs/*.md\n",
+            "top.txt": "",
+            "sub/top.txt": "",
+            "docs/a.md": "",
+            "docs/deep/b.md": "",
+            "sub/docs/c.md": "",
+        },
+    )
+
+    # Patterns with a slash match from the .gitignore's directory only
+    assert walked(tmp_path) == [
+        "docs/deep/b.md",
+        "sub/docs/c.md",
+        "sub/top.txt",
+    ]
+
+
+def test_nested_gitignore_overrides_parent(tmp_path):
+    make_tree(
+        tmp_path,
+        {
+            ".gitignore": "*.tmp\n",
+            "a.tmp": "",
+            "pkg/.gitignore": "!wanted.tmp\n/local.txt\n",
+            "pkg/wanted.tmp": "",
+            "pkg/other.tmp": "",
+            "pkg/local.txt": "",
+            "pkg/sub/local.txt": "",
+        },
+    )
+
+    assert walked(tmp_path) == ["pkg/sub/local.txt", "pkg/wanted.tmp"]
+    assert len(walked(tmp_path, respect_gitignore=False)) == 5
+
+
+def test_hidden_entries_and_depth(tmp_path):
+    make_tree(
+        tmp_path,
+        {
+            ".env": "",
+            ".git/config": "",
+            "a/b/c/d.txt": "",
+            "a/x.txt": "",
+        },
+    )
+
+    assert walked(tmp_path) == ["a/b/c/d.txt", "a/x.txt"]
+    assert walked(tmp_path, ".*") == [".env"]
+    assert walked(tmp_path, max_depth=1) == ["a/x.txt"]
+    # Without ** a pattern only descends as deep as its segments
+    assert walked(tmp_path, "*/*.txt") == ["a/x.txt"]
+
+
+def test_gitignore_that_is_not_utf8(tmp_path):
+    make_tree(tmp_path, {"a.txt": "", "a.log": "", "sub/b.log": ""})
+    (tmp_path / ".gitignore").write_bytes(b"# caf\xe9\n*.log\n")
+
+    # Undecodable bytes do not cost the rules that can be read
+    assert walked(tmp_path) == ["a.txt"]
+
+
+def list_dir(path, **kwargs) -> str:
+    return asyncio.run(
+        FileReadTool().run(operation="list", path=str(path), **kwargs)
+    )
+
+
+@pytest.fixture
+def empty_cache():
+    default_result_cache.clear()
+    yield
+    default_result_cache.clear()
+
+
+def keep_dir_mtime(path, change) -> None:
+    """Change a directory's contents without changing its mtime."""
+    before = os.stat(path)
+    change()
+    os.utime(path, ns=(before.st_atime_ns, before.st_mtime_ns))
+
+
+def test_listing_stats_are_not_served_stale(tmp_path, empty_cache):
+    make_tree(tmp_path, {"a.txt": "x"})
+    assert "a.txt (1 bytes" in list_dir(tmp_path, include_stats=True)
+
+    keep_dir_mtime(
+        tmp_path, lambda: (tmp_path / "a.txt").write_text("x" * 1001)
+    )
+    assert "a.txt (1001 bytes" in list_dir(tmp_path, include_stats=True)
+
+
+def test_listing_follows_gitignore_changes(tmp_path, empty_cache):
+    make_tree(
+        tmp_path, {".gitignore": "# nothing yet\n", "a.log": "", "b.txt": ""}
+    )
+    assert "a.log" in list_dir(tmp_path)
+    assert "a.log" in list_dir(tmp_path)
+
+    keep_dir_mtime(
+        tmp_path, lambda: (tmp_path / ".gitignore").write_text("*.log\n")
+    )
+    listing = list_dir(tmp_path)
+    assert "a.log" not in listing
+    assert "b.txt" in listing
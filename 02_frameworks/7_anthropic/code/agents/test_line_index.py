@@ -0,0 +1,115 @@
+"""Tests for the line index behind paged file reads.
+
+    pytest agents/test_line_index.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.tools import line_index
+from agents.tools.file_tools import FileReadTool
+from agents.tools.line_index import LineIndex, get_line_index
+
+
+def lines_via_index(path, offset: int, limit: int) -> bytes:
+    index = LineIndex(path, os.path.getsize(path))
+    start, end = index.byte_range(offset, limit)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def expected_lines(data: bytes, offset: int, limit: int) -> bytes:
+    lines = data.splitlines(keepends=True)
+    selected = lines[offset : offset + limit] if limit else lines[offset:]
+    return b"".join(selected)
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+@pytest.mark.parametrize("chunk_bytes", [1, 7, 1 << 20])
+def test_byte_range_matches_splitlines(
+    tmp_path, monkeypatch, trailing_newline, chunk_bytes
+):
+    """Every offset/limit window equals the same slice of the lines."""
+    # Small scan chunks put line ends on every chunk boundary
+    monkeypatch.setattr(line_index, "SCAN_CHUNK_BYTES", chunk_bytes)
+    data = b"".join(f"line {i}{'x' * (i % 5)}\n".encode() for i in range(20))
+    data += b"\n\nlast" if not trailing_newline else b"\n"
+    path = tmp_path / "file.txt"
+    path.write_bytes(data)
+    line_count = len(data.splitlines())
+
+    for offset in range(line_count + 2):
+        for limit in (0, 1, 3, line_count + 5):
+            assert lines_via_index(path, offset, limit) == expected_lines(
+                data, offset, limit
+            ), (offset, limit)
+
+
+def test_scan_stops_at_requested_lines(tmp_path, monkeypatch):
+    """Reading the first page of a file does not index all of it."""
+    monkeypatch.setattr(line_index, "SCAN_CHUNK_BYTES", 100)
+    path = tmp_path / "big.txt"
+    path.write_bytes(b"0123456789\n" * 1000)
+    index = LineIndex(path, os.path.getsize(path))
+
+    assert index.byte_range(0, 5) == (0, 55)
+    assert not index.complete
+    assert len(index.starts) < 50
+    assert index.byte_range(998, 0) == (998 * 11, 11000)
+    assert index.complete
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    index = LineIndex(path, 0)
+    assert index.byte_range(0, 10) == (0, 0)
+    assert index.byte_range(5, 0) == (0, 0)
+
+
+def test_index_is_rebuilt_when_file_changes(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"a\nb\n")
+    first = get_line_index(str(path))
+    assert get_line_index(str(path)) is first
+
+    path.write_bytes(b"a\nb\nc\n")
+    os.utime(path, ns=(0, 1))
+    second = get_line_index(str(path))
+    assert second is not first
+    assert second.byte_range(2, 1) == (4, 6)
+
+
+def test_read_tool_pages_and_byte_ranges(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(10)))
+    tool = FileReadTool()
+
+    def read(**kwargs) -> str:
+        return asyncio.run(tool.execute("read", str(path), **kwargs))
+
+    assert read(offset=2, limit=2) == "line 2\nline 3\n"
+    assert read(max_lines=1) == "line 0\n"
+    assert read(offset=9) == "line 9\n"
+    assert read(offset=50) == ""
+    assert read(byte_offset=7, byte_length=6) == "line 1"
+    assert read(byte_offset=63) == "line 9\n"
+
+
+def test_read_tool_truncates_long_output(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(100)))
+    text = asyncio.run(
+        FileReadTool(max_output_bytes=30).execute("read", str(path))
+    )
+
+    # Cut at the last full line within the cap, then the marker
+    assert text.startswith("line 0\nline 1\nline 2\nline 3\n\n[Output")
+    assert "offset/limit" in text
@@ -0,0 +1,177 @@
+"""Tests for mapping MCP tool results to tool_result content.
+
+    pytest agents/test_mcp_tool.py
+"""
+
+import asyncio
+import base64
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.tools import mcp_tool
+from agents.tools.mcp_tool import SPILL_PREVIEW_BYTES, MCPTool
+from agents.tools.spill_store import SpillStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+
+class FakeConnection:
+    """Returns a fixed result, or raises it if it is an exception."""
+
+    def __init__(self, response):
+        self.response = response
+
+    async def call_tool(self, tool_name, arguments):
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+def run(response, tmp_path, **kwargs):
+    tool = MCPTool(
+        name="fetch",
+        description="Fetch something.",
+        input_schema={"type": "object", "properties": {}},
+        connection=FakeConnection(response),
+        spill_store=SpillStore(str(tmp_path)),
+        **kwargs,
+    )
+    return asyncio.run(tool.execute())
+
+
+def result(*content, is_error: bool = False, structured=None):
+    """A CallToolResult as the MCP protocol shapes it."""
+    return SimpleNamespace(
+        content=list(content), isError=is_error, structuredContent=structured
+    )
+
+
+def text(value: str) -> SimpleNamespace:
+    return SimpleNamespace(type="text", text=value)
+
+
+def binary(kind: str, data: bytes, mime_type: str) -> SimpleNamespace:
+    return SimpleNamespace(type=kind, data=b64(data), mimeType=mime_type)
+
+
+def resource(uri: str, **contents) -> SimpleNamespace:
+    """An embedded resource with ``text``, or ``blob`` and ``mimeType``."""
+    contents.setdefault("text", None)
+    return SimpleNamespace(
+        type="resource", resource=SimpleNamespace(uri=uri, **contents)
+    )
+
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def spilled(handle: str) -> bytes:
+    """The bytes of the file a spill handle points to."""
+    path = handle.split(" saved to ")[1].rstrip("]")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_text_parts_are_joined(tmp_path):
+    assert run(result(text("first"), text("second")), tmp_path) == (
+        "first\nsecond"
+    )
+
+
+def test_image_is_passed_on_as_an_image_block(tmp_path):
+    image = binary("image", PNG, "image/png")
+
+    assert run(result(text("A chart:"), image), tmp_path) == [
+        {"type": "text", "text": "A chart:"},
+        {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": "image/png",
+                "data": b64(PNG),
+            },
+        },
+    ]
+
+
+def test_oversized_image_is_spilled(tmp_path, monkeypatch):
+    monkeypatch.setattr(mcp_tool, "MAX_IMAGE_BYTES", 100)
+    image = binary("image", PNG, "image/png")
+
+    block = run(result(image), tmp_path)
+    assert block.startswith("[image (image/png, 264 bytes) saved to ")
+    assert block.endswith(".png]")
+    assert spilled(block) == PNG
+
+
+def test_binary_content_claude_cannot_take_is_spilled(tmp_path):
+    audio = binary("audio", b"RIFF", "audio/wav")
+    blob = resource(
+        "file:///report.pdf",
+        blob=b64(b"%PDF-1.7"),
+        mimeType="application/pdf",
+    )
+
+    first, second = run(result(audio, blob), tmp_path).split("\n")
+    assert first.startswith("[audio (audio/wav, 4 bytes) saved to ")
+    assert spilled(first) == b"RIFF"
+    assert second.startswith(
+        "[resource file:///report.pdf (application/pdf, 8 bytes) saved to "
+    )
+    assert spilled(second) == b"%PDF-1.7"
+
+
+def test_resources_links_and_unknown_parts_become_text(tmp_path):
+    notes = resource("file:///notes.md", text="# Notes")
+    link = SimpleNamespace(
+        type="resource_link", name="spec", uri="https://example.com/spec"
+    )
+    unknown = "a part of an unknown type"
+
+    assert run(result(notes, link, unknown), tmp_path) == (
+        "[resource file:///notes.md]\n# Notes\n"
+        "[resource link spec: https://example.com/spec]\n"
+        "a part of an unknown type"
+    )
+
+
+def test_large_text_is_spilled_with_a_preview(tmp_path):
+    lines = "".join(f"line {i}\n" for i in range(1000))
+
+    output = run(
+        result(text("short"), text(lines)), tmp_path, max_inline_bytes=1000
+    )
+    short, preview = output.split("\n", 1)
+    assert short == "short"
+    kept, note = preview.rsplit("\n", 1)
+    assert lines.startswith(kept + "\n")
+    assert len(kept) < SPILL_PREVIEW_BYTES
+    path = note.split("saved to ")[1].split(",")[0]
+    with open(path) as f:
+        assert f.read() == lines
+
+
+def test_structured_content_without_blocks(tmp_path):
+    assert run(result(structured={"count": 3}), tmp_path) == '{"count": 3}'
+    assert run(result(), tmp_path) == "No content in tool response"
+
+
+@pytest.mark.parametrize(
+    "response, message",
+    [
+        (
+            result(text("not found"), is_error=True),
+            "Error executing fetch: not found",
+        ),
+        (ConnectionError("closed"), "Error executing fetch: closed"),
+    ],
+)
+def test_errors_are_reported_as_text(tmp_path, response, message):
+    assert run(response, tmp_path) == message
@@ -0,0 +1,160 @@
+"""Tests for the simulated prompt cache of the mock Messages API.
+
+The incremental scan must bill exactly what hashing every request from
+scratch would, while only encoding messages new to each request.
+
+    pytest agents/test_mock_client.py
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from itertools import chain
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.test_benchmarks import make_agent, run_turns
+from agents.testing import mock_client
+from agents.testing.mock_client import (
+    CHARS_PER_TOKEN,
+    PromptCache,
+    _message_segments,
+    _prefix_segments,
+)
+from agents.utils.compaction_util import SummaryCompactor
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+class FullScanPromptCache(PromptCache):
+    """Reference: hashes every block of every request from the start."""
+
+    def scan(self, params):
+        digest = hashlib.sha256()
+        total = 0
+        breakpoints = []
+        segments = chain(
+            _prefix_segments(params),
+            *map(_message_segments, params["messages"]),
+        )
+        for segment, marked in segments:
+            data = json.dumps(segment, sort_keys=True, default=str)
+            digest.update(hashlib.sha256(data.encode()).digest())
+            total += -(-len(data) // CHARS_PER_TOKEN)
+            if marked:
+                breakpoints.append((digest.hexdigest(), total))
+        return total, breakpoints
+
+
+def check_against_full_scan(cache: PromptCache) -> list:
+    """Make ``cache`` compare every usage() with the reference."""
+    reference = FullScanPromptCache(cache.min_tokens, cache.ttl)
+    usage = cache.usage
+    results = []
+
+    def checked(params):
+        expected = reference.usage(params)
+        actual = usage(params)
+        assert actual == expected
+        results.append(actual)
+        return actual
+
+    cache.usage = checked
+    return results
+
+
+@pytest.mark.parametrize(
+    "context_window_tokens, compact",
+    [(180000, False), (20000, False), (20000, True)],
+)
+def test_agent_usage_matches_full_scan(context_window_tokens, compact):
+    """Growing, truncated and compacted histories bill the same."""
+    agent = make_agent(
+        context_window_tokens, SummaryCompactor() if compact else None
+    )
+    results = check_against_full_scan(agent.client.prompt_cache)
+
+    asyncio.run(run_turns(agent, 150))
+
+    assert len(results) >= 300
+    assert sum(read for _, read, _ in results) > 0
+    assert sum(written for _, _, written in results) > 0
+
+
+def message(role: str, text: str) -> dict:
+    return {"role": role, "content": [{"type": "text", "text": text * 300}]}
+
+
+def conversation(name: str, length: int) -> list[dict]:
+    return [
+        message("user" if i % 2 else "assistant", f"{name}{i} ")
+        for i in range(length)
+    ]
+
+
+def marked_copy(original: dict) -> dict:
+    block = {**original["content"][-1], "cache_control": CACHE_CONTROL}
+    return {"role": original["role"], "content": [block]}
+
+
+def test_synthetic_requests_match_full_scan():
+    """Interleaved conversations, shared heads, edits and new tools."""
+    cache = PromptCache(min_tokens=100)
+    results = check_against_full_scan(cache)
+    notice = message("user", "[truncated]")
+    tools = [{"name": "think", "input_schema": {"type": "object"}}]
+    first, second = conversation("a", 40), conversation("b", 40)
+
+    def request(messages, system="system " * 300, tools=tools):
+        cache.usage({"system": system, "tools": tools, "messages": messages})
+
+    for end in range(2, 30, 2):
+        for history in (first, second):
+            request([*history[: end - 1], marked_copy(history[end - 1])])
+    # Windows that slide behind a shared notice
+    for start in range(2, 20, 2):
+        for history in (first, second):
+            request([notice, *history[start:30], marked_copy(history[30])])
+    # A message edited in the middle, and one resent as an equal copy
+    edited = [*first[10:20], message("user", "edited "), *first[21:30]]
+    request([notice, *edited, marked_copy(first[30])])
+    request([notice, *first[10:20], dict(first[20]), *first[21:30]])
+    # Marked system blocks and changed tools
+    system = [
+        {
+            "type": "text",
+            "text": "system " * 300,
+            "cache_control": CACHE_CONTROL,
+        }
+    ]
+    request(first[:10], system=system)
+    request(first[:12], system=system, tools=[*tools, {"name": "other"}])
+    request([], system=system)
+
+    assert sum(read for _, read, _ in results) > 0
+
+
+def test_scan_only_encodes_new_messages(monkeypatch):
+    cache = PromptCache()
+    history = conversation("m", 2000)
+    encoded = []
+
+    def counting_segments(message):
+        encoded.append(message)
+        return _message_segments(message)
+
+    monkeypatch.setattr(mock_client, "_message_segments", counting_segments)
+    cache.scan({"system": "system", "messages": history[:1000]})
+    assert len(encoded) == 1000
+
+    for end in range(1002, 2000, 2):
+        encoded.clear()
+        # Slide the window by two, behind a new first message
+        window = [message("user", "notice "), *history[end - 998 : end]]
+        cache.scan({"system": "system", "messages": window})
+        assert len(encoded) == 3
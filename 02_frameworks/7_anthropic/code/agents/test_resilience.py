@@ -0,0 +1,194 @@
+"""Fault-injection tests for retries, rate limiting and circuit breaking.
+
+Agents run against the in-process mock of the Messages API, which fails
+requests on demand: scripted statuses, random overload errors, or 429s
+beyond a server-side rate limit.
+
+    pytest agents/test_resilience.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.agent import Agent
+from agents.runtime import AgentRuntime
+from agents.testing import MockAnthropic, MockAPIError, tool_loop_responder
+from agents.tools.think import ThinkTool
+from agents.utils.rate_util import RateLimiter
+from agents.utils.retry_util import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ModelCallGuard,
+    RetryPolicy,
+)
+
+FAST_RETRIES = RetryPolicy(max_retries=6, base_delay=0.01, max_delay=0.1)
+
+
+def make_agent(client: MockAnthropic, guard: ModelCallGuard) -> Agent:
+    return Agent(
+        name="Resilient",
+        system="You are a helpful assistant.",
+        tools=[ThinkTool()],
+        client=client,
+        call_guard=guard,
+    )
+
+
+def test_transient_errors_are_retried():
+    """429, 529 and 503 are retried and the run completes."""
+    client = MockAnthropic(
+        responder=tool_loop_responder("think", {"thought": "x"}),
+        faults=[429, 529, 503],
+    )
+    guard = ModelCallGuard(FAST_RETRIES, seed=0)
+    response = make_agent(client, guard).run("Hi")
+
+    assert response.stop_reason == "end_turn"
+    assert guard.stats["retries"] == 3
+    # Three failures, then the tool call and the answer
+    assert client.calls == 5
+
+
+def test_tool_work_survives_failure_after_tool_call():
+    """A failure after a tool ran keeps its result in the history."""
+    client = MockAnthropic(
+        responder=tool_loop_responder("think", {"thought": "x"})
+    )
+    agent = make_agent(client, ModelCallGuard(FAST_RETRIES, seed=0))
+    original = client.messages.create
+
+    async def fail_second_call(**params):
+        if client.calls == 1:
+            client.faults.append(529)
+        return await original(**params)
+
+    client.messages.create = fail_second_call
+    response = agent.run("Hi")
+
+    assert response.stop_reason == "end_turn"
+    results = [
+        block
+        for message in agent.history.messages
+        if isinstance(message["content"], list)
+        for block in message["content"]
+        if isinstance(block, dict) and block.get("type") == "tool_result"
+    ]
+    assert len(results) == 1
+
+
+def test_client_errors_are_not_retried():
+    """A 400 is raised at once."""
+    client = MockAnthropic(faults=[400])
+    guard = ModelCallGuard(FAST_RETRIES, seed=0)
+
+    with pytest.raises(MockAPIError):
+        make_agent(client, guard).run("Hi")
+    assert client.calls == 1
+    assert guard.stats["retries"] == 0
+
+
+def test_retry_after_is_honored():
+    """The wait before a retry is at least the server's retry-after."""
+    guard = ModelCallGuard(FAST_RETRIES, seed=0)
+    error = MockAPIError(429, "Rate limited", {"retry-after": "0.2"})
+    delay = guard.on_failure(error, attempt=0)
+    assert 0.2 <= delay <= 0.22
+
+    error = MockAPIError(429, "Rate limited", {"retry-after": "120"})
+    assert guard.on_failure(error, attempt=0) is None
+
+
+def test_circuit_breaker_sheds_load():
+    """Repeated overload opens the circuit; calls then fail fast."""
+    client = MockAnthropic(overload_rate=1.0)
+    guard = ModelCallGuard(
+        RetryPolicy(max_retries=10, base_delay=0.001),
+        breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60),
+        seed=0,
+    )
+
+    with pytest.raises(CircuitOpenError):
+        make_agent(client, guard).run("Hi")
+    assert client.calls == 3
+
+    with pytest.raises(CircuitOpenError):
+        make_agent(client, guard).run("Hi again")
+    assert client.calls == 3
+    assert guard.breaker.state == "open"
+
+
+def test_circuit_breaker_recovers():
+    """After the reset timeout a successful probe closes the circuit."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    guard = ModelCallGuard(FAST_RETRIES, breaker=breaker, seed=0)
+    client = MockAnthropic(faults=[529, 529])
+
+    with pytest.raises(CircuitOpenError):
+        make_agent(client, guard).run("Hi")
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+
+    response = make_agent(client, guard).run("Hi again")
+    assert response.stop_reason == "end_turn"
+    assert breaker.state == "closed"
+
+
+async def run_sessions(
+    client: MockAnthropic, guard: ModelCallGuard, sessions: int, turns: int
+) -> float:
+    """Run concurrent sessions; returns accepted requests per second."""
+
+    async def session() -> None:
+        agent = make_agent(client, guard)
+        for turn in range(turns):
+            await agent.run_async(f"Question {turn}")
+
+    start = time.monotonic()
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    return (client.calls - client.errors) / (time.monotonic() - start)
+
+
+def test_throughput_under_rate_limiting():
+    """A shared limiter keeps throughput at the server's limit.
+
+    40 sessions of 10 turns send 800 requests to a mock that accepts 400
+    per second. With a limiter shared by all agents, requests are paced
+    and accepted on the first try. Without it, every turn still
+    completes thanks to retries, at the cost of many rejected requests.
+    """
+    rate = 400
+    responder = tool_loop_responder("think", {"thought": "x"})
+    policy = RetryPolicy(max_retries=10, base_delay=0.01, max_delay=1.0)
+
+    client = MockAnthropic(responder=responder, rate_limit=rate)
+    guard = ModelCallGuard(
+        policy,
+        rate_limiter=RateLimiter(requests_per_minute=rate * 60 * 0.95),
+        seed=0,
+    )
+    throughput = asyncio.run(run_sessions(client, guard, 40, 10))
+    assert client.calls - client.errors == 800
+    assert client.errors <= 40
+    assert throughput >= 0.8 * rate
+    limited_errors = client.errors
+
+    client = MockAnthropic(responder=responder, rate_limit=rate)
+    guard = ModelCallGuard(policy, seed=0)
+    asyncio.run(run_sessions(client, guard, 40, 10))
+    assert client.calls - client.errors == 800
+    assert guard.stats["rate_limited"] == client.errors > limited_errors
+
+
+def test_default_clients_leave_retries_to_the_guard():
+    """SDK retries would run inside the guard and hide failures from it."""
+    agent = Agent(name="Default", system="You are a helpful assistant.")
+    assert agent.client.max_retries == 0
+    assert AgentRuntime().client.max_retries == 0
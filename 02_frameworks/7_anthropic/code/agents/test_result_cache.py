@@ -0,0 +1,166 @@
+"""Tests for memoized tool results.
+
+    pytest agents/test_result_cache.py
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.tools.mcp_tool import MCPTool
+from agents.tools.result_cache import (
+    MISSING,
+    ToolResultCache,
+    default_result_cache,
+)
+from agents.utils.connections import _config_key
+
+
+class FakeServer:
+    """Answers every tool call with its name and a call count."""
+
+    def __init__(self, name: str, error: bool = False):
+        self.name = name
+        self.error = error
+        self.calls = 0
+
+    async def call_tool(self, tool_name, arguments):
+        self.calls += 1
+        text = f"{self.name}:{tool_name}:{arguments}:{self.calls}"
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=text)],
+            isError=self.error,
+        )
+
+
+def read_only_tool(server: FakeServer, server_key=None) -> MCPTool:
+    return MCPTool(
+        name="lookup",
+        description="Read-only lookup.",
+        input_schema={"type": "object", "properties": {}},
+        connection=server,
+        cacheable=True,
+        server_key=server_key,
+    )
+
+
+def run(tool: MCPTool, **kwargs):
+    return asyncio.run(tool.run(**kwargs))
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    default_result_cache.clear()
+    yield
+    default_result_cache.clear()
+
+
+def test_repeated_call_is_served_from_cache():
+    server = FakeServer("a")
+    tool = read_only_tool(server)
+
+    first = run(tool, q="x")
+    assert run(tool, q="x") == first
+    assert server.calls == 1
+
+
+def test_changed_arguments_miss():
+    server = FakeServer("a")
+    tool = read_only_tool(server)
+
+    assert run(tool, q="x") != run(tool, q="y")
+    assert run(tool, q="x", limit=1) != run(tool, q="x")
+    assert server.calls == 3
+
+
+@pytest.mark.parametrize("keyed_by_config", [True, False])
+def test_same_tool_on_different_servers_misses(keyed_by_config):
+    first, second = FakeServer("a"), FakeServer("b")
+    keys = (
+        (_config_key({"command": "a"}), _config_key({"command": "b"}))
+        if keyed_by_config
+        else (None, None)
+    )
+    tools = [
+        read_only_tool(server, key)
+        for server, key in zip((first, second), keys)
+    ]
+
+    assert run(tools[0], q="x").startswith("a:")
+    assert run(tools[1], q="x").startswith("b:")
+    assert (first.calls, second.calls) == (1, 1)
+
+
+def test_same_server_config_shares_results():
+    """Tools listed again after a reconnect keep their cached results."""
+    config = {"command": "server", "args": ["--read-only"]}
+    server = FakeServer("a")
+    before = read_only_tool(server, _config_key(config))
+    after = read_only_tool(FakeServer("b"), _config_key(dict(config)))
+
+    result = run(before, q="x")
+    assert run(after, q="x") == result
+    assert server.calls == 1
+
+
+def test_errors_and_non_cacheable_tools_always_run():
+    server = FakeServer("a", error=True)
+    tool = read_only_tool(server)
+    assert run(tool, q="x").startswith("Error")
+    assert run(tool, q="x").startswith("Error")
+    assert server.calls == 2
+
+    server = FakeServer("a")
+    tool = read_only_tool(server)
+    tool.cacheable = False
+    run(tool, q="x")
+    run(tool, q="x")
+    assert server.calls == 2
+
+
+def test_clear_and_invalidate():
+    cache = ToolResultCache()
+    cache.put("a", 1, tags=("/tmp/a",))
+    cache.put("b", 2, tags=("/tmp/a", "/tmp/b"))
+    cache.put("c", 3)
+
+    cache.invalidate("/tmp/a")
+    assert cache.get("a") is MISSING
+    assert cache.get("b") is MISSING
+    assert cache.get("c") == 3
+
+    cache.clear()
+    assert cache.get("c") is MISSING
+
+    server = FakeServer("a")
+    tool = read_only_tool(server)
+    run(tool, q="x")
+    default_result_cache.clear()
+    run(tool, q="x")
+    assert server.calls == 2
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    cache = ToolResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is MISSING
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+    now = 1000.0
+    monkeypatch.setattr(
+        "agents.tools.result_cache.time.monotonic", lambda: now
+    )
+    cache.put("d", 4, ttl=10)
+    now += 9
+    assert cache.get("d") == 4
+    now += 2
+    assert cache.get("d") is MISSING
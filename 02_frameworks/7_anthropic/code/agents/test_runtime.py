@@ -0,0 +1,85 @@
+"""Tests for admission control in the agent runtime.
+
+    pytest agents/test_runtime.py
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.load_test import format_percentiles
+from agents.runtime import AdmissionError, AgentDefinition, AgentRuntime
+from agents.testing import MockAnthropic
+
+DEFINITION = AgentDefinition(name="Runtime", system="You are helpful.")
+
+
+def run_turns(runtime: AgentRuntime, count: int) -> list:
+    """Start ``count`` turns, each in its own session, at the same time."""
+
+    async def run():
+        sessions = [
+            runtime.create_session(DEFINITION) for _ in range(count)
+        ]
+        return await asyncio.gather(
+            *(runtime.run(session.id, "Hi") for session in sessions),
+            return_exceptions=True,
+        )
+
+    return asyncio.run(run())
+
+
+def test_turns_beyond_the_pending_limit_are_rejected():
+    runtime = AgentRuntime(
+        client=MockAnthropic(latency=0.05), max_concurrent=2, max_pending=1
+    )
+
+    results = run_turns(runtime, 5)
+
+    rejected = [r for r in results if isinstance(r, AdmissionError)]
+    assert len(rejected) == 2
+    assert (runtime.completed, runtime.rejected) == (3, 2)
+    assert runtime.active == runtime.pending == 0
+
+
+def test_waiting_turn_times_out():
+    runtime = AgentRuntime(
+        client=MockAnthropic(latency=0.2),
+        max_concurrent=1,
+        admission_timeout=0.05,
+    )
+
+    first, second = run_turns(runtime, 2)
+
+    assert first.stop_reason == "end_turn"
+    assert isinstance(second, AdmissionError)
+    assert "No turn slot free" in str(second)
+    assert (runtime.completed, runtime.rejected) == (1, 1)
+
+
+def test_session_limit():
+    runtime = AgentRuntime(client=MockAnthropic(), max_sessions=1)
+    session = runtime.create_session(DEFINITION)
+
+    with pytest.raises(AdmissionError):
+        runtime.create_session(DEFINITION)
+    runtime.close_session(session.id)
+    runtime.create_session(DEFINITION)
+    assert runtime.rejected == 1
+
+
+@pytest.mark.parametrize(
+    "latencies, expected",
+    [
+        ([], "no turns completed"),
+        ([0.002], "p50 2.0 ms, p95 2.0 ms, p99 2.0 ms"),
+        ([0.001, 0.003], "p50 2.0 ms, p95 2.9 ms, p99 3.0 ms"),
+    ],
+)
+def test_load_test_percentiles(latencies, expected):
+    assert format_percentiles(latencies) == expected
@@ -0,0 +1,122 @@
+"""Tests for the trigram prefilter used by file search.
+
+The prefilter may let through files that do not match, but must never
+drop one that does: every trigram required by query_trigrams() has to
+occur in any text the regex matches.
+
+    pytest agents/test_trigram_index.py
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.tools.trigram_index import (
+    TrigramIndex,
+    file_trigrams,
+    query_trigrams,
+    required_literals,
+)
+
+
+@pytest.mark.parametrize(
+    "pattern, literals",
+    [
+        ("hello", ["hello"]),
+        (r"foo\.bar", ["foo.bar"]),
+        # Escapes with an argument decode to one character
+        (r"foo\x41bar", ["fooAbar"]),
+        (r"fooAbar", ["fooAbar"]),
+        (r"foo\U00000041bar", ["fooAbar"]),
+        (r"foo\N{LATIN CAPITAL LETTER A}bar", ["fooAbar"]),
+        (r"foo\101bar", ["fooAbar"]),
+        (r"foo\0bar", ["foo\0bar"]),
+        (r"foo\07bar", ["foo\7bar"]),
+        (r"foo\tbar", ["foo\tbar"]),
+        # Backreferences and classes end the literal, digits included
+        (r"(ab)cd\1efg", ["cd", "efg"]),
+        (r"(a)(b)(c)(d)(e)(f)(g)(h)(i)(j)xy\10zw", ["xy", "zw"]),
+        (r"foo\dbar", ["foo", "bar"]),
+        (r"foo\bbar", ["foo", "bar"]),
+        # Malformed escapes give up on the character
+        (r"foo\x4", ["foo"]),
+        (r"foo\N{NOT A NAME}bar", ["foo", "bar"]),
+        # Character classes
+        ("foo[abc]bar", ["foo", "bar"]),
+        ("foo[]x]bar", ["foo", "bar"]),
+        (r"foo[\]]bar", ["foo", "bar"]),
+        ("foo[^)]bar", ["foo", "bar"]),
+        # Quantifiers and optional groups
+        ("colou?r", ["colo", "r"]),
+        ("ab*cd", ["a", "cd"]),
+        ("ab+cd", ["ab", "cd"]),
+        ("ab{0,2}cd", ["a", "cd"]),
+        ("foo(bar)?baz", ["foo", "baz"]),
+        ("foo(?:bar|qux)baz", []),
+        ("foo(bar)*baz", ["foo", "baz"]),
+        # Alternation and verbose mode give up entirely
+        ("foo|bar", []),
+        ("(?x) foo bar", []),
+        ("^foo.*bar$", ["foo", "bar"]),
+    ],
+)
+def test_required_literals(pattern, literals):
+    assert required_literals(pattern) == literals
+
+
+MATCHING_TEXTS = [
+    ("foo\\x41bar", "xx fooAbar yy"),
+    ("foo\\u0041bar", "fooAbar"),
+    ("foo\\N{LATIN CAPITAL LETTER A}bar", "fooAbar"),
+    ("foo\\101bar", "fooAbar"),
+    ("foo\\0bar", "foo\0bar"),
+    ("(ab)cd\\1efg", "abcdabefg"),
+    ("foo[abc]bar", "fooabar"),
+    ("colou?r", "color"),
+    ("ab*cd", "acd"),
+    ("ab+cd", "abbbcd"),
+    ("foo(bar)?baz", "foobaz"),
+    ("foo|bar", "bar"),
+    ("(?i)HELLO world", "hello WORLD"),
+    ("def \\w+\\(self", "    def run(self, x):"),
+]
+
+
+@pytest.mark.parametrize("pattern, text", MATCHING_TEXTS)
+@pytest.mark.parametrize("ignore_case", [False, True])
+def test_matching_text_has_every_required_trigram(pattern, text, ignore_case):
+    flags = re.IGNORECASE if ignore_case else 0
+    assert re.search(pattern, text, flags)
+    grams = query_trigrams(pattern, regex=True, ignore_case=ignore_case)
+    assert grams <= set(file_trigrams(text.encode("utf-8")))
+
+
+def test_index_finds_files_matching_escapes(tmp_path):
+    (tmp_path / "hit.txt").write_text("prefix fooAbar suffix")
+    (tmp_path / "miss.txt").write_text("nothing here")
+    index = TrigramIndex(str(tmp_path), str(tmp_path / "index.idx"))
+    index.update()
+
+    for pattern in (r"foo\x41bar", r"foo\101bar", r"(foo)\x41bar"):
+        grams = query_trigrams(pattern, regex=True, ignore_case=False)
+        assert list(index.candidates(grams)) == ["hit.txt"], pattern
+
+
+def test_candidates_survive_an_update_while_iterating(tmp_path):
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (tmp_path / name).write_text("prefix needle suffix")
+    index = TrigramIndex(str(tmp_path), str(tmp_path / "index.idx"))
+    index.update()
+    grams = query_trigrams("needle", regex=False, ignore_case=False)
+
+    candidates = index.candidates(grams)
+    assert next(candidates) == "a.txt"
+    os.remove(tmp_path / "b.txt")
+    index.update()
+    assert list(candidates) == ["b.txt", "c.txt"]
+    assert list(index.candidates(grams)) == ["a.txt", "c.txt"]
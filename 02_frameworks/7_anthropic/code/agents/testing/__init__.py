@@ -0,0 +1,25 @@
+"""Local stand-ins for the Anthropic API, for tests and benchmarks."""
+
+from .mock_client import (
+    MockAnthropic,
+    MockAPIError,
+    MockMessage,
+    PromptCache,
+    ScriptedResponder,
+    text_block,
+    text_responder,
+    tool_loop_responder,
+    tool_use_block,
+)
+
+__all__ = [
+    "MockAnthropic",
+    "MockAPIError",
+    "MockMessage",
+    "PromptCache",
+    "ScriptedResponder",
+    "text_block",
+    "text_responder",
+    "tool_loop_responder",
+    "tool_use_block",
+]
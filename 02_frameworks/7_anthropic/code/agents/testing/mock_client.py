@@ -0,0 +1,665 @@
+"""Deterministic in-process stand-in for the Anthropic Messages API."""
+
+import asyncio
+import copy
+import hashlib
+import json
+import random
+import re
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterable
+from dataclasses import dataclass, field
+from itertools import compress, count
+from operator import is_not
+from types import SimpleNamespace
+from typing import Any
+
+from ..utils.rate_util import TokenBucket
+
+# Usage is reported as characters / 4, which is cheap to compute
+CHARS_PER_TOKEN = 4
+# Shortest prefix the API will cache, as for Sonnet and Opus models
+MIN_CACHE_TOKENS = 1024
+CACHE_TTL = 300.0
+# Size of the per-block digests that prefix keys are built from
+DIGEST_BYTES = hashlib.sha256().digest_size
+# Rolling hash over a conversation's messages: a Mersenne prime modulus
+HASH_MODULUS = 2**61 - 1
+HASH_BASE = 1_000_003
+# Conversations are trimmed once this many sent messages fell out of them
+TRIM_MESSAGES = 64
+
+
+@dataclass
+class MockUsage:
+    input_tokens: int
+    output_tokens: int
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+
+
+@dataclass
+class MockBlock:
+    """A text or tool_use content block."""
+
+    type: str
+    text: str | None = None
+    id: str | None = None
+    name: str | None = None
+    input: dict[str, Any] | None = None
+
+    def model_dump(self, exclude_none: bool = False) -> dict[str, Any]:
+        data = {
+            "type": self.type,
+            "text": self.text,
+            "id": self.id,
+            "name": self.name,
+            "input": self.input,
+        }
+        if exclude_none:
+            data = {k: v for k, v in data.items() if v is not None}
+        return data
+
+
+@dataclass
+class MockMessage:
+    content: list[MockBlock]
+    usage: MockUsage
+    model: str = "mock"
+    role: str = "assistant"
+    stop_reason: str = "end_turn"
+    id: str = "msg_mock"
+    type: str = "message"
+
+
+@dataclass
+class MockStreamEvent:
+    type: str
+    text: str | None = None
+    content_block: MockBlock | None = None
+
+
+@dataclass
+class MockTokenCount:
+    input_tokens: int
+
+
+class MockAPIError(Exception):
+    """An error response, shaped like anthropic.APIStatusError."""
+
+    def __init__(
+        self,
+        status_code: int,
+        message: str,
+        headers: dict[str, str] | None = None,
+    ):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+        self.message = message
+        self.response = SimpleNamespace(
+            status_code=status_code, headers=headers or {}
+        )
+
+
+# Maps request params to the content blocks of the reply
+Responder = Callable[[dict[str, Any]], list[dict[str, Any]]]
+
+
+def text_block(text: str) -> dict[str, Any]:
+    return {"type": "text", "text": text}
+
+
+def tool_use_block(
+    name: str, tool_input: dict[str, Any], id: str | None = None
+) -> dict[str, Any]:
+    """A tool_use block; the mock assigns an id if none is given."""
+    return {"type": "tool_use", "id": id, "name": name, "input": tool_input}
+
+
+def text_responder(params: dict[str, Any]) -> list[dict[str, Any]]:
+    """Reply with a short text that says how many messages were sent."""
+    count = len(params["messages"])
+    return [text_block(f"Reply to {count} messages.")]
+
+
+def tool_loop_responder(
+    tool_name: str,
+    tool_input: dict[str, Any] | None = None,
+    tool_calls: int = 1,
+    parallel: int = 1,
+    answer: str = "Here is the answer.",
+) -> Responder:
+    """Call a tool ``tool_calls`` times per user message, then answer.
+
+    Each call round requests ``parallel`` tool_use blocks at once.
+    """
+    tool_input = tool_input or {}
+
+    def respond(params: dict[str, Any]) -> list[dict[str, Any]]:
+        rounds = 0
+        for message in reversed(params["messages"]):
+            content = message["content"]
+            if message["role"] != "user":
+                continue
+            if isinstance(content, str) or not any(
+                block.get("type") == "tool_result" for block in content
+            ):
+                break
+            rounds += 1
+        if rounds >= tool_calls:
+            return [text_block(answer)]
+        return [text_block(f"Calling {tool_name}.")] + [
+            tool_use_block(tool_name, dict(tool_input))
+            for _ in range(parallel)
+        ]
+
+    return respond
+
+
+class ScriptedResponder:
+    """Replies with a fixed sequence of responses, in order.
+
+    Each response is a list of blocks (or a single text string). With
+    ``cycle`` the script starts over when it runs out; otherwise running
+    out raises IndexError.
+    """
+
+    def __init__(
+        self,
+        script: Iterable[list[dict[str, Any]] | str],
+        cycle: bool = False,
+    ):
+        self.script = [
+            [text_block(step)] if isinstance(step, str) else step
+            for step in script
+        ]
+        self.cycle = cycle
+        self.position = 0
+
+    def __call__(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        if self.position >= len(self.script):
+            if not self.cycle:
+                raise IndexError("Mock script exhausted")
+            self.position = 0
+        step = self.script[self.position]
+        self.position += 1
+        return copy.deepcopy(step)
+
+
+def _tokens(value: Any) -> int:
+    if value is None:
+        return 0
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return -(-len(value) // CHARS_PER_TOKEN)
+
+
+def _plain(block: Any) -> Any:
+    """A block as a dict without cache_control, for hashing."""
+    if hasattr(block, "model_dump"):
+        block = block.model_dump(exclude_none=True)
+    if isinstance(block, dict) and "cache_control" in block:
+        block = {k: v for k, v in block.items() if k != "cache_control"}
+    return block
+
+
+def _prefix_segments(params: dict[str, Any]) -> Iterable[tuple[Any, bool]]:
+    """Tools and system prompt pieces, with their breakpoint flag."""
+    for tool in params.get("tools") or []:
+        yield _plain(tool), "cache_control" in tool
+    system = params.get("system")
+    if isinstance(system, str):
+        yield system, False
+    else:
+        for block in system or []:
+            yield _plain(block), "cache_control" in block
+
+
+def _message_segments(message: dict[str, Any]) -> Iterable[tuple[Any, bool]]:
+    """Content blocks of a message, with their breakpoint flag."""
+    content = message["content"]
+    if isinstance(content, str):
+        yield (message["role"], content), False
+        return
+    for block in content:
+        marked = isinstance(block, dict) and "cache_control" in block
+        yield (message["role"], _plain(block)), marked
+
+
+def _common_prefix(a: list, b: list) -> int:
+    """Length of the common prefix of two lists, by identity, in C."""
+    return next(
+        compress(count(), map(is_not, a, b)), min(len(a), len(b))
+    )
+
+
+class _Conversation:
+    """Messages sent in one conversation, with running totals.
+
+    Requests resend a window of these, possibly behind a different first
+    message (a truncation notice or summary). Token counts and a rolling
+    hash accumulated over the messages give the totals for any window in
+    O(1), so only messages new to a request need to be encoded.
+    """
+
+    def __init__(self):
+        # Absolute position of messages[0]; earlier messages are trimmed
+        self.offset = 0
+        # The messages (which keeps their ids from being reused), their
+        # encodings, and the running hash and tokens before each one
+        self.messages: list[Any] = []
+        self.encoded: list[tuple] = []
+        self.hashes = [0]
+        self.tokens = [0]
+        # Absolute positions of messages with cache_control
+        self.marked: list[int] = []
+
+    @property
+    def end(self) -> int:
+        return self.offset + len(self.messages)
+
+    def append(self, message: Any, encoded: tuple) -> None:
+        _, tokens, marks, value = encoded
+        if marks:
+            self.marked.append(self.end)
+        self.messages.append(message)
+        self.encoded.append(encoded)
+        self.hashes.append(
+            (self.hashes[-1] * HASH_BASE + value) % HASH_MODULUS
+        )
+        self.tokens.append(self.tokens[-1] + tokens)
+
+    def truncate(self, end: int) -> list[Any]:
+        """Drop messages from absolute position ``end``; returns them."""
+        i = end - self.offset
+        dropped = self.messages[i:]
+        del self.messages[i:], self.encoded[i:]
+        del self.hashes[i + 1 :], self.tokens[i + 1 :]
+        del self.marked[bisect_left(self.marked, end) :]
+        return dropped
+
+    def trim(self, start: int) -> list[Any]:
+        """Drop messages before absolute position ``start``; returns them."""
+        i = start - self.offset
+        dropped = self.messages[:i]
+        del self.messages[:i], self.encoded[:i]
+        del self.hashes[:i], self.tokens[:i]
+        del self.marked[: bisect_left(self.marked, start)]
+        self.offset = start
+        return dropped
+
+    def window_hash(self, start: int, end: int) -> int:
+        """Rolling hash of the messages in [start, end)."""
+        i, j = start - self.offset, end - self.offset
+        shift = pow(HASH_BASE, j - i, HASH_MODULUS)
+        return (self.hashes[j] - self.hashes[i] * shift) % HASH_MODULUS
+
+    def window_tokens(self, start: int, end: int) -> int:
+        i, j = start - self.offset, end - self.offset
+        return self.tokens[j] - self.tokens[i]
+
+
+class PromptCache:
+    """Simulated prompt cache keyed by the hash of each cached prefix.
+
+    A request reads the longest previously cached prefix ending at one of
+    its breakpoints and writes the prefixes up to its later breakpoints;
+    the rest is billed as uncached input. Prefixes shorter than
+    ``min_tokens`` are not cached, and entries expire ``ttl`` seconds
+    after they were last used.
+
+    So that the mock's own cost per request stays small next to the code
+    being measured, messages are tracked per conversation by object
+    identity (agents resend the same message objects every turn) and a
+    prefix is keyed by a rolling hash over its messages: a request costs
+    O(new messages), also when truncation slides the window each turn.
+    """
+
+    def __init__(
+        self,
+        min_tokens: int = MIN_CACHE_TOKENS,
+        ttl: float = CACHE_TTL,
+        max_encoded: int = 100_000,
+        max_conversations: int = 64,
+    ):
+        self.min_tokens = min_tokens
+        self.ttl = ttl
+        self.max_encoded = max_encoded
+        self.max_conversations = max_conversations
+        self._entries: dict[str, float] = {}
+        # id(message) -> (message, (block digests, tokens, marks, hash))
+        self._encoded: OrderedDict[int, tuple[Any, tuple]] = OrderedDict()
+        self._conversations: OrderedDict[_Conversation, None] = (
+            OrderedDict()
+        )
+        # id(message) -> (conversation, absolute position)
+        self._positions: dict[int, tuple[_Conversation, int]] = {}
+        # (tools, system, encoding) of the last request
+        self._prefix: tuple[Any, Any, tuple] | None = None
+
+    @staticmethod
+    def _encode(
+        segments: Iterable[tuple[Any, bool]]
+    ) -> tuple[bytes, int, tuple[tuple[int, int], ...], int]:
+        """Block digests, tokens, (blocks, tokens) up to each marked block,
+        and a hash of the whole for the rolling hash."""
+        digests = []
+        tokens = 0
+        marks = []
+        for segment, marked in segments:
+            data = json.dumps(segment, sort_keys=True, default=str).encode()
+            digests.append(hashlib.sha256(data).digest())
+            tokens += -(-len(data) // CHARS_PER_TOKEN)
+            if marked:
+                marks.append((len(digests), tokens))
+        blocks = b"".join(digests)
+        value = int.from_bytes(hashlib.sha256(blocks).digest()[:8], "big")
+        return blocks, tokens, tuple(marks), value % HASH_MODULUS
+
+    def _encode_message(self, message: dict[str, Any]) -> tuple:
+        entry = self._encoded.get(id(message))
+        if entry is not None and entry[0] is message:
+            return entry[1]
+        encoded = self._encode(_message_segments(message))
+        # Keep a reference so the id is not reused while memoized
+        self._encoded[id(message)] = (message, encoded)
+        if len(self._encoded) > self.max_encoded:
+            self._encoded.popitem(last=False)
+        return encoded
+
+    def _encode_prefix(self, params: dict[str, Any]) -> tuple:
+        """Encoding of the tools and system prompt, reused while they are
+        equal to the last request's (comparing them runs in C)."""
+        tools, system = params.get("tools"), params.get("system")
+        last = self._prefix
+        if last is None or last[0] != tools or last[1] != system:
+            encoded = self._encode(_prefix_segments(params))
+            last = (copy.deepcopy(tools), copy.deepcopy(system), encoded)
+            self._prefix = last
+        return last[2]
+
+    def _forget(self, conversation: _Conversation, messages: list) -> None:
+        for message in messages:
+            position = self._positions.get(id(message))
+            if position is not None and position[0] is conversation:
+                del self._positions[id(message)]
+
+    def _locate(self, messages: list) -> tuple[_Conversation, int, int]:
+        """Match a request's messages to a conversation.
+
+        Returns the conversation, the absolute position there of the
+        request's first tracked message, and whether the request's first
+        message is a head outside the conversation (0 or 1). The
+        conversation is brought up to date with the request first.
+        """
+        best = None
+        for head in (0, 1)[: len(messages)]:
+            position = self._positions.get(id(messages[head]))
+            if position is None:
+                continue
+            conversation, start = position
+            i = start - conversation.offset
+            rest = messages[head:]
+            same = _common_prefix(
+                rest, conversation.messages[i : i + len(rest)]
+            )
+            if best is None or same > best[3]:
+                best = (conversation, start, head, same)
+
+        if best is None:
+            conversation = _Conversation()
+            start, head, same = 0, 0, 0
+        else:
+            conversation, start, head, same = best
+            self._conversations.move_to_end(conversation)
+            self._forget(conversation, conversation.truncate(start + same))
+
+        self._conversations[conversation] = None
+        for message in messages[head + same :]:
+            self._positions[id(message)] = (conversation, conversation.end)
+            conversation.append(message, self._encode_message(message))
+
+        if start - conversation.offset > max(
+            TRIM_MESSAGES, len(conversation.messages) // 2
+        ):
+            self._forget(conversation, conversation.trim(start))
+        if len(self._conversations) > self.max_conversations:
+            evicted, _ = self._conversations.popitem(last=False)
+            self._forget(evicted, evicted.messages)
+        return conversation, start, head
+
+    def scan(
+        self, params: dict[str, Any]
+    ) -> tuple[int, list[tuple[str, int]]]:
+        """Total input tokens and the (hash, tokens) of each breakpoint."""
+        prefix, total, prefix_marks, _ = self._encode_prefix(params)
+        breakpoints = [
+            (hashlib.sha256(prefix[: blocks * DIGEST_BYTES]).hexdigest(), end)
+            for blocks, end in prefix_marks
+        ]
+        messages = params["messages"]
+        if not messages:
+            return total, breakpoints
+
+        def key(value: int, sent: int, blocks: bytes, length: int) -> str:
+            """Key of the prefix ending ``length`` blocks into a message,
+            after ``sent`` messages whose rolling hash is ``value``."""
+            data = b"%s:%d:%d:%s" % (
+                prefix,
+                value,
+                sent,
+                blocks[: length * DIGEST_BYTES],
+            )
+            return hashlib.sha256(data).hexdigest()
+
+        conversation, start, head = self._locate(messages)
+        value = 0
+        if head:
+            blocks, tokens, marks, value = self._encode_message(messages[0])
+            breakpoints.extend(
+                (key(0, 0, blocks, length), total + end)
+                for length, end in marks
+            )
+            total += tokens
+
+        stop = start + len(messages) - head
+        marked = conversation.marked
+        for position in marked[
+            bisect_left(marked, start) : bisect_left(marked, stop)
+        ]:
+            sent = position - start
+            rolling = (
+                value * pow(HASH_BASE, sent, HASH_MODULUS)
+                + conversation.window_hash(start, position)
+            ) % HASH_MODULUS
+            before = total + conversation.window_tokens(start, position)
+            blocks, _, marks, _ = conversation.encoded[
+                position - conversation.offset
+            ]
+            breakpoints.extend(
+                (key(rolling, head + sent, blocks, length), before + end)
+                for length, end in marks
+            )
+        return total + conversation.window_tokens(start, stop), breakpoints
+
+    def usage(self, params: dict[str, Any]) -> tuple[int, int, int]:
+        """Return (uncached, cache read, cache write) input tokens."""
+        now = time.monotonic()
+        total, breakpoints = self.scan(params)
+        breakpoints = [
+            (key, tokens)
+            for key, tokens in breakpoints
+            if tokens >= self.min_tokens
+        ]
+
+        read = 0
+        for key, tokens in reversed(breakpoints):
+            expiry = self._entries.get(key)
+            if expiry is not None and expiry > now:
+                read = tokens
+                break
+
+        written = read
+        for key, tokens in breakpoints:
+            if tokens >= read:
+                self._entries[key] = now + self.ttl
+                written = tokens
+        return total - written, read, written - read
+
+
+class MockStream:
+    """Async context manager mirroring messages.stream()."""
+
+    def __init__(self, messages: "MockMessages", params: dict[str, Any]):
+        self._messages = messages
+        self._params = params
+        self._message: MockMessage | None = None
+
+    async def __aenter__(self) -> "MockStream":
+        self._message = await self._messages.create(**self._params)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+    def __aiter__(self) -> AsyncIterator[MockStreamEvent]:
+        return self._events()
+
+    async def _events(self) -> AsyncIterator[MockStreamEvent]:
+        delay = self._messages._client.token_latency
+        for block in self._message.content:
+            if block.type == "text":
+                for delta in re.findall(r"\S+\s*|\s+", block.text):
+                    if delay:
+                        await asyncio.sleep(delay)
+                    yield MockStreamEvent("text", text=delta)
+            yield MockStreamEvent("content_block_stop", content_block=block)
+
+    async def get_final_message(self) -> MockMessage:
+        return self._message
+
+
+class MockMessages:
+    """The ``messages`` resource of MockAnthropic."""
+
+    def __init__(self, client: "MockAnthropic"):
+        self._client = client
+
+    async def create(self, **params: Any) -> MockMessage:
+        client = self._client
+        client.calls += 1
+        client._inject_fault()
+        if client.record:
+            # Callers may reuse and mutate the payload between requests
+            client.requests.append(copy.deepcopy(params))
+        latency = client.latency
+        if client.jitter:
+            latency += client.random.uniform(0, client.jitter)
+        if latency:
+            await asyncio.sleep(latency)
+
+        blocks = []
+        for block in client.responder(params):
+            if block.get("type") == "tool_use" and not block.get("id"):
+                client.tool_ids += 1
+                block = {**block, "id": f"toolu_mock_{client.tool_ids:06d}"}
+            blocks.append(MockBlock(**block))
+        stop_reason = (
+            "tool_use"
+            if any(block.type == "tool_use" for block in blocks)
+            else "end_turn"
+        )
+
+        if client.cache_prompts:
+            uncached, read, written = client.prompt_cache.usage(params)
+        else:
+            uncached, read, written = client.prompt_cache.scan(params)[0], 0, 0
+        usage = MockUsage(
+            input_tokens=uncached,
+            output_tokens=sum(
+                _tokens(block.text if block.type == "text" else block.input)
+                for block in blocks
+            ),
+            cache_read_input_tokens=read,
+            cache_creation_input_tokens=written,
+        )
+        return MockMessage(
+            content=blocks,
+            usage=usage,
+            model=params.get("model", "mock"),
+            stop_reason=stop_reason,
+            id=f"msg_mock_{client.calls:06d}",
+        )
+
+    def stream(self, **params: Any) -> MockStream:
+        return MockStream(self, params)
+
+    async def count_tokens(self, **params: Any) -> MockTokenCount:
+        self._client.token_counts += 1
+        return MockTokenCount(self._client.prompt_cache.scan(params)[0])
+
+
+@dataclass
+class MockAnthropic:
+    """Drop-in for AsyncAnthropic that answers without a network.
+
+    Replies come from ``responder`` after ``latency`` seconds plus up to
+    ``jitter`` seconds drawn from a generator seeded with ``seed``, so
+    runs are repeatable. Streamed text arrives word by word, each word
+    ``token_latency`` seconds apart. Usage numbers are derived from the
+    size of the request and reply; with ``cache_prompts`` prompt caching
+    is simulated from the request's cache_control breakpoints.
+
+    Faults are injected before any latency, as the API rejects requests
+    straight away: the next requests fail with the statuses in
+    ``faults``, in order; a fraction ``overload_rate`` of requests fail
+    with 529; and beyond ``rate_limit`` requests per second, requests
+    fail with 429 and a retry-after header. Failed requests are counted
+    in ``errors``.
+    """
+
+    responder: Responder = text_responder
+    latency: float = 0.0
+    jitter: float = 0.0
+    token_latency: float = 0.0
+    seed: int = 0
+    cache_prompts: bool = True
+    min_cache_tokens: int = MIN_CACHE_TOKENS
+    record: bool = False
+    faults: list[int] = field(default_factory=list)
+    overload_rate: float = 0.0
+    rate_limit: float | None = None
+    calls: int = 0
+    errors: int = 0
+    token_counts: int = 0
+    tool_ids: int = 0
+    requests: list[dict[str, Any]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.messages = MockMessages(self)
+        self.random = random.Random(self.seed)
+        self.prompt_cache = PromptCache(self.min_cache_tokens)
+        self.rate_bucket = (
+            TokenBucket(self.rate_limit) if self.rate_limit else None
+        )
+
+    def _inject_fault(self) -> None:
+        """Raise MockAPIError if this request should fail."""
+        if self.faults:
+            status = self.faults.pop(0)
+            self.errors += 1
+            raise MockAPIError(status, "Injected fault")
+        if self.overload_rate and self.random.random() < self.overload_rate:
+            self.errors += 1
+            raise MockAPIError(529, "Overloaded")
+        if self.rate_bucket:
+            wait = self.rate_bucket.try_acquire()
+            if wait:
+                self.errors += 1
+                raise MockAPIError(
+                    429,
+                    "Rate limited",
+                    {"retry-after": f"{wait:.3f}"},
+                )
@@ -2,7 +2,9 @@
 
 from .base import Tool
 from .code_execution import CodeExecutionServerTool
+from .file_search import FileSearchTool
 from .file_tools import FileReadTool, FileWriteTool
+from .registry import ToolRegistry
 from .think import ThinkTool
 from .web_search import WebSearchServerTool
 
@@ -10,7 +12,9 @@ __all__ = [
     "Tool",
     "CodeExecutionServerTool",
     "FileReadTool",
+    "FileSearchTool",
     "FileWriteTool",
     "ThinkTool",
+    "ToolRegistry",
     "WebSearchServerTool",
 ]
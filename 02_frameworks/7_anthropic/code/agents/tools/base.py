@@ -1,8 +1,12 @@
 """Base tool definitions for the agent framework."""
 
+import json
+from collections.abc import Hashable
 from dataclasses import dataclass
 from typing import Any
 
+from .result_cache import MISSING, ToolResultCache, default_result_cache
+
 
 @dataclass
 class Tool:
@@ -11,6 +15,8 @@ class Tool:
     name: str
     description: str
     input_schema: dict[str, Any]
+    cacheable: bool = False
+    cache_ttl: float | None = None
 
     def to_dict(self) -> dict[str, Any]:
         """Convert tool to Claude API format."""
@@ -25,3 +31,44 @@ class Tool:
         raise NotImplementedError(
             "Tool subclasses must implement execute method"
         )
+
+    @property
+    def result_cache(self) -> ToolResultCache:
+        """Cache used to memoize results of cacheable calls."""
+        return default_result_cache
+
+    def cache_key(self, **kwargs) -> Hashable | None:
+        """Key identifying a call's result, or None to skip the cache.
+
+        Cacheable tools are keyed on their arguments by default; tools
+        whose results depend on external state should override this to
+        include it (or return None for calls that must always run).
+        """
+        if not self.cacheable:
+            return None
+        return (self.name, json.dumps(kwargs, sort_keys=True, default=str))
+
+    def cache_tags(self, **kwargs) -> tuple[str, ...]:
+        """Tags under which a cached result can be invalidated."""
+        return ()
+
+    async def run(self, **kwargs) -> Any:
+        """Execute the tool, serving repeated cacheable calls from cache.
+
+        Error results (strings starting with "Error") are never cached.
+        """
+        key = self.cache_key(**kwargs)
+        if key is None:
+            return await self.execute(**kwargs)
+
+        cache = self.result_cache
+        result = cache.get(key)
+        if result is not MISSING:
+            return result
+
+        result = await self.execute(**kwargs)
+        if not (isinstance(result, str) and result.startswith("Error")):
+            cache.put(
+                key, result, ttl=self.cache_ttl, tags=self.cache_tags(**kwargs)
+            )
+        return result
@@ -0,0 +1,136 @@
+"""Single-pass, atomic text replacement for files of any size."""
+
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+
+# Characters decoded per read while streaming a file through the edits
+EDIT_CHUNK_CHARS = 1 << 20
+
+# Read once: os.umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@dataclass
+class EditResult:
+    """Outcome of applying a batch of edits to a file."""
+
+    counts: list[int]
+    written: bool
+    old_size: int
+    new_size: int
+    mtime: float
+
+    @property
+    def byte_delta(self) -> int:
+        return self.new_size - self.old_size
+
+
+def atomic_writer(path: str):
+    """Open a temp file next to path for writing; returns (file, name).
+
+    The caller moves it over path with replace_with() once it is
+    complete, so readers never see a partially written file. If path is
+    a symlink, the temp file is created next to the file it points to.
+    """
+    directory, name = os.path.split(os.path.realpath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+    return (
+        os.fdopen(fd, "w", encoding="utf-8", newline=""),
+        tmp_path,
+    )
+
+
+def replace_with(tmp_path: str, path: str) -> None:
+    """Move a temp file from atomic_writer() over path.
+
+    An existing file keeps its mode; a new one gets the mode open()
+    would give it, 0o666 less the umask, not mkstemp's 0o600. A symlink
+    stays a link and the file it points to is replaced.
+    """
+    target = os.path.realpath(path)
+    if os.path.exists(target):
+        shutil.copymode(target, tmp_path)
+    else:
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+    os.replace(tmp_path, target)
+
+
+def apply_edits(
+    path: str,
+    edits: list[tuple[str, str]],
+    chunk_chars: int = EDIT_CHUNK_CHARS,
+) -> EditResult:
+    """Replace every occurrence of each old text with its new text.
+
+    All edits are matched against the original content in one pass:
+    the leftmost occurrence of any old text is replaced next, preferring
+    the longer old text at the same position, so edits never see each
+    other's output. Each old text is located with str.find, which is far
+    faster than a regex alternation. The file is streamed through in
+    chunks, keeping only the tail a match could still span, and written
+    to a temp file that replaces the original only if every edit matched
+    at least once.
+
+    Raises:
+        UnicodeDecodeError: If the file is not valid UTF-8
+    """
+    order = sorted(range(len(edits)), key=lambda i: -len(edits[i][0]))
+    olds = [edits[i][0] for i in order]
+    news = [edits[i][1] for i in order]
+    counts = [0] * len(edits)
+    # A match starting before len(buffer) - overlap is fully buffered
+    overlap = len(olds[0]) - 1
+
+    old_size = os.stat(path).st_size
+    out, tmp_path = atomic_writer(path)
+    try:
+        with out, open(path, encoding="utf-8", newline="") as src:
+            buffer = ""
+            eof = False
+            while not eof:
+                chunk = src.read(chunk_chars)
+                eof = not chunk
+                buffer += chunk
+                limit = len(buffer) if eof else len(buffer) - overlap
+
+                pos = 0
+                parts = []
+                # Next occurrence of each old text at or after pos
+                nexts = [buffer.find(old) for old in olds]
+                while True:
+                    best = -1
+                    for i, old in enumerate(olds):
+                        if 0 <= nexts[i] < pos:
+                            nexts[i] = buffer.find(old, pos)
+                        if nexts[i] >= 0 and (
+                            best < 0 or nexts[i] < nexts[best]
+                        ):
+                            best = i
+                    if best < 0 or nexts[best] >= limit:
+                        break
+                    start = nexts[best]
+                    counts[order[best]] += 1
+                    parts.append(buffer[pos:start])
+                    parts.append(news[best])
+                    pos = start + len(olds[best])
+
+                keep = max(pos, limit)
+                parts.append(buffer[pos:keep])
+                out.write("".join(parts))
+                buffer = buffer[keep:]
+
+        if 0 in counts:
+            os.unlink(tmp_path)
+            return EditResult(counts, False, old_size, old_size, 0.0)
+
+        replace_with(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    stat = os.stat(path)
+    return EditResult(counts, True, old_size, stat.st_size, stat.st_mtime)
@@ -0,0 +1,226 @@
+"""Content search tool backed by a trigram index."""
+
+import asyncio
+import os
+import re
+from pathlib import Path
+
+from .base import Tool
+from .trigram_index import get_trigram_index, query_trigrams
+
+# Default cap on the number of matching lines returned
+DEFAULT_MAX_RESULTS = 50
+# Longest snippet shown for a single line
+MAX_SNIPPET_CHARS = 200
+
+
+def _snippet(line: str, start: int, end: int) -> str:
+    """Trim a long line to a window around the match at [start, end)."""
+    if len(line) <= MAX_SNIPPET_CHARS:
+        return line
+    margin = max((MAX_SNIPPET_CHARS - (end - start)) // 2, 0)
+    left = max(start - margin, 0)
+    right = min(left + MAX_SNIPPET_CHARS, len(line))
+    return (
+        ("…" if left > 0 else "")
+        + line[left:right]
+        + ("…" if right < len(line) else "")
+    )
+
+
+def _match_lines(
+    compiled: re.Pattern, text: str, limit: int
+) -> list[tuple[int, int, int]]:
+    """Line number and match columns of up to limit matching lines."""
+    found = []
+    line_no = 0
+    line_start = 0
+    for match in compiled.finditer(text):
+        if match.start() < line_start:
+            # Another match on a line already found
+            continue
+        line_no += text.count("\n", line_start, match.start())
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        found.append(
+            (line_no, match.start() - line_start, match.end() - line_start)
+        )
+        if len(found) == limit:
+            break
+        # Skip the rest of this line
+        line_end = text.find("\n", match.start())
+        if line_end == -1:
+            break
+        line_start = line_end + 1
+        line_no += 1
+    return found
+
+
+class FileSearchTool(Tool):
+    """Tool for searching file contents under a directory."""
+
+    def __init__(self, index_path: str | None = None):
+        self.index_path = index_path
+        super().__init__(
+            name="file_search",
+            description="""
+            Search the contents of files under a directory, like grep.
+
+            Returns matching lines as path:line: text, with optional
+            context lines. Searches literal text by default; set regex
+            to use a Python regular expression. .gitignore is respected
+            and binary or very large files are skipped.
+            """,
+            input_schema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Text or regular expression to find",
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "Directory to search",
+                    },
+                    "regex": {
+                        "type": "boolean",
+                        "description": "Treat query as a regular expression",
+                    },
+                    "ignore_case": {
+                        "type": "boolean",
+                        "description": "Match case-insensitively",
+                    },
+                    "glob": {
+                        "type": "string",
+                        "description": "Only search files matching a pattern "
+                        "(e.g. *.py or src/**/*.ts)",
+                    },
+                    "context": {
+                        "type": "integer",
+                        "description": "Lines of context around each match",
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "Maximum matching lines to return",
+                    },
+                },
+                "required": ["query", "path"],
+            },
+        )
+
+    async def execute(
+        self,
+        query: str,
+        path: str,
+        regex: bool = False,
+        ignore_case: bool = False,
+        glob: str = "**",
+        context: int = 0,
+        max_results: int = DEFAULT_MAX_RESULTS,
+    ) -> str:
+        """Search file contents.
+
+        Args:
+            query: Literal text, or a regular expression if regex is set
+            path: Directory to search
+            regex: Treat query as a regular expression
+            ignore_case: Match case-insensitively
+            glob: Pattern that relative file paths must match
+            context: Lines of context to show before and after matches
+            max_results: Maximum matching lines to return
+
+        Returns:
+            Matching lines with paths and line numbers
+        """
+        if not query:
+            return "Error: query parameter is required"
+
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        try:
+            compiled = re.compile(query if regex else re.escape(query), flags)
+        except re.error as e:
+            return f"Error: Invalid regular expression: {e}"
+
+        dir_path = Path(path)
+        if not dir_path.exists():
+            return f"Error: Directory not found at {path}"
+        if not dir_path.is_dir():
+            return f"Error: {path} is not a directory"
+
+        try:
+            result = await asyncio.to_thread(
+                self._search_sync,
+                compiled,
+                query_trigrams(query, regex, ignore_case),
+                path,
+                glob or "**",
+                max(context, 0),
+                max(max_results, 1),
+            )
+        except Exception as e:
+            return f"Error searching {path}: {str(e)}"
+        return result or f"No matches found for {query!r} in {path}"
+
+    def _search_sync(
+        self,
+        compiled: re.Pattern,
+        grams: set[int],
+        path: str,
+        glob: str,
+        context: int,
+        max_results: int,
+    ) -> str:
+        """Search the candidate files from the index in path order."""
+        index = get_trigram_index(path, self.index_path)
+        index.update()
+
+        output = []
+        results = 0
+        for relative in index.candidates(grams, glob):
+            try:
+                with open(os.path.join(index.root, relative), "rb") as f:
+                    text = f.read().decode("utf-8", errors="replace")
+            except OSError:
+                continue
+
+            found = _match_lines(compiled, text, max_results - results + 1)
+            if not found:
+                continue
+            if results + len(found) > max_results:
+                found = found[: max_results - results]
+                truncated = True
+            else:
+                truncated = False
+            results += len(found)
+
+            lines = text.split("\n")
+            if len(lines) > 1 and not lines[-1]:
+                lines.pop()
+            shown = -1
+            for i, (line_no, start, end) in enumerate(found):
+                first = max(line_no - context, shown + 1)
+                if context and output and (shown < 0 or first > shown + 1):
+                    output.append("--")
+                for ctx in range(first, line_no):
+                    output.append(
+                        f"{relative}-{ctx + 1}- {_snippet(lines[ctx], 0, 0)}"
+                    )
+                snippet = _snippet(lines[line_no].rstrip("\r"), start, end)
+                output.append(f"{relative}:{line_no + 1}: {snippet}")
+
+                next_match = (
+                    found[i + 1][0] if i + 1 < len(found) else len(lines)
+                )
+                shown = min(line_no + context, next_match - 1, len(lines) - 1)
+                for ctx in range(line_no + 1, shown + 1):
+                    output.append(
+                        f"{relative}-{ctx + 1}- {_snippet(lines[ctx], 0, 0)}"
+                    )
+
+            if truncated:
+                output.append(
+                    f"[Results truncated at {max_results} matches; "
+                    "narrow the query or raise max_results]"
+                )
+                break
+
+        return "\n".join(output)
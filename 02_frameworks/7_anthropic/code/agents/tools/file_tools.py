@@ -1,25 +1,39 @@
 """File operation tools for reading and writing files."""
 
 import asyncio
-import glob
 import os
+from collections.abc import Hashable
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
 
 from .base import Tool
+from .file_edit import apply_edits, atomic_writer, replace_with
+from .file_walk import walk
+from .line_index import get_line_index
+
+# Hard cap on the size of a single read result
+MAX_OUTPUT_BYTES = 100_000
+# Default cap on the number of entries in a listing
+DEFAULT_MAX_ENTRIES = 1000
 
 
 class FileReadTool(Tool):
     """Tool for reading files and listing directories."""
 
-    def __init__(self):
+    def __init__(self, max_output_bytes: int = MAX_OUTPUT_BYTES):
+        self.max_output_bytes = max_output_bytes
         super().__init__(
             name="file_read",
             description="""
             Read files or list directory contents.
 
             Operations:
-            - read: Read the contents of a file
-            - list: List files in a directory
+            - read: Read the contents of a file. Large files are truncated;
+              use offset/limit to page through lines, or byte_offset/
+              byte_length to read a byte range
+            - list: List files in a directory. Patterns may use ** to
+              recurse (e.g. **/*.py); .gitignore is respected
             """,
             input_schema={
                 "type": "object",
@@ -37,21 +51,96 @@ class FileReadTool(Tool):
                         "type": "integer",
                         "description": "Maximum lines to read (0 means no limit)",
                     },
+                    "offset": {
+                        "type": "integer",
+                        "description": "Line to start reading from (0-based)",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Number of lines to read from offset",
+                    },
+                    "byte_offset": {
+                        "type": "integer",
+                        "description": "Byte position to start reading from",
+                    },
+                    "byte_length": {
+                        "type": "integer",
+                        "description": "Number of bytes to read",
+                    },
                     "pattern": {
                         "type": "string",
                         "description": "File pattern to match",
                     },
+                    "max_entries": {
+                        "type": "integer",
+                        "description": "Maximum entries to list",
+                    },
+                    "max_depth": {
+                        "type": "integer",
+                        "description": "Maximum directory depth to recurse",
+                    },
+                    "include_stats": {
+                        "type": "boolean",
+                        "description": "Include sizes and modification times",
+                    },
                 },
                 "required": ["operation", "path"],
             },
+            cacheable=True,
         )
 
+    def cache_key(
+        self, operation: str, path: str, **kwargs
+    ) -> Hashable | None:
+        """Key reads on (path, mtime, size) so results are never stale.
+
+        Listings are keyed on the directory mtime, which only tracks its
+        direct entries, so recursive patterns are not cached, nor are
+        sizes and mtimes of the entries. The directory's .gitignore is
+        part of the key, as it can change without touching the directory.
+        """
+        gitignore = None
+        if operation == "list":
+            pattern = kwargs.get("pattern", "*")
+            if "**" in pattern or "/" in pattern:
+                return None
+            if kwargs.get("include_stats"):
+                return None
+            try:
+                ignore_stat = os.stat(os.path.join(path, ".gitignore"))
+                gitignore = (ignore_stat.st_mtime_ns, ignore_stat.st_size)
+            except OSError:
+                pass
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (
+            self.name,
+            operation,
+            os.path.realpath(path),
+            stat.st_mtime_ns,
+            stat.st_size,
+            gitignore,
+            tuple(sorted(kwargs.items())),
+        )
+
+    def cache_tags(self, path: str, **kwargs) -> tuple[str, ...]:
+        return (os.path.realpath(path),)
+
     async def execute(
         self,
         operation: str,
         path: str,
         max_lines: int = 0,
         pattern: str = "*",
+        offset: int = 0,
+        limit: int = 0,
+        byte_offset: int | None = None,
+        byte_length: int | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_depth: int | None = None,
+        include_stats: bool = False,
     ) -> str:
         """Execute a file read operation.
 
@@ -60,23 +149,56 @@ class FileReadTool(Tool):
             path: The file or directory path
             max_lines: Maximum lines to read (for read operation, 0 means no limit)
             pattern: File pattern to match (for list operation)
+            offset: First line to read (for read operation)
+            limit: Number of lines to read, same as max_lines
+            byte_offset: Start of a byte range to read instead of lines
+            byte_length: Length of the byte range
+            max_entries: Maximum entries to list (for list operation)
+            max_depth: Maximum directory depth to recurse into
+            include_stats: List sizes and modification times
 
         Returns:
             Result of the operation as string
         """
         if operation == "read":
-            return await self._read_file(path, max_lines)
+            if byte_offset is not None or byte_length is not None:
+                return await self._read_bytes(
+                    path, byte_offset or 0, byte_length
+                )
+            return await self._read_file(path, limit or max_lines, offset)
         elif operation == "list":
-            return await self._list_files(path, pattern)
+            return await self._list_files(
+                path, pattern, max_entries, max_depth, include_stats
+            )
         else:
             return f"Error: Unsupported operation '{operation}'"
 
-    async def _read_file(self, path: str, max_lines: int = 0) -> str:
-        """Read a file from disk.
-        
+    def _truncate_output(self, data: bytes, truncated: bool) -> str:
+        """Decode a read, capping it at max_output_bytes with a marker."""
+        if len(data) > self.max_output_bytes:
+            cut = data.rfind(b"\n", 0, self.max_output_bytes) + 1
+            data = data[: cut or self.max_output_bytes]
+            truncated = True
+        text = data.decode("utf-8", errors="replace")
+        if truncated:
+            text += (
+                f"\n[Output truncated after {len(data)} bytes; read more "
+                "with offset/limit or byte_offset/byte_length]"
+            )
+        return text
+
+    async def _read_file(
+        self, path: str, max_lines: int = 0, offset: int = 0
+    ) -> str:
+        """Read a range of lines from a file on disk.
+
+        Line offsets come from a cached memory-mapped index, so paging
+        through a large file only reads the requested lines.
+
         Args:
             path: Path to the file to read
             max_lines: Maximum number of lines to read (0 means read entire file)
+            offset: First line to read (0-based)
         """
         try:
             file_path = Path(path)
@@ -87,22 +209,57 @@ class FileReadTool(Tool):
                 return f"Error: {path} is not a file"
 
             def read_sync():
-                with open(file_path, encoding="utf-8", errors="replace") as f:
-                    if max_lines > 0:
-                        lines = []
-                        for i, line in enumerate(f):
-                            if i >= max_lines:
-                                break
-                            lines.append(line)
-                        return "".join(lines)
-                    return f.read()
+                index = get_line_index(path)
+                start, end = index.byte_range(max(offset, 0), max_lines)
+                with open(file_path, "rb") as f:
+                    f.seek(start)
+                    data = f.read(min(end - start, self.max_output_bytes + 1))
+                return self._truncate_output(data, end - start > len(data))
 
             return await asyncio.to_thread(read_sync)
         except Exception as e:
             return f"Error reading {path}: {str(e)}"
 
-    async def _list_files(self, directory: str, pattern: str = "*") -> str:
-        """List files in a directory."""
+    async def _read_bytes(
+        self, path: str, byte_offset: int, byte_length: int | None
+    ) -> str:
+        """Read a byte range from a file on disk."""
+        try:
+            file_path = Path(path)
+
+            if not file_path.exists():
+                return f"Error: File not found at {path}"
+            if not file_path.is_file():
+                return f"Error: {path} is not a file"
+
+            def read_sync():
+                size = file_path.stat().st_size
+                start = min(max(byte_offset, 0), size)
+                end = size if byte_length is None else min(
+                    start + max(byte_length, 0), size
+                )
+                with open(file_path, "rb") as f:
+                    f.seek(start)
+                    data = f.read(min(end - start, self.max_output_bytes + 1))
+                return self._truncate_output(data, end - start > len(data))
+
+            return await asyncio.to_thread(read_sync)
+        except Exception as e:
+            return f"Error reading {path}: {str(e)}"
+
+    async def _list_files(
+        self,
+        directory: str,
+        pattern: str = "*",
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_depth: int | None = None,
+        include_stats: bool = False,
+    ) -> str:
+        """List files in a directory.
+
+        Patterns may use ``**`` to recurse; .gitignore files are respected
+        and at most ``max_entries`` entries are returned.
+        """
         try:
             dir_path = Path(directory)
 
@@ -112,22 +269,37 @@ class FileReadTool(Tool):
                 return f"Error: {directory} is not a directory"
 
             def list_sync():
-                search_pattern = f"{directory}/{pattern}"
-                files = glob.glob(search_pattern)
-
-                if not files:
-                    return f"No files found matching {directory}/{pattern}"
+                entries = walk(
+                    directory,
+                    pattern,
+                    max_depth=max_depth,
+                    with_stats=include_stats,
+                )
 
                 file_list = []
-                for file_path in sorted(files):
-                    path_obj = Path(file_path)
-                    rel_path = str(file_path).replace(str(dir_path) + "/", "")
-
-                    if path_obj.is_dir():
-                        file_list.append(f"📁 {rel_path}/")
-                    else:
-                        file_list.append(f"📄 {rel_path}")
-
+                for entry in islice(entries, max(max_entries, 1) + 1):
+                    if len(file_list) == max_entries:
+                        file_list.append(
+                            f"[Listing truncated at {max_entries} entries; "
+                            "narrow the pattern or raise max_entries]"
+                        )
+                        break
+
+                    line = (
+                        f"📁 {entry.path}/"
+                        if entry.is_dir
+                        else f"📄 {entry.path}"
+                    )
+                    if include_stats and entry.mtime is not None:
+                        modified = datetime.fromtimestamp(entry.mtime)
+                        details = f"modified {modified:%Y-%m-%d %H:%M}"
+                        if not entry.is_dir:
+                            details = f"{entry.size} bytes, {details}"
+                        line = f"{line} ({details})"
+                    file_list.append(line)
+
+                if not file_list:
+                    return f"No files found matching {directory}/{pattern}"
                 return "\n".join(file_list)
 
             return await asyncio.to_thread(list_sync)
@@ -146,7 +318,10 @@ class FileWriteTool(Tool):
 
             Operations:
             - write: Create or completely replace a file
-            - edit: Make targeted changes to parts of a file
+            - edit: Make targeted changes to parts of a file. Pass
+              old_text/new_text, or an edits list to apply several
+              replacements at once; nothing is changed unless every
+              old_text is found
             """,
             input_schema={
                 "type": "object",
@@ -172,6 +347,19 @@ class FileWriteTool(Tool):
                         "type": "string",
                         "description": "Replacement text (for edit operation)",
                     },
+                    "edits": {
+                        "type": "array",
+                        "description": "Replacements applied in one pass "
+                        "(for edit operation)",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "old_text": {"type": "string"},
+                                "new_text": {"type": "string"},
+                            },
+                            "required": ["old_text", "new_text"],
+                        },
+                    },
                 },
                 "required": ["operation", "path"],
             },
@@ -184,6 +372,7 @@ class FileWriteTool(Tool):
         content: str = "",
         old_text: str = "",
         new_text: str = "",
+        edits: list[dict[str, str]] | None = None,
     ) -> str:
         """Execute a file write operation.
 
@@ -193,6 +382,7 @@ class FileWriteTool(Tool):
             content: Content to write (for write operation)
             old_text: Text to replace (for edit operation)
             new_text: Replacement text (for edit operation)
+            edits: Several old_text/new_text pairs (for edit operation)
 
         Returns:
             Result of the operation as string
@@ -202,24 +392,45 @@ class FileWriteTool(Tool):
                 return "Error: content parameter is required"
             return await self._write_file(path, content)
         elif operation == "edit":
-            if not old_text or not new_text:
+            if edits is None and (not old_text or not new_text):
                 return (
                     "Error: both old_text and new_text parameters "
                     "are required for edit operation"
                 )
-            return await self._edit_file(path, old_text, new_text)
+            pairs = [(old_text, new_text)] if old_text else []
+            for edit in edits or []:
+                if not edit.get("old_text") or "new_text" not in edit:
+                    return (
+                        "Error: each edit needs old_text and new_text"
+                    )
+                pairs.append((edit["old_text"], edit["new_text"]))
+            if not pairs:
+                return "Error: edits must not be empty"
+            return await self._edit_file(path, pairs)
         else:
             return f"Error: Unsupported operation '{operation}'"
 
+    def _invalidate(self, path: str) -> None:
+        """Drop cached reads of the file and listings of its directory."""
+        real_path = os.path.realpath(path)
+        self.result_cache.invalidate(real_path)
+        self.result_cache.invalidate(os.path.dirname(real_path))
+
     async def _write_file(self, path: str, content: str) -> str:
-        """Write content to a file."""
+        """Write content to a file through a temp file."""
         try:
             file_path = Path(path)
             os.makedirs(file_path.parent, exist_ok=True)
 
             def write_sync():
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(content)
+                out, tmp_path = atomic_writer(path)
+                try:
+                    with out:
+                        out.write(content)
+                    replace_with(tmp_path, path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
                 return (
                     f"Successfully wrote {len(content)} "
                     f"characters to {path}"
@@ -228,9 +439,13 @@ class FileWriteTool(Tool):
             return await asyncio.to_thread(write_sync)
         except Exception as e:
             return f"Error writing to {path}: {str(e)}"
+        finally:
+            self._invalidate(path)
 
-    async def _edit_file(self, path: str, old_text: str, new_text: str) -> str:
-        """Make targeted changes to a file."""
+    async def _edit_file(
+        self, path: str, edits: list[tuple[str, str]]
+    ) -> str:
+        """Apply replacements to a file in one streaming, atomic pass."""
         try:
             file_path = Path(path)
 
@@ -241,37 +456,40 @@ class FileWriteTool(Tool):
 
             def edit_sync():
                 try:
-                    with open(
-                        file_path, encoding="utf-8", errors="replace"
-                    ) as f:
-                        content = f.read()
+                    result = apply_edits(path, edits)
+                except UnicodeDecodeError:
+                    return f"Error: {path} appears to be a binary file"
 
-                    if old_text not in content:
+                if not result.written:
+                    if len(edits) == 1:
                         return (
                             f"Error: The specified text was not "
                             f"found in {path}"
                         )
-
-                    # Count occurrences to warn about multiple matches
-                    count = content.count(old_text)
-                    if count > 1:
-                        # Edit with warning about multiple occurrences
-                        new_content = content.replace(old_text, new_text)
-                        with open(file_path, "w", encoding="utf-8") as f:
-                            f.write(new_content)
-                        return (
-                            f"Warning: Found {count} occurrences. "
-                            f"All were replaced in {path}"
-                        )
-                    else:
-                        # One occurrence, straightforward replacement
-                        new_content = content.replace(old_text, new_text)
-                        with open(file_path, "w", encoding="utf-8") as f:
-                            f.write(new_content)
-                        return f"Successfully edited {path}"
-                except UnicodeDecodeError:
-                    return f"Error: {path} appears to be a binary file"
+                    missing = ", ".join(
+                        str(i) for i, n in enumerate(result.counts) if n == 0
+                    )
+                    return (
+                        f"Error: old_text of edits {missing} was not found "
+                        f"in {path}; no changes were made"
+                    )
+
+                summary = (
+                    f"{sum(result.counts)} replacements, "
+                    f"{result.byte_delta:+d} bytes, "
+                    f"mtime {result.mtime:.6f}"
+                )
+                repeated = [n for n in result.counts if n > 1]
+                if repeated:
+                    # Warn that some old_text matched more than once
+                    return (
+                        f"Warning: Found {max(repeated)} occurrences. "
+                        f"All were replaced in {path} ({summary})"
+                    )
+                return f"Successfully edited {path} ({summary})"
 
             return await asyncio.to_thread(edit_sync)
         except Exception as e:
             return f"Error editing {path}: {str(e)}"
+        finally:
+            self._invalidate(path)
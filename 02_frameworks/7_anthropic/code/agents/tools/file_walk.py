@@ -0,0 +1,185 @@
+"""Directory walking with glob patterns and .gitignore support."""
+
+import os
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+ALWAYS_SKIPPED = {".git"}
+
+
+def glob_to_regex(pattern: str) -> re.Pattern:
+    """Compile a glob with ``**`` support into a path regex.
+
+    ``*`` and ``?`` never match ``/``; ``**/`` matches zero or more
+    directories and a trailing ``**`` matches everything below.
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+
+        char = pattern[i]
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            chars = pattern[i + 1 : end].replace("\\", "\\\\")
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            parts.append(f"[{chars}]")
+            i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return re.compile("".join(parts) + r"\Z")
+
+
+@dataclass
+class IgnoreRule:
+    """A single .gitignore pattern."""
+
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+    anchored: bool
+
+
+def parse_gitignore(text: str) -> list[IgnoreRule]:
+    """Parse the patterns of a .gitignore file."""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if line:
+            rules.append(
+                IgnoreRule(glob_to_regex(line), negate, dir_only, anchored)
+            )
+    return rules
+
+
+def is_ignored(
+    rule_sets: list[tuple[str, list[IgnoreRule]]], path: str, is_dir: bool
+) -> bool:
+    """Apply .gitignore rules from the root down; the last match wins."""
+    ignored = False
+    name = path.rsplit("/", 1)[-1]
+    for base, rules in rule_sets:
+        relative = path[len(base) :]
+        for rule in rules:
+            if rule.dir_only and not is_dir:
+                continue
+            target = relative if rule.anchored else name
+            if rule.regex.match(target):
+                ignored = not rule.negate
+    return ignored
+
+
+@dataclass
+class WalkEntry:
+    """A file or directory found by walk()."""
+
+    path: str
+    is_dir: bool
+    size: int | None = None
+    mtime: float | None = None
+
+
+def walk(
+    root: str,
+    pattern: str = "*",
+    max_depth: int | None = None,
+    respect_gitignore: bool = True,
+    with_stats: bool = False,
+) -> Iterator[WalkEntry]:
+    """Yield entries under ``root`` whose relative path matches a glob.
+
+    Uses os.scandir so each entry's type comes from the directory listing
+    without an extra stat; sizes and mtimes cost one stat per entry and
+    are only collected when requested. Patterns without ``**`` only
+    descend as deep as they have path segments. Hidden entries are
+    skipped unless the pattern names them, and symlinked directories are
+    listed but not followed. Entries are yielded lazily in sorted,
+    depth-first order so callers can stop after a number of results.
+    """
+    regex = glob_to_regex(pattern)
+    depth_limit = None if "**" in pattern else pattern.count("/")
+    if max_depth is not None:
+        depth_limit = (
+            max_depth if depth_limit is None else min(depth_limit, max_depth)
+        )
+    show_hidden = pattern.startswith(".") or "/." in pattern
+
+    def visit(
+        directory: str,
+        prefix: str,
+        depth: int,
+        rule_sets: list[tuple[str, list[IgnoreRule]]],
+    ) -> Iterator[WalkEntry]:
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:
+            return
+
+        if respect_gitignore:
+            for entry in entries:
+                if entry.name == ".gitignore" and entry.is_file():
+                    try:
+                        with open(
+                            entry.path, encoding="utf-8", errors="replace"
+                        ) as f:
+                            rules = parse_gitignore(f.read())
+                    except OSError:
+                        break
+                    rule_sets = [*rule_sets, (prefix, rules)]
+                    break
+
+        for entry in entries:
+            name = entry.name
+            if name in ALWAYS_SKIPPED or (
+                name.startswith(".") and not show_hidden
+            ):
+                continue
+
+            path = prefix + name
+            is_dir = entry.is_dir()
+            if rule_sets and is_ignored(rule_sets, path, is_dir):
+                continue
+
+            if regex.match(path):
+                if with_stats:
+                    try:
+                        stat = entry.stat()
+                        size, mtime = stat.st_size, stat.st_mtime
+                    except OSError:
+                        size = mtime = None
+                    yield WalkEntry(path, is_dir, size, mtime)
+                else:
+                    yield WalkEntry(path, is_dir)
+
+            if (
+                is_dir
+                and not entry.is_symlink()
+                and (depth_limit is None or depth < depth_limit)
+            ):
+                yield from visit(entry.path, path + "/", depth + 1, rule_sets)
+
+    yield from visit(root, "", 0, [])
@@ -0,0 +1,93 @@
+"""Memory-mapped line index for paging through large files."""
+
+import mmap
+import operator
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, islice, repeat
+
+LINE_INDEX_CACHE_SIZE = 16
+SCAN_CHUNK_BYTES = 1 << 20
+
+
+class LineIndex:
+    """Byte offsets of line starts in a file, built lazily over mmap.
+
+    The file is only scanned as far as the furthest line requested, so
+    reading the first page of a huge file does not scan all of it, and
+    later pages reuse the offsets found so far.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self.starts = array("Q", [0])
+        self.complete = size == 0
+        self._scanned = 0
+        self._lock = threading.Lock()
+
+    def _scan(self, mm: mmap.mmap, lines: int) -> None:
+        """Extend the index until it holds ``lines`` line starts."""
+        starts = self.starts
+        while len(starts) < lines and not self.complete:
+            chunk = mm[self._scanned : self._scanned + SCAN_CHUNK_BYTES]
+            # Line lengths plus newline, summed into absolute line starts
+            lengths = map(
+                operator.add, map(len, chunk.split(b"\n")[:-1]), repeat(1)
+            )
+            starts.extend(
+                islice(accumulate(lengths, initial=self._scanned), 1, None)
+            )
+            self._scanned += len(chunk)
+            if self._scanned >= self.size:
+                self.complete = True
+                if starts[-1] == self.size:
+                    starts.pop()
+
+    def byte_range(self, offset: int, limit: int) -> tuple[int, int]:
+        """Start and end byte offsets of lines [offset, offset + limit).
+
+        A limit of 0 means up to the end of the file.
+        """
+        if self.size == 0:
+            return 0, 0
+
+        wanted = offset + limit + 1 if limit > 0 else offset + 1
+        with self._lock:
+            if len(self.starts) < wanted and not self.complete:
+                with open(self.path, "rb") as f:
+                    with mmap.mmap(
+                        f.fileno(), 0, access=mmap.ACCESS_READ
+                    ) as mm:
+                        self._scan(mm, wanted)
+
+        if offset >= len(self.starts):
+            return self.size, self.size
+        start = self.starts[offset]
+        if limit > 0 and offset + limit < len(self.starts):
+            return start, self.starts[offset + limit]
+        return start, self.size
+
+
+_indexes: OrderedDict[tuple[str, int, int], LineIndex] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_line_index(path: str) -> LineIndex:
+    """Return the cached line index for the current version of a file."""
+    real_path = os.path.realpath(path)
+    stat = os.stat(real_path)
+    key = (real_path, stat.st_mtime_ns, stat.st_size)
+
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = LineIndex(real_path, stat.st_size)
+            _indexes[key] = index
+            if len(_indexes) > LINE_INDEX_CACHE_SIZE:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(key)
+        return index
@@ -1,7 +1,25 @@
 """Tools that interface with MCP servers."""
 
+import asyncio
+import base64
+import json
+import mimetypes
+from collections.abc import Hashable
 from typing import Any
+
 from .base import Tool
+from .spill_store import SpillStore, default_spill_store
+
+# Text results larger than this are spilled to disk with a preview
+MAX_INLINE_TEXT_BYTES = 50_000
+SPILL_PREVIEW_BYTES = 2_000
+# Image types and size Claude accepts as base64 image blocks
+IMAGE_MEDIA_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+
+def _suffix(mime_type: str | None) -> str:
+    return (mime_type and mimetypes.guess_extension(mime_type)) or ".bin"
 
 
 class MCPTool(Tool):
@@ -11,25 +29,154 @@ class MCPTool(Tool):
         description: str,
         input_schema: dict[str, Any],
         connection: "MCPConnection",
+        cacheable: bool = False,
+        cache_ttl: float | None = None,
+        spill_store: SpillStore | None = None,
+        max_inline_bytes: int = MAX_INLINE_TEXT_BYTES,
+        server_key: Hashable | None = None,
     ):
         super().__init__(
-            name=name, description=description, input_schema=input_schema
+            name=name,
+            description=description,
+            input_schema=input_schema,
+            cacheable=cacheable,
+            cache_ttl=cache_ttl,
         )
         self.connection = connection
+        self.spill_store = spill_store or default_spill_store
+        self.max_inline_bytes = max_inline_bytes
+        # Identifies the server, so that same-named tools on different
+        # servers never share cached results
+        self.server_key = (
+            server_key if server_key is not None else id(connection)
+        )
 
-    async def execute(self, **kwargs) -> str:
+    def cache_key(self, **kwargs) -> Hashable | None:
+        key = super().cache_key(**kwargs)
+        if key is None:
+            return None
+        return (self.server_key, *key)
+
+    async def execute(self, **kwargs) -> str | list[dict[str, Any]]:
         """Execute the MCP tool with the given input_schema.
-        Note: Currently only supports text results from MCP tools."""
+
+        Text parts are joined into one string. Image parts (and image
+        resources) are passed on as image blocks, in which case a list of
+        content blocks is returned. Text beyond max_inline_bytes, and
+        binary payloads Claude cannot take inline, are written to the
+        spill store and referenced by path.
+        """
         try:
             result = await self.connection.call_tool(
                 self.name, arguments=kwargs
             )
-
-            if hasattr(result, "content") and result.content:
-                for item in result.content:
-                    if getattr(item, "type", None) == "text":
-                        return item.text
-
-            return "No text content in tool response"
+            blocks = await asyncio.to_thread(self._map_content, result)
         except Exception as e:
             return f"Error executing {self.name}: {e}"
+
+        if getattr(result, "isError", False):
+            text = " ".join(
+                block["text"] for block in blocks if block["type"] == "text"
+            )
+            return f"Error executing {self.name}: {text}"
+        if not blocks:
+            return "No content in tool response"
+        if all(block["type"] == "text" for block in blocks):
+            return "\n".join(block["text"] for block in blocks)
+        return blocks
+
+    def _spill_handle(
+        self, data: bytes, mime_type: str | None, label: str
+    ) -> dict[str, Any]:
+        path = self.spill_store.put(data, _suffix(mime_type))
+        return {
+            "type": "text",
+            "text": f"[{label} ({mime_type or 'unknown type'}, "
+            f"{len(data)} bytes) saved to {path}]",
+        }
+
+    def _binary_block(
+        self, data_b64: str, mime_type: str | None, label: str
+    ) -> dict[str, Any]:
+        """An image block if Claude accepts it inline, else a handle."""
+        if (
+            mime_type in IMAGE_MEDIA_TYPES
+            and len(data_b64) * 3 // 4 <= MAX_IMAGE_BYTES
+        ):
+            return {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": mime_type,
+                    "data": data_b64,
+                },
+            }
+        return self._spill_handle(
+            base64.b64decode(data_b64), mime_type, label
+        )
+
+    def _spill_text(self, data: bytes) -> dict[str, Any]:
+        """Spill text to disk, keeping a preview that ends at a newline."""
+        path = self.spill_store.put(data)
+        cut = data.rfind(b"\n", 0, SPILL_PREVIEW_BYTES) + 1
+        preview = data[: cut or SPILL_PREVIEW_BYTES]
+        return {
+            "type": "text",
+            "text": preview.decode("utf-8", errors="ignore").rstrip("\n")
+            + f"\n[Output truncated after {len(preview)} of {len(data)} "
+            f"bytes; the full text is saved to {path}, read it with "
+            "file_read offset/limit]",
+        }
+
+    def _map_content(self, result: Any) -> list[dict[str, Any]]:
+        """Map MCP content items to Claude tool_result content blocks.
+
+        Text parts are inlined until they add up to max_inline_bytes;
+        a part that would go over is spilled with a preview.
+        """
+        blocks = []
+        inline_bytes = 0
+
+        def add_text(text: str) -> None:
+            nonlocal inline_bytes
+            data = text.encode("utf-8")
+            if inline_bytes + len(data) > self.max_inline_bytes:
+                blocks.append(self._spill_text(data))
+                inline_bytes += SPILL_PREVIEW_BYTES
+            else:
+                blocks.append({"type": "text", "text": text})
+                inline_bytes += len(data)
+
+        for item in getattr(result, "content", None) or []:
+            item_type = getattr(item, "type", None)
+            if item_type == "text":
+                add_text(item.text)
+            elif item_type in ("image", "audio"):
+                blocks.append(
+                    self._binary_block(item.data, item.mimeType, item_type)
+                )
+            elif item_type == "resource":
+                resource = item.resource
+                uri = str(resource.uri)
+                if getattr(resource, "text", None) is not None:
+                    add_text(f"[resource {uri}]\n{resource.text}")
+                else:
+                    blocks.append(
+                        self._binary_block(
+                            resource.blob, resource.mimeType, f"resource {uri}"
+                        )
+                    )
+            elif item_type == "resource_link":
+                blocks.append(
+                    {
+                        "type": "text",
+                        "text": f"[resource link {item.name}: {item.uri}]",
+                    }
+                )
+            else:
+                add_text(str(item))
+
+        structured = getattr(result, "structuredContent", None)
+        if not blocks and structured is not None:
+            add_text(json.dumps(structured))
+        return blocks
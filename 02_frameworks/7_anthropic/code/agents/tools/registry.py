@@ -0,0 +1,72 @@
+"""Tool registry with cached API schemas."""
+
+import hashlib
+import json
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+
+class ToolRegistry:
+    """Ordered collection of tools keyed by name.
+
+    Tool schemas are serialized once and reused until a tool is added or
+    removed, and keep insertion order so the tools prefix of the prompt
+    (and its cache) stays identical between turns. Lookup by name is O(1)
+    and shared by the agent and tool execution.
+    """
+
+    def __init__(self, tools: Iterable[Any] | None = None):
+        self._tools: dict[str, Any] = {}
+        self._schemas: list[dict[str, Any]] | None = None
+        self._hash: str | None = None
+        self.extend(tools or [])
+
+    def _invalidate(self) -> None:
+        self._schemas = None
+        self._hash = None
+
+    def add(self, tool: Any) -> None:
+        """Add a tool, replacing any tool with the same name in place."""
+        self._tools[tool.name] = tool
+        self._invalidate()
+
+    def extend(self, tools: Iterable[Any]) -> None:
+        """Add several tools."""
+        for tool in tools:
+            self._tools[tool.name] = tool
+        self._invalidate()
+
+    def remove(self, name: str) -> None:
+        """Remove a tool by name if present."""
+        if self._tools.pop(name, None) is not None:
+            self._invalidate()
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Return the tool with the given name, or default."""
+        return self._tools.get(name, default)
+
+    def __getitem__(self, name: str) -> Any:
+        return self._tools[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._tools
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._tools.values())
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def to_list(self) -> list[dict[str, Any]]:
+        """Tool definitions in Claude API format, serialized once."""
+        if self._schemas is None:
+            self._schemas = [tool.to_dict() for tool in self._tools.values()]
+        return self._schemas
+
+    @property
+    def schema_hash(self) -> str:
+        """Content hash of the serialized tool definitions."""
+        if self._hash is None:
+            encoded = json.dumps(self.to_list(), sort_keys=True, default=str)
+            self._hash = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        return self._hash
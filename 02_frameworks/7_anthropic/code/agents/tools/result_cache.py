@@ -0,0 +1,86 @@
+"""Bounded LRU cache for tool results."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+MISSING = object()
+
+
+class ToolResultCache:
+    """LRU cache of tool results with per-entry TTLs and tags.
+
+    Entries can be tagged (e.g. with the file path they were read from)
+    so that writers can invalidate everything derived from a resource.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # key -> (value, expiry time or None, tags)
+        self._entries: OrderedDict[
+            Hashable, tuple[Any, float | None, tuple[str, ...]]
+        ] = OrderedDict()
+        self._tags: dict[str, set[Hashable]] = {}
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value, or MISSING."""
+        entry = self._entries.get(key)
+        if entry is None or (
+            entry[1] is not None and entry[1] < time.monotonic()
+        ):
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: float | None = None,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Store a value, evicting the least recently used entries."""
+        if key in self._entries:
+            self._remove(key)
+        expiry = time.monotonic() + ttl if ttl is not None else None
+        tags = tuple(tags)
+        self._entries[key] = (value, expiry, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tag: str) -> None:
+        """Drop every entry carrying the given tag."""
+        for key in list(self._tags.get(tag, ())):
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+        self._tags.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared so that writers invalidate results cached by readers
+default_result_cache = ToolResultCache()
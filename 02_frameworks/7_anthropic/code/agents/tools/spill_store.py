@@ -0,0 +1,79 @@
+"""Disk store for tool payloads too large to inline in the context."""
+
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class SpillStore:
+    """Writes large tool payloads to files and hands back their paths.
+
+    The model gets a short preview and the path instead of the payload,
+    and can page through it with file_read (offset/limit or a byte
+    range). Files are named by content hash, so a repeated payload is
+    stored once. Once the store holds more than ``max_bytes`` the oldest
+    files are deleted. Without a directory, a private temporary one is
+    created on first use and removed at exit.
+    """
+
+    def __init__(
+        self, directory: str | None = None, max_bytes: int = 1 << 30
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._files: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ensure_directory(self) -> str:
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="agent-spill-")
+            atexit.register(shutil.rmtree, self.directory, True)
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+        return self.directory
+
+    def put(self, data: bytes | str, suffix: str = ".txt") -> str:
+        """Store a payload and return the path of its file."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()[:32]
+
+        with self._lock:
+            path = os.path.join(self._ensure_directory(), digest + suffix)
+            if path in self._files:
+                self._files.move_to_end(path)
+                return path
+
+            with open(path, "wb") as f:
+                f.write(data)
+            self._files[path] = len(data)
+            self.total_bytes += len(data)
+
+            while self.total_bytes > self.max_bytes and len(self._files) > 1:
+                old_path, size = self._files.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.unlink(old_path)
+                except OSError:
+                    pass
+            return path
+
+    def clear(self) -> None:
+        """Delete every stored file."""
+        with self._lock:
+            for path in self._files:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            self._files.clear()
+            self.total_bytes = 0
+
+
+# Shared so handles stay valid for the lifetime of the process
+default_spill_store = SpillStore()
@@ -0,0 +1,358 @@
+"""Persistent trigram index for searching the files under a directory."""
+
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterator
+
+from .file_walk import glob_to_regex, walk
+
+INDEX_VERSION = 1
+# Files larger than this are skipped by the index and by searches
+MAX_INDEXED_FILE_BYTES = 2_000_000
+BINARY_SNIFF_BYTES = 8192
+REGEX_META = set(".^$*+?{}[]\\|()")
+HEX_ESCAPE_DIGITS = {"x": 2, "u": 4, "U": 8}
+CONTROL_ESCAPES = {
+    "a": "\a", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v"
+}
+OCTAL_DIGITS = "01234567"
+
+
+def default_index_dir() -> str:
+    """Directory holding persisted indexes, under the user cache dir."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "agents", "trigram")
+
+
+def file_trigrams(data: bytes) -> array:
+    """Sorted distinct trigrams of the lowercased bytes, packed as ints."""
+    data = data.lower()
+    grams = set(zip(data, data[1:], data[2:]))
+    return array("I", sorted((a << 16) | (b << 8) | c for a, b, c in grams))
+
+
+def _literal_trigrams(literal: str, ignore_case: bool) -> set[int]:
+    encoded = literal.encode("utf-8")
+    if ignore_case and not encoded.isascii():
+        # Non-ASCII case folding does not map byte for byte
+        return set()
+    return set(file_trigrams(encoded))
+
+
+def required_literals(pattern: str) -> list[str]:
+    """Literal strings that every match of a regex must contain.
+
+    This is a conservative scan: alternation and verbose mode give up,
+    groups and character classes end the current literal, and a literal
+    character made optional by a quantifier is dropped.
+    """
+    if "|" in pattern or "(?x" in pattern:
+        return []
+
+    literals = []
+    run: list[str] = []
+
+    def flush():
+        if run:
+            literals.append("".join(run))
+            run.clear()
+
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped, i = _parse_escape(pattern, i)
+            if escaped is None:
+                # Character classes, anchors and backreferences
+                flush()
+                continue
+            run.append(escaped)
+        elif char in "*?{":
+            # The previous character may be absent
+            if run:
+                run.pop()
+            flush()
+            if char == "{":
+                end = pattern.find("}", i)
+                i = len(pattern) if end == -1 else end + 1
+            else:
+                i += 1
+        elif char == "+":
+            flush()
+            i += 1
+        elif char in "([":
+            flush()
+            i = _skip_group(pattern, i)
+        elif char in REGEX_META:
+            flush()
+            i += 1
+        else:
+            run.append(char)
+            i += 1
+    flush()
+    return literals
+
+
+def _parse_escape(pattern: str, start: int) -> tuple[str | None, int]:
+    """Decode the escape whose backslash is at ``start``.
+
+    Returns the character it stands for, or None if it does not match
+    one fixed character (classes, anchors, backreferences, malformed
+    escapes), and the index just past the whole escape.
+    """
+    code = pattern[start + 1]
+    i = start + 2
+    if code in HEX_ESCAPE_DIGITS:
+        end = i + HEX_ESCAPE_DIGITS[code]
+        digits = pattern[i:end]
+        try:
+            if len(digits) == end - i:
+                return chr(int(digits, 16)), end
+        except ValueError:
+            pass
+        return None, min(end, len(pattern))
+    if code == "N":
+        end = pattern.find("}", i)
+        if not pattern.startswith("{", i) or end == -1:
+            return None, i
+        try:
+            return unicodedata.lookup(pattern[i + 1 : end]), end + 1
+        except KeyError:
+            return None, end + 1
+    if code.isdigit():
+        # Same rules as the re module: \0 and three octal digits are
+        # octal escapes, anything else is a backreference of 1-2 digits
+        digits = pattern[start + 1 : start + 4]
+        if code == "0":
+            octal = "0"
+            for digit in digits[1:]:
+                if digit not in OCTAL_DIGITS:
+                    break
+                octal += digit
+            return chr(int(octal, 8)), start + 1 + len(octal)
+        if len(digits) == 3 and all(d in OCTAL_DIGITS for d in digits):
+            return chr(int(digits, 8)), start + 4
+        if digits[1:2].isdigit():
+            return None, start + 3
+        return None, i
+    if code in CONTROL_ESCAPES:
+        return CONTROL_ESCAPES[code], i
+    if code.isalnum():
+        return None, i
+    return code, i
+
+
+def _skip_group(pattern: str, start: int) -> int:
+    """Index just past the group or character class starting at start."""
+    depth = 0
+    i = start
+    in_class = False
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            if char == "]" and i > class_start + 1:
+                in_class = False
+                if depth == 0:
+                    return i + 1
+        elif char == "[":
+            in_class = True
+            class_start = i + (pattern[i + 1 : i + 2] == "^")
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return len(pattern)
+
+
+def query_trigrams(query: str, regex: bool, ignore_case: bool) -> set[int]:
+    """Trigrams that must all occur in a file that matches the query."""
+    literals = required_literals(query) if regex else [query]
+    grams: set[int] = set()
+    for literal in literals:
+        grams |= _literal_trigrams(literal, ignore_case)
+    return grams
+
+
+def _contains_all(trigrams: array, required: list[int]) -> bool:
+    size = len(trigrams)
+    for gram in required:
+        i = bisect_left(trigrams, gram)
+        if i == size or trigrams[i] != gram:
+            return False
+    return True
+
+
+class TrigramIndex:
+    """Trigrams of every text file under a root directory.
+
+    Each file's distinct trigrams are kept as a sorted array, keyed by
+    relative path with the size and mtime they were read at. refresh()
+    walks the tree and only re-reads files that are new or changed, and
+    the index is pickled to disk so later processes start warm. A query
+    only reads the files that contain all of its trigrams.
+    """
+
+    def __init__(self, root: str, index_path: str | None = None):
+        self.root = os.path.realpath(root)
+        if index_path is None:
+            digest = hashlib.sha256(self.root.encode("utf-8")).hexdigest()
+            index_path = os.path.join(
+                default_index_dir(), f"{digest[:16]}.idx"
+            )
+        self.index_path = index_path
+        # relative path -> (size, mtime, trigrams or None if not indexed)
+        self.files: dict[str, tuple[int, float, array | None]] = {}
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            with open(self.index_path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, AttributeError):
+            return
+        if (
+            state.get("version") == INDEX_VERSION
+            and state.get("root") == self.root
+        ):
+            self.files = state["files"]
+
+    def save(self) -> None:
+        """Write the index to disk if it changed since the last save."""
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.index_path)
+        os.makedirs(directory, exist_ok=True)
+        state = {
+            "version": INDEX_VERSION,
+            "root": self.root,
+            "files": self.files,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._dirty = False
+
+    def _index_file(self, path: str, size: int) -> array | None:
+        if size > MAX_INDEXED_FILE_BYTES:
+            return None
+        try:
+            with open(os.path.join(self.root, path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b"\0" in data[:BINARY_SNIFF_BYTES]:
+            return None
+        return file_trigrams(data)
+
+    def refresh(self) -> int:
+        """Bring the index up to date with the tree.
+
+        Returns:
+            Number of files added, changed or removed
+        """
+        changed = 0
+        seen = set()
+        for entry in walk(self.root, "**", with_stats=True):
+            if entry.is_dir or entry.size is None:
+                continue
+            seen.add(entry.path)
+            known = self.files.get(entry.path)
+            if known and known[0] == entry.size and known[1] == entry.mtime:
+                continue
+            self.files[entry.path] = (
+                entry.size,
+                entry.mtime,
+                self._index_file(entry.path, entry.size),
+            )
+            changed += 1
+
+        for path in self.files.keys() - seen:
+            del self.files[path]
+            changed += 1
+
+        if changed:
+            self._dirty = True
+        return changed
+
+    def update(self) -> int:
+        """Load the index if needed, refresh it and persist any changes."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            changed = self.refresh()
+            try:
+                self.save()
+            except OSError:
+                # A read-only cache dir only costs the warm start
+                pass
+            return changed
+
+    def candidates(
+        self, grams: set[int], pattern: str = "**"
+    ) -> Iterator[str]:
+        """Relative paths, in sorted order, that may contain a match.
+
+        The files are read from a snapshot taken on the first call to
+        next(), so an update() running meanwhile does not affect them.
+
+        Args:
+            grams: Trigrams a matching file must contain
+            pattern: Glob the relative path must match
+        """
+        path_regex = None if pattern in ("**", "") else _path_regex(pattern)
+        required = sorted(grams)
+        with self._lock:
+            files = sorted(self.files.items())
+        for path, (_, _, trigrams) in files:
+            if trigrams is None:
+                continue
+            if path_regex and not path_regex.match(path):
+                continue
+            if _contains_all(trigrams, required):
+                yield path
+
+
+def _path_regex(pattern: str) -> re.Pattern:
+    # Bare name patterns such as *.py match at any depth
+    if "/" not in pattern and not pattern.startswith("**"):
+        pattern = "**/" + pattern
+    return glob_to_regex(pattern)
+
+
+_indexes: dict[tuple[str, str | None], TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_trigram_index(
+    root: str, index_path: str | None = None
+) -> TrigramIndex:
+    """Return the shared index for a directory, creating it if needed."""
+    key = (os.path.realpath(root), index_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TrigramIndex(root, index_path)
+        return index
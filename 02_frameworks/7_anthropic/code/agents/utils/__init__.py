@@ -1,6 +1,36 @@
 """Agent utility modules."""
 
+from .cache_util import CachePlanner, CacheStats
+from .compaction_util import SummaryCompactor
 from .history_util import MessageHistory
-from .tool_util import execute_tools
+from .rate_util import RateLimiter, TokenBucket
+from .retry_util import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ModelCallGuard,
+    RetryPolicy,
+)
+from .token_util import TokenEstimator
+from .tool_util import ToolPipeline, ToolScheduler, execute_tools
+from .trace_util import AgentObserver, OTLPJsonExporter, Span, SpanRecorder
 
-__all__ = ["MessageHistory", "execute_tools"]
+__all__ = [
+    "AgentObserver",
+    "CachePlanner",
+    "CacheStats",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "MessageHistory",
+    "ModelCallGuard",
+    "OTLPJsonExporter",
+    "RateLimiter",
+    "RetryPolicy",
+    "Span",
+    "SpanRecorder",
+    "SummaryCompactor",
+    "TokenBucket",
+    "TokenEstimator",
+    "ToolPipeline",
+    "ToolScheduler",
+    "execute_tools",
+]
@@ -0,0 +1,99 @@
+"""Prompt caching breakpoint planning and cache usage statistics."""
+
+from dataclasses import dataclass
+from typing import Any
+
+CACHE_CONTROL = {"type": "ephemeral"}
+MAX_CACHE_BREAKPOINTS = 4
+
+
+@dataclass
+class CacheStats:
+    """Cache token usage accumulated over the requests of a run."""
+
+    requests: int = 0
+    input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+
+    def record(self, usage: Any) -> None:
+        """Add the usage reported by one model response."""
+        self.requests += 1
+        self.input_tokens += usage.input_tokens
+        self.cache_read_input_tokens += (
+            getattr(usage, "cache_read_input_tokens", 0) or 0
+        )
+        self.cache_creation_input_tokens += (
+            getattr(usage, "cache_creation_input_tokens", 0) or 0
+        )
+
+    @property
+    def total_input_tokens(self) -> int:
+        """All prompt tokens, cached or not."""
+        return (
+            self.input_tokens
+            + self.cache_read_input_tokens
+            + self.cache_creation_input_tokens
+        )
+
+    @property
+    def read_ratio(self) -> float:
+        """Fraction of prompt tokens served from the cache."""
+        total = self.total_input_tokens
+        return self.cache_read_input_tokens / total if total else 0.0
+
+    @property
+    def creation_ratio(self) -> float:
+        """Fraction of prompt tokens written to the cache."""
+        total = self.total_input_tokens
+        return self.cache_creation_input_tokens / total if total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.requests} requests, "
+            f"{self.total_input_tokens} input tokens, "
+            f"cache read {self.read_ratio:.1%}, "
+            f"cache write {self.creation_ratio:.1%}"
+        )
+
+
+class CachePlanner:
+    """Places prompt cache breakpoints on tools, system and history.
+
+    The API caches the prompt prefix up to each breakpoint, in the order
+    tools, system, messages. One breakpoint goes on the last tool and one
+    on the system prompt; the rest go to the history, which marks its last
+    message and the previous request's last message so each request reads
+    the cache written by the one before it.
+    """
+
+    def __init__(
+        self,
+        cache_tools: bool = True,
+        cache_system: bool = True,
+        max_breakpoints: int = MAX_CACHE_BREAKPOINTS,
+    ):
+        self.cache_tools = cache_tools
+        self.cache_system = cache_system
+        self.max_breakpoints = max_breakpoints
+
+    def tools(self, tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Mark the end of the tool definitions."""
+        if not self.cache_tools or not tools:
+            return tools
+        return [*tools[:-1], {**tools[-1], "cache_control": CACHE_CONTROL}]
+
+    def system(self, system: str) -> str | list[dict[str, Any]]:
+        """Mark the system prompt."""
+        if not self.cache_system or not system:
+            return system
+        return [
+            {"type": "text", "text": system, "cache_control": CACHE_CONTROL}
+        ]
+
+    def history_breakpoints(self, has_tools: bool, has_system: bool) -> int:
+        """Breakpoints left over for the message history."""
+        used = (self.cache_tools and has_tools) + (
+            self.cache_system and has_system
+        )
+        return max(self.max_breakpoints - used, 0)
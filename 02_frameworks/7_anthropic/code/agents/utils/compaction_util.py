@@ -0,0 +1,105 @@
+"""Summarizing context compaction for message history."""
+
+import json
+from typing import Any
+
+from .token_util import block_to_dict
+
+SUMMARY_PREFIX = "[Summary of earlier conversation]"
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You compress agent transcripts. Write a concise summary of the "
+    "conversation below that preserves every fact, decision, file path, "
+    "identifier, number and tool result the agent may need later, so it "
+    "does not have to call tools again to recover them. If the transcript "
+    "starts with an earlier summary, fold it into the new one. Reply with "
+    "the summary only."
+)
+
+
+def render_transcript(
+    messages: list[dict[str, Any]], max_block_chars: int = 4000
+) -> str:
+    """Render API messages as plain text for the summarizer."""
+
+    def clip(text: str) -> str:
+        if len(text) <= max_block_chars:
+            return text
+        return text[:max_block_chars] + " [...]"
+
+    lines = []
+    for message in messages:
+        for block in message["content"]:
+            block = block_to_dict(block)
+            block_type = block.get("type")
+            if block_type == "text":
+                lines.append(f"{message['role']}: {clip(block['text'])}")
+            elif block_type == "tool_use":
+                lines.append(
+                    f"tool call {block['name']}: "
+                    f"{clip(json.dumps(block['input'], default=str))}"
+                )
+            elif block_type == "tool_result":
+                content = block.get("content", "")
+                if not isinstance(content, str):
+                    content = " ".join(
+                        block_to_dict(part).get("text", "")
+                        for part in content
+                    )
+                lines.append(f"tool result: {clip(content)}")
+    return "\n".join(lines)
+
+
+class SummaryCompactor:
+    """Folds evicted turns into a rolling summary using a cheaper model.
+
+    Compaction starts in the background once the history reaches
+    ``trigger_ratio`` of the context window, and evicts the oldest turns
+    until it is back under ``target_ratio``. The summary replaces the
+    first message and only changes on the next compaction, so the cached
+    prompt prefix stays stable in between.
+    """
+
+    def __init__(
+        self,
+        model: str = "claude-3-5-haiku-20241022",
+        trigger_ratio: float = 0.75,
+        target_ratio: float = 0.5,
+        max_summary_tokens: int = 1024,
+    ):
+        if not 0 < target_ratio < trigger_ratio <= 1:
+            raise ValueError(
+                "Expected 0 < target_ratio < trigger_ratio <= 1"
+            )
+        self.model = model
+        self.trigger_ratio = trigger_ratio
+        self.target_ratio = target_ratio
+        self.max_summary_tokens = max_summary_tokens
+        self.stats = {"compactions": 0, "input_tokens": 0, "output_tokens": 0}
+
+    async def summarize(
+        self, client: Any, messages: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Summarize messages into a single user message."""
+        response = await client.messages.create(
+            model=self.model,
+            max_tokens=self.max_summary_tokens,
+            system=SUMMARY_SYSTEM_PROMPT,
+            messages=[
+                {"role": "user", "content": render_transcript(messages)}
+            ],
+        )
+        summary = "".join(
+            block.text for block in response.content if block.type == "text"
+        )
+
+        self.stats["compactions"] += 1
+        self.stats["input_tokens"] += response.usage.input_tokens
+        self.stats["output_tokens"] += response.usage.output_tokens
+
+        return {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": f"{SUMMARY_PREFIX}\n{summary}"}
+            ],
+        }
@@ -1,7 +1,11 @@
 """Connection handling for MCP servers."""
 
+import asyncio
+import json
+import time
 from abc import ABC, abstractmethod
-from contextlib import AsyncExitStack
+from collections.abc import AsyncIterator, Callable
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import Any
 
 from mcp import ClientSession, StdioServerParameters
@@ -58,6 +62,10 @@ class MCPConnection(ABC):
         """Call a tool on the MCP server with provided arguments."""
         return await self.session.call_tool(tool_name, arguments=arguments)
 
+    async def ping(self) -> None:
+        """Check that the MCP server is still responding."""
+        await self.session.send_ping()
+
 
 class MCPConnectionStdio(MCPConnection):
     """MCP connection using standard input/output."""
@@ -114,37 +122,295 @@ def create_mcp_connection(config: dict[str, Any]) -> MCPConnection:
         raise ValueError(f"Unsupported connection type: {conn_type}")
 
 
-async def setup_mcp_connections(
-    mcp_servers: list[dict[str, Any]] | None,
-    stack: AsyncExitStack,
-) -> list[MCPTool]:
-    """Set up MCP server connections and create tool interfaces."""
-    if not mcp_servers:
-        return []
+# Results of read-only MCP tools are reused for this many seconds
+READ_ONLY_TOOL_CACHE_TTL = 60.0
 
-    mcp_tools = []
 
-    for config in mcp_servers:
-        try:
-            connection = create_mcp_connection(config)
-            await stack.enter_async_context(connection)
-            tool_definitions = await connection.list_tools()
+def _is_read_only(tool_info: Any) -> bool:
+    """Whether the server declares a tool as read-only."""
+    annotations = getattr(tool_info, "annotations", None)
+    return bool(getattr(annotations, "readOnlyHint", False))
+
+
+def _config_key(config: dict[str, Any]) -> str:
+    """Stable pool key for a server configuration."""
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+class PooledConnection:
+    """An MCP connection kept open by the pool between agent runs.
+
+    The connection is entered and exited by a dedicated task, because the
+    stdio and SSE transports must be closed from the task that opened
+    them. Tool listings are fetched once per (re)connect and cached.
+    """
+
+    def __init__(self, config: dict[str, Any]):
+        self.config = config
+        self.connection: MCPConnection | None = None
+        self.tools: list[MCPTool] = []
+        self.leases = 0
+        self.last_used = time.monotonic()
+        self.last_checked = time.monotonic()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error: BaseException | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def alive(self) -> bool:
+        """Whether the connection is open in the running event loop."""
+        return (
+            self.connection is not None
+            and self._task is not None
+            and not self._task.done()
+            and self.loop is asyncio.get_running_loop()
+        )
 
-            for tool_info in tool_definitions:
-                mcp_tools.append(
+    async def _run(self) -> None:
+        try:
+            async with create_mcp_connection(self.config) as connection:
+                tool_definitions = await connection.list_tools()
+                self.tools = [
                     MCPTool(
                         name=tool_info.name,
                         description=tool_info.description
                         or f"MCP tool: {tool_info.name}",
                         input_schema=tool_info.inputSchema,
-                        connection=connection,
+                        connection=self,
+                        cacheable=_is_read_only(tool_info),
+                        cache_ttl=READ_ONLY_TOOL_CACHE_TTL,
+                        server_key=_config_key(self.config),
                     )
-                )
-
+                    for tool_info in tool_definitions
+                ]
+                self.connection = connection
+                self._ready.set()
+                await self._closing.wait()
         except Exception as e:
-            print(f"Error setting up MCP server {config}: {e}")
+            self._error = e
+        finally:
+            self.connection = None
+            self._ready.set()
+
+    async def connect(self) -> None:
+        """Open (or reopen) the connection and list its tools."""
+        await self.close()
+        self.loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error = None
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        self.last_checked = time.monotonic()
+
+    async def close(self) -> None:
+        """Close the connection if it is open."""
+        task = self._task
+        self._task = None
+        if task is None or task.done():
+            return
+        if self.loop is not asyncio.get_running_loop():
+            # The loop that owned this connection is gone
+            return
+        self._closing.set()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def ensure_healthy(self, check_interval: float) -> None:
+        """Reconnect if the connection is closed or fails a ping."""
+        async with self._lock:
+            if not self.alive:
+                await self.connect()
+                return
+            if time.monotonic() - self.last_checked < check_interval:
+                return
+            try:
+                await self.connection.ping()
+                self.last_checked = time.monotonic()
+            except Exception:
+                await self.connect()
+
+    async def call_tool(
+        self, tool_name: str, arguments: dict[str, Any]
+    ) -> Any:
+        """Call a tool, reconnecting first if the connection was lost."""
+        if not self.alive:
+            async with self._lock:
+                if not self.alive:
+                    await self.connect()
+        return await self.connection.call_tool(tool_name, arguments)
+
+
+class MCPConnectionPool:
+    """Long-lived MCP connections shared across agents and runs.
+
+    Connections are keyed by server configuration, checked with a ping
+    before they are lent out (at most every ``health_check_interval``
+    seconds) and closed after ``idle_timeout`` seconds without a lease.
+    Connections belong to the event loop that opened them; a pool used
+    from a new loop (e.g. successive ``Agent.run()`` calls) reconnects.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+    ):
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._connections: dict[str, PooledConnection] = {}
+        self._reaper: asyncio.Task | None = None
+
+    async def acquire(self, config: dict[str, Any]) -> PooledConnection:
+        """Return a healthy pooled connection for a server config."""
+        key = _config_key(config)
+        pooled = self._connections.get(key)
+        if pooled is None or pooled.loop not in (
+            None,
+            asyncio.get_running_loop(),
+        ):
+            pooled = PooledConnection(config)
+            self._connections[key] = pooled
+
+        self._start_reaper()
+        await pooled.ensure_healthy(self.health_check_interval)
+        return pooled
+
+    def hold(self, pooled: PooledConnection) -> None:
+        """Mark a pooled connection as borrowed."""
+        pooled.leases += 1
+
+    def release(self, pooled: PooledConnection) -> None:
+        """Return a borrowed connection to the pool."""
+        pooled.leases -= 1
+        pooled.last_used = time.monotonic()
+
+    @asynccontextmanager
+    async def lease(
+        self, config: dict[str, Any]
+    ) -> AsyncIterator[PooledConnection]:
+        """Borrow a connection for the duration of an agent run."""
+        pooled = await self.acquire(config)
+        self.hold(pooled)
+        try:
+            yield pooled
+        finally:
+            self.release(pooled)
+
+    def _start_reaper(self) -> None:
+        reaper = self._reaper
+        loop = asyncio.get_running_loop()
+        if reaper is None or reaper.done() or reaper.get_loop() is not loop:
+            self._reaper = loop.create_task(self._reap_idle())
+
+    async def _reap_idle(self) -> None:
+        while self._connections:
+            await asyncio.sleep(self.idle_timeout / 2)
+            await self.evict_idle()
+
+    async def evict_idle(self) -> None:
+        """Close connections that have not been leased recently."""
+        now = time.monotonic()
+        for key, pooled in list(self._connections.items()):
+            if pooled.leases == 0 and now - pooled.last_used > (
+                self.idle_timeout
+            ):
+                del self._connections[key]
+                await pooled.close()
+
+    async def close(self) -> None:
+        """Close every pooled connection."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        connections = list(self._connections.values())
+        self._connections.clear()
+        for pooled in connections:
+            await pooled.close()
+
+
+# Shared by all agents that are not given a pool explicitly
+default_pool = MCPConnectionPool()
+
+
+async def setup_mcp_connections(
+    mcp_servers: list[dict[str, Any]] | None,
+    stack: AsyncExitStack,
+    pool: MCPConnectionPool | None = None,
+    startup_timeout: float | None = None,
+    connect_timeout: float = 30.0,
+    on_late_tools: Callable[[list[MCPTool]], None] | None = None,
+) -> list[MCPTool]:
+    """Borrow pooled MCP connections and return their tool interfaces.
+
+    All servers connect concurrently, each bounded by ``connect_timeout``
+    (or a per-server ``"timeout"`` in its config). Servers that are not
+    ready after ``startup_timeout`` keep connecting in the background and
+    their tools are passed to ``on_late_tools`` when they arrive, until
+    ``stack`` closes. Leases are released when ``stack`` closes; the
+    connections stay open in the pool for the next run.
+    """
+    if not mcp_servers:
+        return []
+
+    pool = pool or default_pool
+    closed = False
+
+    async def connect(config: dict[str, Any]) -> PooledConnection:
+        timeout = config.get("timeout", connect_timeout)
+        return await asyncio.wait_for(pool.acquire(config), timeout)
+
+    def borrow(task: asyncio.Task, config: dict[str, Any]) -> list[MCPTool]:
+        if task.cancelled():
+            return []
+        error = task.exception()
+        if isinstance(error, asyncio.TimeoutError):
+            print(f"Timed out connecting to MCP server {config}")
+            return []
+        if error is not None:
+            print(f"Error setting up MCP server {config}: {error}")
+            return []
+        pooled = task.result()
+        pool.hold(pooled)
+        stack.callback(pool.release, pooled)
+        return pooled.tools
+
+    def on_late_connect(task: asyncio.Task, config: dict[str, Any]) -> None:
+        if closed:
+            return
+        tools = borrow(task, config)
+        if tools and on_late_tools:
+            print(f"Loaded {len(tools)} MCP tools from late server.")
+            on_late_tools(tools)
+
+    def close() -> None:
+        nonlocal closed
+        closed = True
+        for task in tasks:
+            task.cancel()
+
+    tasks = {
+        asyncio.create_task(connect(config)): config for config in mcp_servers
+    }
+    stack.callback(close)
+    done, pending = await asyncio.wait(tasks, timeout=startup_timeout)
+
+    mcp_tools = []
+    for task in done:
+        mcp_tools.extend(borrow(task, tasks[task]))
+    for task in pending:
+        config = tasks[task]
+        print(f"MCP server {config} is still connecting")
+        task.add_done_callback(
+            lambda task, config=config: on_late_connect(task, config)
+        )
 
     print(
-        f"Loaded {len(mcp_tools)} MCP tools from {len(mcp_servers)} servers."
+        f"Loaded {len(mcp_tools)} MCP tools from "
+        f"{len(mcp_servers) - len(pending)} servers."
     )
     return mcp_tools
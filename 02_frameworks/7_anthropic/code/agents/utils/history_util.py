@@ -1,10 +1,34 @@
 """Message history with token tracking and prompt caching."""
 
+import asyncio
+from bisect import bisect_left
 from typing import Any
 
+from .cache_util import CACHE_CONTROL
+from .compaction_util import SummaryCompactor
+from .token_util import TokenEstimator, block_to_dict, default_estimator
+from .trace_util import NULL_OBSERVER, AgentObserver
+
+TRUNCATION_NOTICE_TOKENS = 25
+TRUNCATION_MESSAGE = {
+    "role": "user",
+    "content": [
+        {
+            "type": "text",
+            "text": "[Earlier history has been truncated.]",
+        }
+    ],
+}
+
 
 class MessageHistory:
-    """Manages chat history with token tracking and context management."""
+    """Manages chat history with token tracking and context management.
+
+    Messages live in an append-only buffer with a head offset, so evicting
+    the oldest turns is O(1) amortized. A prefix sum of per-message token
+    costs lets truncate() find the cut point with a binary search, and the
+    API payload is kept alongside the buffer and reused between turns.
+    """
 
     def __init__(
         self,
@@ -13,33 +37,73 @@ class MessageHistory:
         context_window_tokens: int,
         client: Any,
         enable_caching: bool = True,
+        estimator: TokenEstimator | None = None,
+        compactor: SummaryCompactor | None = None,
+        observer: AgentObserver | None = None,
     ):
         self.model = model
         self.system = system
         self.context_window_tokens = context_window_tokens
-        self.messages: list[dict[str, Any]] = []
-        self.total_tokens = 0
         self.enable_caching = enable_caching
-        self.message_tokens: list[tuple[int, int]] = (
-            []
-        )  # List of (input_tokens, output_tokens) tuples
         self.client = client
+        self.estimator = estimator or default_estimator
+        self.compactor = compactor
+        self.observer = observer or NULL_OBSERVER
 
-        # set initial total tokens to system prompt
-        try:
-            system_token = (
-                self.client.messages.count_tokens(
-                    model=self.model,
-                    system=self.system,
-                    messages=[{"role": "user", "content": "test"}],
-                ).input_tokens
-                - 1
-            )
+        self._messages: list[dict[str, Any]] = []
+        self._head = 0
+        # _cum[i] is the token cost of all messages before index i
+        self._cum: list[int] = [0]
+        # Correction for the head message after it became a notice
+        self._head_adjust = 0
+        # Index past the last message whose cost came from API usage
+        self._billed_end = 0
+        # Raw estimates of messages not yet billed by the API
+        self._pending_raw: list[int] = []
+
+        self._payload: list[dict[str, Any]] = []
+        # Buffer indices whose payload entry carries a cache breakpoint
+        self._marked: set[int] = set()
+        self._last_breakpoint = -1
+
+        # Background summary of messages [head, end] while it is running
+        self._compaction: asyncio.Task | None = None
+        self._compaction_end = 0
+
+        # set initial total tokens to system prompt, estimated locally
+        self.system_tokens = self.estimator.count_system(self.system)
+
+    @property
+    def messages(self) -> list[dict[str, Any]]:
+        """Messages currently in the context window."""
+        return self._messages[self._head :]
+
+    @property
+    def total_tokens(self) -> int:
+        """System prompt plus every message in the window, in tokens."""
+        return (
+            self.system_tokens
+            + self._cum[-1]
+            - self._cum[self._head]
+            + self._head_adjust
+        )
+
+    @property
+    def pending_tokens(self) -> int:
+        """Estimated tokens of messages added since the last response."""
+        return self._cum[-1] - self._cum[self._billed_end]
 
-        except Exception:
-            system_token = len(self.system) / 4
+    def _set_tail_costs(self, start: int, costs: list[int]) -> None:
+        """Overwrite the costs of messages from ``start`` to the end."""
+        del self._cum[start + 1 :]
+        for cost in costs:
+            self._cum.append(self._cum[-1] + max(cost, 0))
 
-        self.total_tokens = system_token
+    def _append(self, message: dict[str, Any], cost: int) -> None:
+        """Append a message to the buffer and the API payload."""
+        self._messages.append(message)
+        self._cum.append(self._cum[-1] + max(cost, 0))
+        self._payload.append(message)
 
     async def add_message(
         self,
@@ -47,78 +111,213 @@ class MessageHistory:
         content: str | list[dict[str, Any]],
         usage: Any | None = None,
     ):
-        """Add a message to the history and track token usage."""
+        """Add a message to the history and track token usage.
+
+        Messages are counted with the local estimator when added, so
+        truncate() can act before the request is sent. Once an assistant
+        response reports its usage, the estimates are replaced with the
+        real numbers and used to calibrate the estimator.
+        """
         if isinstance(content, str):
             content = [{"type": "text", "text": content}]
 
         message = {"role": role, "content": content}
-        self.messages.append(message)
 
         if role == "assistant" and usage:
             total_input = (
                 usage.input_tokens
-                + getattr(usage, "cache_read_input_tokens", 0)
-                + getattr(usage, "cache_creation_input_tokens", 0)
+                + (getattr(usage, "cache_read_input_tokens", 0) or 0)
+                + (getattr(usage, "cache_creation_input_tokens", 0) or 0)
             )
             output_tokens = usage.output_tokens
 
-            current_turn_input = total_input - self.total_tokens
-            self.message_tokens.append((current_turn_input, output_tokens))
-            self.total_tokens += current_turn_input + output_tokens
+            pending_raw = sum(self._pending_raw)
+            billed_tokens = self.total_tokens - self.pending_tokens
+            current_turn_input = total_input - billed_tokens
+
+            # The first turn also bills tool definitions, so skip it
+            if self._billed_end > self._head:
+                self.estimator.calibrate(pending_raw, current_turn_input)
+            self.estimator.calibrate(
+                self.estimator.raw_count_message(message), output_tokens
+            )
+
+            # Spread the billed input over the pending messages
+            if self._pending_raw:
+                costs = [
+                    round(current_turn_input * raw / max(pending_raw, 1))
+                    for raw in self._pending_raw
+                ]
+                costs[-1] = current_turn_input - sum(costs[:-1])
+                self._set_tail_costs(self._billed_end, costs)
+            self._pending_raw = []
+
+            self._append(message, output_tokens)
+            self._billed_end = len(self._messages)
+        else:
+            raw = self.estimator.raw_count_message(message)
+            self._pending_raw.append(raw)
+            self._append(message, round(raw * self.estimator.scale))
+
+    def _find_cut(self, limit: float, replacement_tokens: int) -> int:
+        """Find the first message to keep so the window fits in ``limit``.
+
+        Returns the smallest pair boundary j where evicting [head, j) and
+        replacing message j with ``replacement_tokens`` worth of content
+        brings the total under the limit, i.e. the first _cum[j + 1]
+        reaching the target below. Returns the end of the billed history
+        if no such boundary exists.
+        """
+        head = self._head
+        billed_end = self._billed_end
+        target = (
+            self._cum[head]
+            - self._head_adjust
+            + self.total_tokens
+            - limit
+            + replacement_tokens
+        )
+        cut = bisect_left(self._cum, target, head + 3, billed_end + 1) - 1
+        if (cut - head) % 2:
+            cut += 1
+        return min(cut, billed_end)
+
+    def _evict_until(
+        self, cut: int, replacement: dict[str, Any], replacement_tokens: int
+    ) -> None:
+        """Evict messages before ``cut`` and replace the new head message."""
+        self._head = cut
+        self._head_adjust = 0
+        if cut < self._billed_end:
+            cost = self._cum[cut + 1] - self._cum[cut]
+            self._messages[cut] = replacement
+            self._head_adjust = replacement_tokens - cost
+
+        self._payload = self._messages[self._head :]
+        self._marked = set()
+        self._compact()
+
+    def _update_compaction(self) -> None:
+        """Apply a finished summary, or start one above the trigger."""
+        task = self._compaction
+        if task is not None and task.done():
+            self._compaction = None
+            if not task.cancelled():
+                tokens_before = self.total_tokens
+                messages = self._compaction_end + 1 - self._head
+                error = task.exception()
+                if error is None:
+                    summary = task.result()
+                    self._evict_until(
+                        self._compaction_end,
+                        summary,
+                        self.estimator.count_message(summary),
+                    )
+                self.observer.on_compaction(
+                    messages, tokens_before, self.total_tokens, error
+                )
+
+        window = self.context_window_tokens
+        if (
+            self._compaction is not None
+            or self.total_tokens <= self.compactor.trigger_ratio * window
+        ):
+            return
+
+        end = self._find_cut(
+            self.compactor.target_ratio * window,
+            self.compactor.max_summary_tokens,
+        )
+        # Never fold in the unanswered message at the end of the history
+        end = min(end, self._billed_end - 2)
+        if end < self._head + 2:
+            return
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        self._compaction_end = end
+        self._compaction = asyncio.create_task(
+            self.compactor.summarize(
+                self.client, self._messages[self._head : end + 1]
+            )
+        )
 
     def truncate(self) -> None:
-        """Remove oldest messages when context window limit is exceeded."""
+        """Remove oldest messages when context window limit is exceeded.
+
+        Whole user/assistant pairs are evicted from the head, and the
+        message that becomes the first one is replaced with a notice. With
+        a compactor, evicted turns are folded into a summary in the
+        background before the hard limit is reached.
+        """
+        if self.compactor:
+            self._update_compaction()
+
         if self.total_tokens <= self.context_window_tokens:
             return
+        if self._billed_end - self._head < 2:
+            return
 
-        TRUNCATION_NOTICE_TOKENS = 25
-        TRUNCATION_MESSAGE = {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": "[Earlier history has been truncated.]",
-                }
-            ],
-        }
+        # A pending summary would cover turns that are evicted below
+        if self._compaction is not None:
+            self._compaction.cancel()
+            self._compaction = None
 
-        def remove_message_pair():
-            self.messages.pop(0)
-            self.messages.pop(0)
+        cut = self._find_cut(
+            self.context_window_tokens, TRUNCATION_NOTICE_TOKENS
+        )
+        self._evict_until(cut, TRUNCATION_MESSAGE, TRUNCATION_NOTICE_TOKENS)
 
-            if self.message_tokens:
-                input_tokens, output_tokens = self.message_tokens.pop(0)
-                self.total_tokens -= input_tokens + output_tokens
+    def _compact(self) -> None:
+        """Drop evicted messages once they make up half the buffer."""
+        if self._head < 64 or self._head * 2 < len(self._messages):
+            return
+        head = self._head
+        del self._messages[:head]
+        del self._cum[:head]
+        self._billed_end -= head
+        self._last_breakpoint -= head
+        self._head = 0
 
-        while (
-            self.message_tokens
-            and len(self.messages) >= 2
-            and self.total_tokens > self.context_window_tokens
-        ):
-            remove_message_pair()
+    def format_for_api(self, breakpoints: int = 1) -> list[dict[str, Any]]:
+        """Format messages for Claude API with optional caching.
 
-            if self.messages and self.message_tokens:
-                original_input_tokens, original_output_tokens = (
-                    self.message_tokens[0]
-                )
-                self.messages[0] = TRUNCATION_MESSAGE
-                self.message_tokens[0] = (
-                    TRUNCATION_NOTICE_TOKENS,
-                    original_output_tokens,
-                )
-                self.total_tokens += (
-                    TRUNCATION_NOTICE_TOKENS - original_input_tokens
-                )
+        Up to ``breakpoints`` messages get cache_control on their last
+        block, in priority order: the last message, the last message of
+        the previous request (so this request reads what that one cached)
+        and the first message, which holds the summary after compaction.
+
+        The returned list is owned by the history and reused between
+        turns; only the marked copies of messages change.
+        """
+        payload = self._payload
+        head = self._head
+        end = head + len(payload)
+
+        wanted: list[int] = []
+        if self.enable_caching:
+            for index in (end - 1, self._last_breakpoint, head):
+                if (
+                    head <= index < end
+                    and index not in wanted
+                    and len(wanted) < breakpoints
+                ):
+                    wanted.append(index)
+
+        for index in self._marked - set(wanted):
+            payload[index - head] = self._messages[index]
+        for index in set(wanted) - self._marked:
+            message = self._messages[index]
+            content = [block_to_dict(block) for block in message["content"]]
+            content[-1] = {**content[-1], "cache_control": CACHE_CONTROL}
+            payload[index - head] = {
+                "role": message["role"],
+                "content": content,
+            }
+        self._marked = set(wanted)
 
-    def format_for_api(self) -> list[dict[str, Any]]:
-        """Format messages for Claude API with optional caching."""
-        result = [
-            {"role": m["role"], "content": m["content"]} for m in self.messages
-        ]
-
-        if self.enable_caching and self.messages:
-            result[-1]["content"] = [
-                {**block, "cache_control": {"type": "ephemeral"}}
-                for block in self.messages[-1]["content"]
-            ]
-        return result
+        self._last_breakpoint = end - 1
+        return payload
@@ -0,0 +1,102 @@
+"""Client-side rate limiting."""
+
+import asyncio
+import time
+import weakref
+
+
+class TokenBucket:
+    """Token bucket rate limiter for coroutines.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``;
+    acquire() waits until enough tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        # One lock per event loop, as a lock is bound to the loop it is
+        # first contended on; the tokens are shared by all of them
+        self._locks: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Lock
+        ] = weakref.WeakKeyDictionary()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until ``tokens`` can be taken from the bucket."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._locks:
+            self._locks[loop] = asyncio.Lock()
+        async with self._locks[loop]:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` now if available; else seconds until they are.
+
+        Returns 0.0 when the tokens were taken.
+        """
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+
+class RateLimiter:
+    """Client-side request and input token budgets for model calls.
+
+    Share one instance between agents to keep a whole process under the
+    API's per-minute limits instead of finding them by hitting 429s.
+    When the server still rate limits, pause() holds every caller until
+    its retry-after has passed, so they do not all retry at once.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        input_tokens_per_minute: float | None = None,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_minute / 60)
+            if requests_per_minute
+            else None
+        )
+        self.input_tokens = (
+            TokenBucket(input_tokens_per_minute / 60)
+            if input_tokens_per_minute
+            else None
+        )
+        self._resume_at = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Hold all callers for ``seconds`` from now."""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def acquire(self, input_tokens: int = 0) -> float:
+        """Wait for budget for one request; returns seconds waited."""
+        start = time.monotonic()
+        while (wait := self._resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(wait)
+        if self.requests:
+            await self.requests.acquire()
+        if self.input_tokens and input_tokens:
+            # A prompt larger than a second's budget waits for a full bucket
+            await self.input_tokens.acquire(
+                min(input_tokens, self.input_tokens.capacity)
+            )
+        return time.monotonic() - start
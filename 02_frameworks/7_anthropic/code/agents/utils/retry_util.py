@@ -0,0 +1,219 @@
+"""Retries, backoff and circuit breaking for model calls."""
+
+import random
+import time
+from dataclasses import dataclass
+
+from anthropic import APIConnectionError
+
+from .rate_util import RateLimiter
+
+# Statuses worth retrying, as the Anthropic SDK retries them
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+# Statuses that mean the API is struggling, as opposed to rate limiting
+OVERLOAD_STATUSES = {500, 502, 503, 504, 529}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model while the circuit is open."""
+
+
+def status_of(error: BaseException) -> int | None:
+    """HTTP status of an API error, if it has one."""
+    return getattr(error, "status_code", None)
+
+
+def retry_after(error: BaseException) -> float | None:
+    """Seconds the server asked to wait, from retry-after(-ms) headers."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP dates are rare for this API; fall back to backoff
+        return None
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed request may succeed if sent again."""
+    if isinstance(error, APIConnectionError):
+        return True
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    should_retry = headers.get("x-should-retry") if headers else None
+    if should_retry in ("true", "false"):
+        return should_retry == "true"
+    return status_of(error) in RETRYABLE_STATUSES
+
+
+def is_overload(error: BaseException) -> bool:
+    """Whether an error means the API is overloaded or unreachable."""
+    return (
+        isinstance(error, APIConnectionError)
+        or status_of(error) in OVERLOAD_STATUSES
+    )
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter.
+
+    Attempt ``n`` (from 0) waits a random time up to
+    ``base_delay * 2**n``, capped at ``max_delay``, and at least as long
+    as a retry-after from the server. A retry-after beyond
+    ``max_retry_after`` is raised instead of waited for.
+    """
+
+    max_retries: int = 6
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    max_retry_after: float = 60.0
+
+    def delay(
+        self, attempt: int, error: BaseException, rng: random.Random
+    ) -> float | None:
+        """Seconds to wait before retrying, or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        hint = retry_after(error)
+        if hint is not None and hint > self.max_retry_after:
+            return None
+        cap = min(self.max_delay, self.base_delay * 2**attempt)
+        delay = rng.uniform(0, cap)
+        # Never sooner than the server asked; callers told the same time
+        # spread out as their backoff grows
+        return max(delay, hint) if hint is not None else delay
+
+
+class CircuitBreaker:
+    """Fails fast after repeated overload errors.
+
+    After ``failure_threshold`` overload errors in a row the circuit
+    opens and calls raise CircuitOpenError without reaching the API.
+    After ``reset_timeout`` seconds one probe call is let through; its
+    success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probe_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open`` or ``half_open``."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead."""
+        state = self.state
+        if state == "closed":
+            return
+        now = time.monotonic()
+        # A probe that never reported back (e.g. cancelled) is replaced
+        if state == "half_open" and (
+            self._probe_at is None
+            or now - self._probe_at > self.reset_timeout
+        ):
+            self._probe_at = now
+            return
+        remaining = self.reset_timeout - (now - self.opened_at)
+        raise CircuitOpenError(
+            f"Model API overloaded; circuit open for another "
+            f"{max(remaining, 0):.1f}s"
+        )
+
+    def record(self, overloaded: bool) -> None:
+        """Record the outcome of a call that was allowed."""
+        self._probe_at = None
+        if not overloaded:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or (
+            self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+
+
+class ModelCallGuard:
+    """Retry policy, rate limiter and circuit breaker for model calls.
+
+    Share one guard between agents (like a ToolScheduler) so they share
+    the rate budget and the view of whether the API is overloaded.
+    Retry counts are kept in ``stats``.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy | None = None,
+        rate_limiter: RateLimiter | None = None,
+        breaker: CircuitBreaker | None = None,
+        seed: int | None = None,
+    ):
+        self.policy = policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker or CircuitBreaker()
+        self.random = random.Random(seed)
+        self.stats = {
+            "calls": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "overloaded": 0,
+            "rejected": 0,
+            "limiter_wait": 0.0,
+        }
+
+    async def before_call(self, input_tokens: int = 0) -> None:
+        """Wait for rate budget; raise CircuitOpenError to shed load."""
+        try:
+            self.breaker.allow()
+        except CircuitOpenError:
+            self.stats["rejected"] += 1
+            raise
+        if self.rate_limiter:
+            self.stats["limiter_wait"] += await self.rate_limiter.acquire(
+                input_tokens
+            )
+        self.stats["calls"] += 1
+
+    def on_success(self) -> None:
+        self.breaker.record(overloaded=False)
+
+    def on_failure(
+        self, error: BaseException, attempt: int, retry: bool = True
+    ) -> float | None:
+        """Record a failed call; seconds to wait before retrying, or None.
+
+        Pass ``retry=False`` for failures that cannot be retried anyway,
+        such as a stream that broke after output was delivered.
+        """
+        overloaded = is_overload(error)
+        self.breaker.record(overloaded)
+        if overloaded:
+            self.stats["overloaded"] += 1
+        delay = None
+        if retry:
+            delay = self.policy.delay(attempt, error, self.random)
+        if status_of(error) == 429:
+            self.stats["rate_limited"] += 1
+            if delay is not None and self.rate_limiter:
+                self.rate_limiter.pause(delay)
+        if delay is not None:
+            self.stats["retries"] += 1
+        return delay
+
+
+# Shared by agents that are not given a guard of their own
+default_call_guard = ModelCallGuard()
@@ -0,0 +1,106 @@
+"""Offline token estimation calibrated against API usage."""
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+# Words, numbers and single punctuation marks roughly follow BPE boundaries
+_PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+_CHARS_PER_WORD_TOKEN = 6
+_MESSAGE_OVERHEAD_TOKENS = 4
+_IMAGE_TOKENS = 1600
+
+
+def heuristic_token_count(text: str) -> int:
+    """Approximate a BPE token count without a tokenizer."""
+    count = 0
+    for piece in _PIECE_PATTERN.findall(text):
+        count += -(-len(piece) // _CHARS_PER_WORD_TOKEN)
+    return count
+
+
+def block_to_dict(block: Any) -> dict[str, Any]:
+    """Convert an SDK content block (or dict) to a plain dict."""
+    if isinstance(block, dict):
+        return block
+    if hasattr(block, "model_dump"):
+        return block.model_dump(exclude_none=True)
+    return dict(vars(block))
+
+
+class TokenEstimator:
+    """Estimates token counts locally and calibrates against real usage.
+
+    The tokenizer is pluggable: any callable mapping text to a raw token
+    count can be used. Raw counts are multiplied by a scale factor that is
+    updated as real ``usage`` numbers come back from the API.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Callable[[str], int] | None = None,
+        cache_size: int = 256,
+        smoothing: float = 0.2,
+    ):
+        self.tokenizer = tokenizer or heuristic_token_count
+        self.cache_size = cache_size
+        self.smoothing = smoothing
+        self.scale = 1.0
+        self._cache: OrderedDict[str, int] = OrderedDict()
+
+    def _raw_count_cached(self, text: str) -> int:
+        """Raw token count with an LRU cache keyed by the text hash."""
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        count = self.tokenizer(text)
+        self._cache[key] = count
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return count
+
+    def raw_count_message(self, message: dict[str, Any]) -> int:
+        """Uncalibrated token count of a single API message."""
+        content = message["content"]
+        if isinstance(content, str):
+            return self.tokenizer(content) + _MESSAGE_OVERHEAD_TOKENS
+
+        count = _MESSAGE_OVERHEAD_TOKENS
+        for block in content:
+            block = block_to_dict(block)
+            block_type = block.get("type")
+            if block_type == "text":
+                count += self.tokenizer(block["text"])
+            elif block_type == "image":
+                count += _IMAGE_TOKENS
+            elif block_type == "tool_result":
+                count += self.raw_count_message(
+                    {"content": block.get("content", "")}
+                )
+            else:
+                count += self.tokenizer(json.dumps(block, default=str))
+        return count
+
+    def count_system(self, system: str) -> int:
+        """Estimate tokens for a system prompt (cached by prompt hash)."""
+        return round(self._raw_count_cached(system) * self.scale)
+
+    def count_message(self, message: dict[str, Any]) -> int:
+        """Estimate tokens for a single API message."""
+        return round(self.raw_count_message(message) * self.scale)
+
+    def calibrate(self, raw_estimate: int, actual_tokens: int) -> None:
+        """Move the scale factor towards an observed actual/raw ratio."""
+        if raw_estimate <= 0 or actual_tokens <= 0:
+            return
+        ratio = actual_tokens / raw_estimate
+        self.scale += self.smoothing * (ratio - self.scale)
+
+
+# Shared so calibration carries over between short-lived agents
+default_estimator = TokenEstimator()
@@ -1,19 +1,30 @@
 """Tool execution utility with parallel execution support."""
 
 import asyncio
+import time
+import weakref
+from contextlib import AsyncExitStack
 from typing import Any
 
+from ..tools.registry import ToolRegistry
+from .metrics_util import LatencyHistogram
+from .rate_util import TokenBucket
+from .trace_util import AgentObserver
+
 
 async def _execute_single_tool(
-    call: Any, tool_dict: dict[str, Any]
+    call: Any, tool_dict: ToolRegistry | dict[str, Any]
 ) -> dict[str, Any]:
     """Execute a single tool and handle errors."""
     response = {"type": "tool_result", "tool_use_id": call.id}
 
     try:
-        # Execute the tool directly
-        result = await tool_dict[call.name].execute(**call.input)
-        response["content"] = str(result)
+        # Execute the tool, or serve a memoized result
+        result = await tool_dict[call.name].run(**call.input)
+        # Lists are content blocks (e.g. text and images) passed as is
+        response["content"] = (
+            result if isinstance(result, list) else str(result)
+        )
     except KeyError:
         response["content"] = f"Tool '{call.name}' not found"
         response["is_error"] = True
@@ -24,16 +35,200 @@ async def _execute_single_tool(
     return response
 
 
+class ToolScheduler:
+    """Runs tool calls under concurrency limits, rate limits and deadlines.
+
+    - ``max_concurrency`` caps tool calls running at once across all tools
+    - ``tool_concurrency`` caps calls per tool name
+    - ``rate_limits`` limits calls per second per tool name
+    - ``timeout`` (or ``tool_timeouts`` per name) bounds each call; a call
+      that runs over returns an ``is_error`` result instead of hanging
+
+    cancel() stops every call in flight; cancelled calls return an
+    ``is_error`` result. Tools that run blocking code in a thread are only
+    abandoned, not interrupted. Execution latency is recorded per tool in
+    ``histograms``.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        tool_concurrency: dict[str, int] | None = None,
+        rate_limits: dict[str, float] | None = None,
+        timeout: float | None = 120.0,
+        tool_timeouts: dict[str, float] | None = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.tool_concurrency = tool_concurrency or {}
+        self.rate_limits = rate_limits or {}
+        self.timeout = timeout
+        self.tool_timeouts = tool_timeouts or {}
+        self.histograms: dict[str, LatencyHistogram] = {}
+        # Semaphores per event loop: asyncio primitives are bound to the
+        # loop that first waits on them, and each Agent.run() has its own
+        self._semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop,
+            tuple[asyncio.Semaphore, dict[str, asyncio.Semaphore]],
+        ] = weakref.WeakKeyDictionary()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._inflight: set[asyncio.Task] = set()
+
+    def _limits_for(self, name: str) -> list[asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = (
+                asyncio.Semaphore(self.max_concurrency),
+                {},
+            )
+        semaphore, tool_semaphores = self._semaphores[loop]
+        limits = [semaphore]
+        if name in self.tool_concurrency:
+            if name not in tool_semaphores:
+                tool_semaphores[name] = asyncio.Semaphore(
+                    self.tool_concurrency[name]
+                )
+            limits.append(tool_semaphores[name])
+        return limits
+
+    async def _wait_for_rate_limit(self, name: str) -> None:
+        if name not in self.rate_limits:
+            return
+        if name not in self._buckets:
+            self._buckets[name] = TokenBucket(self.rate_limits[name])
+        await self._buckets[name].acquire()
+
+    async def run(
+        self, call: Any, tool_dict: ToolRegistry | dict[str, Any]
+    ) -> dict[str, Any]:
+        """Execute one tool call under the scheduler's limits."""
+        async with AsyncExitStack() as stack:
+            for limit in self._limits_for(call.name):
+                await stack.enter_async_context(limit)
+            await self._wait_for_rate_limit(call.name)
+
+            start = time.monotonic()
+            timeout = self.tool_timeouts.get(call.name, self.timeout)
+            task = asyncio.create_task(_execute_single_tool(call, tool_dict))
+            self._inflight.add(task)
+            try:
+                done, _ = await asyncio.wait({task}, timeout=timeout)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._inflight.discard(task)
+
+            if not done:
+                task.cancel()
+                response = {
+                    "type": "tool_result",
+                    "tool_use_id": call.id,
+                    "content": f"Tool '{call.name}' timed out after "
+                    f"{timeout} seconds",
+                    "is_error": True,
+                }
+            elif task.cancelled():
+                response = {
+                    "type": "tool_result",
+                    "tool_use_id": call.id,
+                    "content": f"Tool '{call.name}' was cancelled",
+                    "is_error": True,
+                }
+            else:
+                response = task.result()
+
+        self.histograms.setdefault(call.name, LatencyHistogram()).observe(
+            time.monotonic() - start
+        )
+        return response
+
+    def cancel(self) -> None:
+        """Cancel every tool call in flight."""
+        for task in list(self._inflight):
+            task.cancel()
+
+
+async def _observed(
+    execution: Any, call: Any, observer: AgentObserver
+) -> dict[str, Any]:
+    """Await a tool execution between the observer's tool hooks."""
+    observer.on_tool_start(call)
+    try:
+        result = await execution
+    except BaseException as e:
+        observer.on_tool_end(call, None, e)
+        raise
+    observer.on_tool_end(call, result)
+    return result
+
+
 async def execute_tools(
-    tool_calls: list[Any], tool_dict: dict[str, Any], parallel: bool = True
+    tool_calls: list[Any],
+    tool_dict: ToolRegistry | dict[str, Any],
+    parallel: bool = True,
+    scheduler: ToolScheduler | None = None,
+    observer: AgentObserver | None = None,
 ) -> list[dict[str, Any]]:
     """Execute multiple tools sequentially or in parallel."""
 
+    def execute(call: Any):
+        if scheduler:
+            execution = scheduler.run(call, tool_dict)
+        else:
+            execution = _execute_single_tool(call, tool_dict)
+        if observer:
+            return _observed(execution, call, observer)
+        return execution
+
     if parallel:
-        return await asyncio.gather(
-            *[_execute_single_tool(call, tool_dict) for call in tool_calls]
-        )
+        return await asyncio.gather(*[execute(call) for call in tool_calls])
     else:
-        return [
-            await _execute_single_tool(call, tool_dict) for call in tool_calls
-        ]
+        return [await execute(call) for call in tool_calls]
+
+
+class ToolPipeline:
+    """Dispatch tool calls as soon as each tool_use block is complete.
+
+    Tools start running in the background while the model is still
+    streaming the rest of its turn; results() waits for all of them and
+    returns the tool_result blocks in submission order.
+    """
+
+    def __init__(
+        self,
+        tool_dict: ToolRegistry | dict[str, Any],
+        scheduler: ToolScheduler | None = None,
+        observer: AgentObserver | None = None,
+    ):
+        self.tool_dict = tool_dict
+        self.scheduler = scheduler
+        self.observer = observer
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def submit(self, call: Any) -> None:
+        """Start executing a tool call in the background."""
+        if call.id in self._tasks:
+            return
+        if self.scheduler:
+            execution = self.scheduler.run(call, self.tool_dict)
+        else:
+            execution = _execute_single_tool(call, self.tool_dict)
+        if self.observer:
+            execution = _observed(execution, call, self.observer)
+        self._tasks[call.id] = asyncio.create_task(execution)
+
+    async def results(self, tool_calls: list[Any]) -> list[dict[str, Any]]:
+        """Wait for the given tool calls, submitting any not yet started."""
+        for call in tool_calls:
+            self.submit(call)
+        return list(
+            await asyncio.gather(
+                *[self._tasks[call.id] for call in tool_calls]
+            )
+        )
+
+    def cancel(self) -> None:
+        """Cancel tool calls that are still running."""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,468 @@
+"""Agent instrumentation hooks, timing spans and an OTLP exporter."""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+
+class AgentObserver:
+    """Receives events from an Agent; every hook is a no-op.
+
+    Subclass and override the hooks of interest. Hooks are called inline
+    on the event loop, so they should return quickly. Tool hooks run in
+    the task executing the tool, which inherits the context of the turn
+    that started it.
+    """
+
+    def on_turn_start(self, agent: Any, user_input: str) -> None:
+        """A user turn starts."""
+
+    def on_turn_end(
+        self, agent: Any, error: BaseException | None = None
+    ) -> None:
+        """A user turn ends, with the exception that ended it if any."""
+
+    def on_truncate(
+        self,
+        tokens_before: int,
+        tokens_after: int,
+        seconds: float,
+    ) -> None:
+        """History management ran before a model call."""
+
+    def on_compaction(
+        self,
+        messages: int,
+        tokens_before: int,
+        tokens_after: int,
+        error: BaseException | None = None,
+    ) -> None:
+        """A background summary of the oldest ``messages`` was applied.
+
+        If summarizing failed, ``error`` is set and the history is
+        unchanged; a new summary starts on a later truncation.
+        """
+
+    def on_model_start(
+        self, params: dict[str, Any], prepare_seconds: float
+    ) -> None:
+        """A model request is sent; ``prepare_seconds`` built ``params``."""
+
+    def on_model_end(
+        self, response: Any, error: BaseException | None = None
+    ) -> None:
+        """A model response is complete (``response`` is None on error)."""
+
+    def on_tool_start(self, call: Any) -> None:
+        """A tool call is submitted for execution."""
+
+    def on_tool_end(
+        self,
+        call: Any,
+        result: dict[str, Any] | None,
+        error: BaseException | None = None,
+    ) -> None:
+        """A tool call finished with a tool_result block, or failed."""
+
+
+# Shared default: calling a no-op hook costs well under a microsecond
+NULL_OBSERVER = AgentObserver()
+
+
+def _new_id(length: int) -> str:
+    return os.urandom(length).hex()
+
+
+@dataclass
+class Span:
+    """A timed operation, shaped like an OpenTelemetry span."""
+
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: _new_id(8))
+    parent_id: str | None = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end (0 while the span is open)."""
+        if self.end_ns is None:
+            return 0.0
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+
+def _payload_bytes(value: Any) -> int:
+    """Size of a request or response fragment serialized as JSON."""
+
+    def default(obj: Any) -> Any:
+        if hasattr(obj, "model_dump"):
+            return obj.model_dump(exclude_none=True)
+        return str(obj)
+
+    return len(json.dumps(value, default=default).encode("utf-8"))
+
+
+_turn_span: ContextVar[Span | None] = ContextVar("turn_span", default=None)
+_model_span: ContextVar[Span | None] = ContextVar("model_span", default=None)
+
+
+class SpanRecorder(AgentObserver):
+    """Records agent activity as spans.
+
+    Each user turn is an ``agent.turn`` span; model calls, tool calls and
+    history truncation are its children. Attributes follow the
+    OpenTelemetry GenAI semantic conventions where one exists, so the
+    spans make sense in any tracing backend:
+
+    - model spans: request and response sizes in bytes, the time spent
+      building the request, and token usage including cache reads and
+      cache writes
+    - tool spans: tool name, call id and result size
+    - truncate spans: history tokens before and after
+    - compaction spans: messages summarized, history tokens before and
+      after, and the error if summarizing failed
+
+    The last ``max_spans`` finished spans are kept in ``spans``. With an
+    ``exporter``, the spans of each turn are exported when it ends.
+    Measuring payload sizes serializes every new message and the reply,
+    so ``measure_payloads`` can turn that off.
+    """
+
+    def __init__(
+        self,
+        exporter: "OTLPJsonExporter | None" = None,
+        max_spans: int = 10_000,
+        measure_payloads: bool = True,
+    ):
+        self.exporter = exporter
+        self.measure_payloads = measure_payloads
+        self.max_spans = max_spans
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+        self._tool_spans: dict[str, Span] = {}
+        self._pending: dict[str, list[Span]] = {}
+        self._parents: dict[str, Span | None] = {}
+        self._message_sizes: OrderedDict[int, tuple[Any, int]] = (
+            OrderedDict()
+        )
+
+    def _child(self, name: str, **attributes: Any) -> Span:
+        parent = _turn_span.get()
+        if parent is None:
+            return Span(name, _new_id(16), attributes=attributes)
+        return Span(
+            name,
+            parent.trace_id,
+            parent_id=parent.span_id,
+            attributes=attributes,
+        )
+
+    def _messages_bytes(self, messages: list[dict[str, Any]]) -> int:
+        """JSON size of the messages, memoized per message object.
+
+        Histories resend the same message objects every turn, so only
+        new messages are serialized.
+        """
+        total = 0
+        sizes = self._message_sizes
+        for message in messages:
+            entry = sizes.get(id(message))
+            if entry is None or entry[0] is not message:
+                # Keep a reference so the id is not reused while memoized
+                entry = sizes[id(message)] = (message, _payload_bytes(message))
+                if len(sizes) > self.max_spans:
+                    sizes.popitem(last=False)
+            total += entry[1] + 2
+        return total
+
+    def _record(self, span: Span) -> None:
+        self.spans.append(span)
+        if self.exporter is not None:
+            self._pending.setdefault(span.trace_id, []).append(span)
+
+    def on_turn_start(self, agent: Any, user_input: str) -> None:
+        # A turn inside another turn (an agent used as a tool) nests
+        parent = _turn_span.get()
+        span = self._child(
+            "agent.turn",
+            **{
+                "gen_ai.agent.name": agent.name,
+                "gen_ai.request.model": agent.config.model,
+            },
+        )
+        self._parents[span.span_id] = parent
+        _turn_span.set(span)
+
+    def on_turn_end(
+        self, agent: Any, error: BaseException | None = None
+    ) -> None:
+        span = _turn_span.get()
+        if span is None:
+            return
+        parent = self._parents.pop(span.span_id, None)
+        _turn_span.set(parent)
+        span.finish(error)
+        self._record(span)
+        if self.exporter is not None and parent is None:
+            self.exporter.export(self._pending.pop(span.trace_id, []))
+
+    def on_truncate(
+        self,
+        tokens_before: int,
+        tokens_after: int,
+        seconds: float,
+    ) -> None:
+        span = self._child(
+            "agent.truncate",
+            **{
+                "agent.history.tokens_before": tokens_before,
+                "agent.history.tokens_after": tokens_after,
+            },
+        )
+        span.end_ns = span.start_ns
+        span.start_ns -= int(seconds * 1e9)
+        self._record(span)
+
+    def on_compaction(
+        self,
+        messages: int,
+        tokens_before: int,
+        tokens_after: int,
+        error: BaseException | None = None,
+    ) -> None:
+        span = self._child(
+            "agent.compaction",
+            **{
+                "agent.compaction.messages": messages,
+                "agent.history.tokens_before": tokens_before,
+                "agent.history.tokens_after": tokens_after,
+            },
+        )
+        span.finish(error)
+        self._record(span)
+
+    def on_model_start(
+        self, params: dict[str, Any], prepare_seconds: float
+    ) -> None:
+        model = params.get("model")
+        span = self._child(
+            f"chat {model}",
+            **{
+                "gen_ai.operation.name": "chat",
+                "gen_ai.system": "anthropic",
+                "gen_ai.request.model": model,
+                "gen_ai.request.max_tokens": params.get("max_tokens"),
+                "agent.request.messages": len(params.get("messages", ())),
+                "agent.request.prepare_seconds": prepare_seconds,
+            },
+        )
+        if self.measure_payloads:
+            span.attributes["agent.request.bytes"] = _payload_bytes(
+                {key: params.get(key) for key in ("system", "tools")}
+            ) + self._messages_bytes(params.get("messages", []))
+            # Measuring is the recorder's own cost, not the model's
+            span.start_ns = time.time_ns()
+        _model_span.set(span)
+
+    def on_model_end(
+        self, response: Any, error: BaseException | None = None
+    ) -> None:
+        span = _model_span.get()
+        if span is None:
+            return
+        _model_span.set(None)
+        span.finish(error)
+        if response is not None:
+            usage = response.usage
+            span.attributes.update(
+                {
+                    "gen_ai.response.id": response.id,
+                    "gen_ai.response.model": response.model,
+                    "gen_ai.response.finish_reasons": [response.stop_reason],
+                    "gen_ai.usage.input_tokens": usage.input_tokens,
+                    "gen_ai.usage.output_tokens": usage.output_tokens,
+                    "gen_ai.usage.cache_read.input_tokens": getattr(
+                        usage, "cache_read_input_tokens", 0
+                    )
+                    or 0,
+                    "gen_ai.usage.cache_creation.input_tokens": getattr(
+                        usage, "cache_creation_input_tokens", 0
+                    )
+                    or 0,
+                }
+            )
+            if self.measure_payloads:
+                span.attributes["agent.response.bytes"] = _payload_bytes(
+                    response.content
+                )
+        self._record(span)
+
+    def on_tool_start(self, call: Any) -> None:
+        self._tool_spans[call.id] = self._child(
+            f"execute_tool {call.name}",
+            **{
+                "gen_ai.operation.name": "execute_tool",
+                "gen_ai.tool.name": call.name,
+                "gen_ai.tool.call.id": call.id,
+            },
+        )
+
+    def on_tool_end(
+        self,
+        call: Any,
+        result: dict[str, Any] | None,
+        error: BaseException | None = None,
+    ) -> None:
+        span = self._tool_spans.pop(call.id, None)
+        if span is None:
+            return
+        span.finish(error)
+        if result is not None:
+            content = result.get("content")
+            span.attributes["agent.tool.result_bytes"] = (
+                len(content.encode("utf-8"))
+                if isinstance(content, str)
+                else _payload_bytes(content)
+            )
+            if result.get("is_error"):
+                span.error = str(content)
+        self._record(span)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Count and total seconds of recorded spans by kind.
+
+        Kinds are the first word of the span name: ``agent.turn``,
+        ``agent.truncate``, ``agent.compaction``, ``chat`` and
+        ``execute_tool``.
+        """
+        totals: dict[str, dict[str, float]] = {}
+        for span in self.spans:
+            kind = span.name.split(" ", 1)[0]
+            entry = totals.setdefault(kind, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += span.duration
+        return totals
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    """An attribute value in the OTLP/JSON AnyValue encoding."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+class OTLPJsonExporter:
+    """Exports spans in the OTLP/JSON trace format.
+
+    With ``endpoint`` (an OTLP/HTTP collector URL such as
+    ``http://localhost:4318/v1/traces``) each batch is POSTed from a
+    background thread; with ``path`` each batch is appended to the file
+    as one JSON line. Export failures are printed and the batch dropped,
+    so tracing never breaks the agent.
+    """
+
+    def __init__(
+        self,
+        endpoint: str | None = None,
+        path: str | None = None,
+        service_name: str = "agents",
+        headers: dict[str, str] | None = None,
+        timeout: float = 10.0,
+    ):
+        if not endpoint and not path:
+            raise ValueError("endpoint or path is required")
+        self.endpoint = endpoint
+        self.path = path
+        self.service_name = service_name
+        self.headers = headers or {}
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def encode(self, spans: list[Span]) -> dict[str, Any]:
+        """An ExportTraceServiceRequest for the spans, as a dict."""
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                # SPAN_KIND_INTERNAL, or CLIENT for calls to the API
+                "kind": 3 if span.name.startswith("chat ") else 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in span.attributes.items()
+                    if value is not None
+                ],
+                "status": (
+                    {"code": 2, "message": span.error}
+                    if span.error
+                    else {"code": 1}
+                ),
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "agents"}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+    def export(self, spans: list[Span]) -> None:
+        """Send a batch of spans without blocking the event loop."""
+        if not spans:
+            return
+        body = json.dumps(self.encode(spans))
+        if self.path:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(body + "\n")
+        if self.endpoint:
+            threading.Thread(
+                target=self._post, args=(body,), daemon=True
+            ).start()
+
+    def _post(self, body: str) -> None:
+        request = urllib.request.Request(
+            self.endpoint,
+            data=body.encode("utf-8"),
+            headers={"Content-Type": "application/json", **self.headers},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except Exception as e:
+            print(f"Warning: failed to export spans to {self.endpoint}: {e}")
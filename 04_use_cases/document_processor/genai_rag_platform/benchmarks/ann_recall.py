@@ -0,0 +1,115 @@
+"""Recall@k against query latency for each index type, versus flat search.
+
+Builds every index type on a synthetic corpus of clustered, normalized
+vectors (embeddings cluster by topic; uniform random vectors would be an
+unrealistically hard case for approximate search) and sweeps the search
+breadth: efSearch for HNSW, nprobe for IVF. Recall is measured against
+exact inner-product search. Queries run one at a time, as in retrieve().
+Run from the platform root:
+
+    python benchmarks/ann_recall.py --vectors 1000000 --dimension 256
+
+At 1536 dimensions a million float32 vectors take 6 GB per copy; the
+default dimension keeps the benchmark within a laptop's memory.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+
+from src.rag.vector_index import choose_index_type, index_type_of, make_index, normalize, train
+
+EF_SEARCH = (16, 32, 64, 128, 256)
+NPROBE_FRACTIONS = (1 / 256, 1 / 64, 1 / 32, 1 / 16, 1 / 8)
+
+
+def synthetic_corpus(count: int, dimension: int, clusters: int, spread: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype("float32")
+    vectors = np.empty((count, dimension), dtype="float32")
+    for start in range(0, count, 100_000):
+        n = min(100_000, count - start)
+        noise = rng.standard_normal((n, dimension), dtype="float32") * spread
+        vectors[start:start + n] = centers[rng.integers(clusters, size=n)] + noise
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def timed_search(index: faiss.Index, queries: np.ndarray, k: int):
+    labels = np.empty((len(queries), k), dtype="int64")
+    start = time.perf_counter()
+    for i in range(len(queries)):
+        _, labels[i] = index.search(queries[i:i + 1], k)
+    return labels, (time.perf_counter() - start) / len(queries)
+
+
+def recall(labels: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return sum(len(set(row) & set(true_row)) for row, true_row in zip(labels, truth)) / (len(truth) * k)
+
+
+def index_bytes(index: faiss.Index) -> int:
+    return faiss.serialize_index(index).nbytes
+
+
+def report(label: str, setting: str, labels, latency: float, truth, flat_latency: float) -> None:
+    print(f"{label:<9} {setting:<13} recall@{truth.shape[1]} {recall(labels, truth):6.3f}  "
+          f"{latency * 1000:8.3f} ms/query  {flat_latency / latency:7.1f}x flat")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=1000, help="Topics in the synthetic corpus")
+    parser.add_argument("--spread", type=float, default=2.0,
+                        help="Per-dimension noise around each topic, relative to the spread of topics")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default="hnsw,ivf_flat,ivf_pq")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    corpus = synthetic_corpus(args.vectors + args.queries, args.dimension, args.clusters, args.spread)
+    corpus, queries = corpus[:args.vectors], normalize(corpus[args.vectors:])
+    ids = np.arange(args.vectors, dtype="int64")
+    print(f"{args.vectors} vectors of dimension {args.dimension}, {args.queries} queries; "
+          f"'auto' picks {choose_index_type(args.vectors)}")
+
+    flat = make_index("flat", args.dimension, args.vectors)
+    flat.add_with_ids(corpus, ids)
+    truth, flat_latency = timed_search(flat, queries, args.k)
+    print(f"{'flat':<9} {'exact':<13} recall@{args.k} {1:6.3f}  {flat_latency * 1000:8.3f} ms/query  "
+          f"{1:7.1f}x flat  ({index_bytes(flat) / 2**20:.0f} MB)")
+    del flat
+
+    for index_type in args.types.split(","):
+        index = make_index(index_type, args.dimension, args.vectors)
+        start = time.perf_counter()
+        train(index, corpus)
+        index.add_with_ids(corpus, ids)
+        print(f"{index_type_of(index):<9} built in {time.perf_counter() - start:.1f}s "
+              f"({index_bytes(index) / 2**20:.0f} MB)")
+        if index_type == "hnsw":
+            hnsw = faiss.downcast_index(index.index).hnsw
+            for ef_search in EF_SEARCH:
+                hnsw.efSearch = ef_search
+                labels, latency = timed_search(index, queries, args.k)
+                report(index_type, f"efSearch={ef_search}", labels, latency, truth, flat_latency)
+        else:
+            ivf = faiss.extract_index_ivf(index)
+            for fraction in NPROBE_FRACTIONS:
+                ivf.nprobe = max(1, int(ivf.nlist * fraction))
+                labels, latency = timed_search(index, queries, args.k)
+                report(index_type, f"nprobe={ivf.nprobe}/{ivf.nlist}", labels, latency, truth, flat_latency)
+        del index
+
+
+if __name__ == "__main__":
+    main()
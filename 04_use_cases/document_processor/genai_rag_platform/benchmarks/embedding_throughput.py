@@ -0,0 +1,76 @@
+"""Embedding throughput of RAGPipeline.build_index against a fake server.
+
+Compares one request per chunk (the old behaviour) with batched,
+concurrent requests, in chunks per second. Run from the platform root:
+
+    python benchmarks/embedding_throughput.py --chunks 20000
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai
+
+from benchmarks.fake_embedding_server import FakeEmbeddingServer
+from src.rag.embeddings import BatchEmbedder
+from src.rag.rag import RAGPipeline
+
+WORDS = "the index embeds chunks of markdown documents for semantic search over a knowledge base".split()
+
+
+def synthetic_chunks(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    # ~300 characters each, like the default chunk_size
+    return [f"{i}: " + " ".join(rng.choice(WORDS) for _ in range(45)) for i in range(count)]
+
+
+def run(label: str, chunks, embedder: BatchEmbedder, server: FakeEmbeddingServer) -> float:
+    requests_before = server.requests
+    rag = RAGPipeline(embedder=embedder)
+    start = time.perf_counter()
+    rag.build_index(chunks)
+    elapsed = time.perf_counter() - start
+    assert rag.index.ntotal == len(chunks) == len(rag.texts)
+    rate = len(chunks) / elapsed
+    print(f"{label:<28} {len(chunks):>7} chunks  {elapsed:8.2f}s  "
+          f"{rate:10.1f} chunks/s  {server.requests - requests_before:>6} requests  "
+          f"{embedder.stats['retries']:>4} retries")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--baseline-chunks", type=int, default=200,
+                        help="Chunks embedded one request at a time")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--per-input", type=float, default=0.0002, help="Seconds per input")
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--batch-inputs", type=int, default=512)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    server = FakeEmbeddingServer(latency=args.latency, per_input=args.per_input,
+                                 fail_rate=args.fail_rate).start()
+    openai.api_base = server.api_base
+    openai.api_key = "fake"
+    try:
+        baseline = run("one request per chunk", synthetic_chunks(args.baseline_chunks),
+                       BatchEmbedder(max_batch_inputs=1, max_in_flight=1, backoff=0.1), server)
+        batched = run(f"batched x{args.batch_inputs}, {args.in_flight} in flight",
+                      synthetic_chunks(args.chunks),
+                      BatchEmbedder(max_batch_inputs=args.batch_inputs,
+                                    max_in_flight=args.in_flight, backoff=0.1), server)
+        print(f"speedup: {batched / baseline:.1f}x")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""A local stand-in for the OpenAI embeddings endpoint, for benchmarks.
+
+Vectors are deterministic per text (seeded from its hash) and unit
+length. Each request sleeps ``latency`` seconds plus ``per_input``
+seconds per input to model network and compute time, and a fraction
+``fail_rate`` of requests is answered with a 429.
+
+Run it standalone and point the platform at it:
+
+    python benchmarks/fake_embedding_server.py --port 8765
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python main.py
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def fake_embedding(text: str, dimension: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype("float32")
+    return vector / np.linalg.norm(vector)
+
+
+class FakeEmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, dimension: int = 1536, latency: float = 0.05,
+                 per_input: float = 0.0002, fail_rate: float = 0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.dimension = dimension
+        self.latency = latency
+        self.per_input = per_input
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.inputs = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+
+    @property
+    def api_base(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self) -> "FakeEmbeddingServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeEmbeddingServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict, headers: dict = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        if not self.path.rstrip("/").endswith("/embeddings"):
+            self._reply(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        inputs = request["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        with server._lock:
+            server.requests += 1
+            fail = server._random.random() < server.fail_rate
+            if fail:
+                server.failures += 1
+            else:
+                server.inputs += len(inputs)
+        if fail:
+            self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                        {"Retry-After": "0.1"})
+            return
+
+        time.sleep(server.latency + server.per_input * len(inputs))
+        as_base64 = request.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_embedding(text, server.dimension)
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(text) // 4 + 1 for text in inputs)
+        self._reply(200, {
+            "object": "list",
+            "data": data,
+            "model": request.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-input", type=float, default=0.0002)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeEmbeddingServer(args.port, args.dimension, args.latency, args.per_input, args.fail_rate)
+    print(f"Serving fake embeddings at {server.api_base}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Re-indexing cost after one document changes, full rebuild vs incremental.
+
+Builds an index over a folder of synthetic documents, edits one of them
+and compares rebuilding everything with IncrementalIndexer.sync(). The
+embedding cache is off, so every embedded chunk is a request to the fake
+server. Run from the platform root:
+
+    python benchmarks/incremental_reindex.py --documents 200
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai
+
+from benchmarks.embedding_throughput import synthetic_chunks
+from benchmarks.fake_embedding_server import FakeEmbeddingServer
+from src.data.loader import load_documents_from_folder
+from src.rag.embeddings import BatchEmbedder
+from src.rag.indexer import IncrementalIndexer
+from src.rag.rag import RAGPipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=50, help="Paragraphs per document")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    server = FakeEmbeddingServer(latency=0.05, per_input=0.0002).start()
+    openai.api_base = server.api_base
+    openai.api_key = "fake"
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            folder = os.path.join(directory, "docs")
+            os.makedirs(folder)
+            paragraphs = synthetic_chunks(args.documents * args.paragraphs)
+            for d in range(args.documents):
+                with open(os.path.join(folder, f"doc{d}.md"), "w", encoding="utf-8") as f:
+                    f.write("\n\n".join(paragraphs[d * args.paragraphs:(d + 1) * args.paragraphs]))
+
+            rag = RAGPipeline(embedder=BatchEmbedder())
+            indexer = IncrementalIndexer(rag, folder, os.path.join(directory, "index"))
+            stats = indexer.sync()
+            print(f"initial build: {stats.chunks_added} chunks from {stats.added} documents")
+
+            with open(os.path.join(folder, "doc0.md"), "a", encoding="utf-8") as f:
+                f.write("\n\nAn added paragraph.")
+
+            requests_before = server.requests
+            start = time.perf_counter()
+            full = RAGPipeline(embedder=BatchEmbedder())
+            full.build_index(full.chunk_documents(load_documents_from_folder(folder)))
+            print(f"full rebuild:  {time.perf_counter() - start:8.3f}s  "
+                  f"{full.embedder.stats['texts']:>7} chunks embedded  "
+                  f"{server.requests - requests_before:>4} requests")
+
+            requests_before = server.requests
+            start = time.perf_counter()
+            stats = indexer.sync()
+            print(f"incremental:   {time.perf_counter() - start:8.3f}s  "
+                  f"{stats.chunks_added:>7} chunks embedded  "
+                  f"{server.requests - requests_before:>4} requests  "
+                  f"({stats.changed} changed, {stats.unchanged} unchanged)")
+
+            requests_before = server.requests
+            start = time.perf_counter()
+            stats = indexer.sync()
+            print(f"no changes:    {time.perf_counter() - start:8.3f}s  "
+                  f"{stats.chunks_added:>7} chunks embedded  "
+                  f"{server.requests - requests_before:>4} requests")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Startup time and memory of saved indexes, mapped or read into memory.
+
+Saves a pipeline of random vectors, then loads it with mmap=True and
+mmap=False and reports load time and, per worker process, the private
+memory it uses after a few searches (Linux only). Run from the platform
+root:
+
+    python benchmarks/index_startup.py --chunks 200000 --workers 4
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.embedding_throughput import synthetic_chunks
+from src.rag.embeddings import BatchEmbedder
+from src.rag.rag import RAGPipeline
+
+
+def private_mb() -> float:
+    """Anonymous (unshared) memory of this process, in MB."""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Anonymous:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def worker(path: str, mmap: bool, queue) -> None:
+    before = private_mb()
+    start = time.perf_counter()
+    rag = RAGPipeline.load(path, mmap=mmap, embedder=BatchEmbedder())
+    load_seconds = time.perf_counter() - start
+    queries = np.random.default_rng(0).standard_normal((8, rag.dimension)).astype("float32")
+    _, indices = rag.index.search(queries, 5)
+    assert all(rag.texts[i] for i in indices[0])
+    queue.put((load_seconds, private_mb() - before))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index")
+        rag = RAGPipeline(dimension=args.dimension, embedder=BatchEmbedder())
+        rng = np.random.default_rng(0)
+        for start in range(0, args.chunks, 50000):
+            count = min(50000, args.chunks - start)
+            ids = np.arange(start, start + count, dtype="int64")
+            rag.index.add_with_ids(rng.standard_normal((count, args.dimension)).astype("float32"), ids)
+        rag.texts.extend(synthetic_chunks(args.chunks))
+        start = time.perf_counter()
+        rag.save(path)
+        print(f"save: {time.perf_counter() - start:.2f}s for {args.chunks} chunks")
+        del rag
+
+        context = multiprocessing.get_context("spawn")
+        for mmap in (True, False):
+            queue = context.Queue()
+            processes = [context.Process(target=worker, args=(path, mmap, queue))
+                         for _ in range(args.workers)]
+            for process in processes:
+                process.start()
+            results = [queue.get() for _ in processes]
+            for process in processes:
+                process.join()
+            load = max(seconds for seconds, _ in results)
+            private = sum(mb for _, mb in results)
+            print(f"mmap={str(mmap):<5} {args.workers} workers: load {load:6.3f}s, "
+                  f"private memory {private:8.1f} MB in total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Cold vs warm index build with the on-disk embedding cache.
+
+The cold run embeds every chunk through a fake embedding server and
+fills the cache; the warm run, in a fresh pipeline, reads every vector
+back from the memory-mapped cache without a single request. Run from
+the platform root:
+
+    python benchmarks/warm_start.py --chunks 50000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai
+
+from benchmarks.embedding_throughput import synthetic_chunks
+from benchmarks.fake_embedding_server import FakeEmbeddingServer
+from src.rag.embedding_cache import EmbeddingCache
+from src.rag.embeddings import BatchEmbedder, EMBEDDING_MODEL
+from src.rag.rag import RAGPipeline
+
+
+def build(label: str, chunks, cache_dir: str, server: FakeEmbeddingServer) -> None:
+    requests_before = server.requests
+    start = time.perf_counter()
+    cache = EmbeddingCache(cache_dir, EMBEDDING_MODEL)
+    rag = RAGPipeline(embedder=BatchEmbedder(max_in_flight=4, cache=cache))
+    rag.build_index(chunks)
+    elapsed = time.perf_counter() - start
+    assert rag.index.ntotal == len(chunks)
+    print(f"{label:<6} {len(chunks):>7} chunks  {elapsed:8.2f}s  "
+          f"{server.requests - requests_before:>5} requests  "
+          f"{rag.embedder.stats['cached']:>7} from cache")
+    cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--per-input", type=float, default=0.0002, help="Seconds per input")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    server = FakeEmbeddingServer(latency=args.latency, per_input=args.per_input).start()
+    openai.api_base = server.api_base
+    openai.api_key = "fake"
+    chunks = synthetic_chunks(args.chunks)
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            build("cold", chunks, cache_dir, server)
+            build("warm", chunks, cache_dir, server)
+            # A few edited chunks: only those are embedded again
+            build("edited", chunks[:-100] + [c + " (edited)" for c in chunks[-100:]], cache_dir, server)
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
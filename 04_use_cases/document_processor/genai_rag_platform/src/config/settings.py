@@ -5,6 +5,18 @@ from dotenv import load_dotenv
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Point at another OpenAI-compatible endpoint, e.g. a local embedding server
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+# Concurrent embedding requests while building the index
+EMBEDDING_MAX_IN_FLIGHT = int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4"))
+# On-disk embedding cache; set to an empty string to disable
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+# Saved FAISS index and chunk texts, reused while the documents are unchanged
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", ".cache/index")
+# "flat", "hnsw", "ivf_flat", "ivf_pq", or "auto" to choose by corpus size
+INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "auto")
+# Seconds between checks of the documents folder for changes; 0 disables
+WATCH_INTERVAL = float(os.getenv("RAG_WATCH_INTERVAL", "0"))
 
 def setup_logging(level: int = logging.INFO) -> None:
     logging.basicConfig(
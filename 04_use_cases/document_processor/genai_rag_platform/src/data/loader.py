@@ -1,5 +1,6 @@
+import hashlib
 import os
-from typing import List
+from typing import Dict, List, Tuple
 
 def load_documents_from_folder(folder_path: str) -> List[str]:
     """Loads all text documents from a folder."""
@@ -10,3 +11,19 @@ def load_documents_from_folder(folder_path: str) -> List[str]:
             with open(path, "r", encoding="utf-8") as f:
                 docs.append(f.read())
     return docs
+
+def scan_documents(folder_path: str) -> Dict[str, Tuple[int, int]]:
+    """Maps each .md file in a folder to its (mtime in ns, size)."""
+    found = {}
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(".md"):
+                stat = entry.stat()
+                found[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+def read_document(path: str) -> Tuple[str, str]:
+    """Returns the text of a document and the sha256 of its content."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return data.decode("utf-8"), hashlib.sha256(data).hexdigest()
@@ -1,17 +1,39 @@
-from src.data.loader import load_documents_from_folder
+from src.config.settings import INDEX_DIR, INDEX_TYPE, WATCH_INTERVAL
+from src.rag.embeddings import EMBEDDING_MODEL
+from src.rag.indexer import IncrementalIndexer
 from src.rag.rag import RAGPipeline
+from src.rag.store import read_manifest
+from src.rag.vector_index import resolve_index_type
 from src.utils.guardrails import sanitize_input, validate_input, validate_output
 from src.router.router import classify_intent, route_to_model
 from src.interface.gateway import model_gateway
 import logging
 
-def run_cli():
+def load_pipeline(folder_path: str = "sample_docs") -> RAGPipeline:
+    """Open the saved index and bring it up to date with the documents.
+
+    Only files added or changed since the index was saved are embedded.
+    """
+    manifest = read_manifest(INDEX_DIR)
+    # A saved index is reused if it has the type the setting gives its
+    # number of chunks (ivf_pq falls back to flat for a handful)
+    if manifest and manifest["model"] == EMBEDDING_MODEL and (
+        INDEX_TYPE == "auto" or resolve_index_type(INDEX_TYPE, manifest["count"]) == manifest["index_type"]
+    ):
+        rag = RAGPipeline.load(INDEX_DIR)
+    else:
+        rag = RAGPipeline()
+
     logging.info("Loading documents...")
-    docs = load_documents_from_folder("sample_docs")
+    indexer = IncrementalIndexer(rag, folder_path, INDEX_DIR)
+    stats = indexer.sync()
+    logging.info(f"Documents: {stats.added} added, {stats.changed} changed, {stats.removed} removed, {stats.unchanged} unchanged.")
+    if WATCH_INTERVAL > 0:
+        indexer.watch(WATCH_INTERVAL)
+    return rag
 
-    rag = RAGPipeline()
-    chunks = rag.chunk_documents(docs)
-    rag.build_index(chunks)
+def run_cli():
+    rag = load_pipeline()
 
     print("GenAI CLI — Type 'exit' to quit.")
     while True:
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+LOOKUP_BATCH = 500
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """On-disk embeddings keyed by (model, sha256 of the text).
+
+    Vectors are appended as raw float32 rows to one file per model and
+    read through a memory map; a SQLite table maps each key to its row.
+    Vectors are flushed before their keys are committed, so a crash can
+    leave unused rows but never a key pointing at missing data. Several
+    processes may share a cache directory, and threads one cache.
+    """
+
+    def __init__(self, directory: str, model: str, dimension: int = 1536):
+        os.makedirs(directory, exist_ok=True)
+        self.model = model
+        self.dimension = dimension
+        self.row_bytes = dimension * 4
+        self.key = f"{model}:{dimension}"
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        self.vectors_path = os.path.join(directory, f"{slug}-{dimension}.f32")
+        self.db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, digest BLOB NOT NULL, row INTEGER NOT NULL, "
+            "PRIMARY KEY (model, digest)) WITHOUT ROWID"
+        )
+        self._map = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.key,)
+            ).fetchone()[0]
+
+    def _vectors(self, rows_needed: int) -> np.ndarray:
+        """The vector file mapped into memory, remapped after it grew."""
+        if self._map is None or len(self._map) < rows_needed:
+            rows = os.path.getsize(self.vectors_path) // self.row_bytes
+            self._map = np.memmap(
+                self.vectors_path, dtype="float32", mode="r",
+                shape=(rows, self.dimension),
+            )
+        return self._map
+
+    def lookup(
+        self, texts: Sequence[str]
+    ) -> Tuple[List[int], np.ndarray, List[int]]:
+        """Split texts into cached and missing.
+
+        Returns the indices of cached texts, their vectors (one row per
+        index) and the indices of texts that are not cached.
+        """
+        digests = [text_digest(text) for text in texts]
+        rows = {}
+        with self._lock:
+            for start in range(0, len(digests), LOOKUP_BATCH):
+                chunk = digests[start:start + LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(chunk))
+                rows.update(self.db.execute(
+                    f"SELECT digest, row FROM embeddings "
+                    f"WHERE model = ? AND digest IN ({placeholders})",
+                    (self.key, *chunk),
+                ))
+
+        hits, hit_rows, missing = [], [], []
+        for i, digest in enumerate(digests):
+            row = rows.get(digest)
+            if row is None:
+                missing.append(i)
+            else:
+                hits.append(i)
+                hit_rows.append(row)
+        if not hits:
+            return hits, np.empty((0, self.dimension), dtype="float32"), missing
+        with self._lock:
+            vectors = self._vectors(max(hit_rows) + 1)[hit_rows]
+        return hits, np.ascontiguousarray(vectors), missing
+
+    def put(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Store vectors for texts; texts already cached are skipped."""
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if vectors.shape != (len(texts), self.dimension):
+            raise ValueError(
+                f"Expected {len(texts)} vectors of dimension {self.dimension}, "
+                f"got shape {vectors.shape}"
+            )
+        # The write lock serializes appends from several processes
+        with self._lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                with open(self.vectors_path, "ab") as f:
+                    size = f.tell()
+                    first_row = size // self.row_bytes
+                    if size % self.row_bytes:
+                        # Drop a torn row left by a crashed writer
+                        f.truncate(first_row * self.row_bytes)
+                    f.write(vectors.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO embeddings (model, digest, row) "
+                    "VALUES (?, ?, ?)",
+                    [
+                        (self.key, text_digest(text), first_row + i)
+                        for i, text in enumerate(texts)
+                    ],
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._map = None
+            self.db.close()
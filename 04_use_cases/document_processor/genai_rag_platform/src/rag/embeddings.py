@@ -0,0 +1,228 @@
+import base64
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+import openai
+
+from src.rag.embedding_cache import EmbeddingCache
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+# Provider limits for one embeddings request
+MAX_BATCH_INPUTS = 2048
+MAX_BATCH_TOKENS = 300_000
+MAX_INPUT_TOKENS = 8191
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to an estimate
+    _ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text, exact with tiktoken or a safe over-estimate without."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    # English averages ~4 characters per token; 3 leaves headroom
+    return len(text) // 3 + 1
+
+
+def _openai_errors(*names: str) -> Tuple[type, ...]:
+    """The openai exception classes of these names that exist.
+
+    They live in openai.error before 1.0 and on openai itself after, so
+    look them up instead of failing at import on the other version.
+    """
+    modules = [getattr(openai, "error", None), openai]
+    found = []
+    for name in names:
+        for module in modules:
+            error = getattr(module, name, None)
+            if isinstance(error, type) and issubclass(error, Exception):
+                found.append(error)
+                break
+    return tuple(found)
+
+
+def make_batches(
+    texts: Sequence[str],
+    max_inputs: int = MAX_BATCH_INPUTS,
+    max_tokens: int = MAX_BATCH_TOKENS,
+) -> List[List[int]]:
+    """Group text indices into batches within the request limits."""
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    batch_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if tokens > MAX_INPUT_TOKENS:
+            raise ValueError(
+                f"Chunk {i} has ~{tokens} tokens, over the "
+                f"{MAX_INPUT_TOKENS}-token input limit"
+            )
+        if batch and (len(batch) >= max_inputs or batch_tokens + tokens > max_tokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class BatchEmbedder:
+    """Embeds texts in batched, concurrent requests.
+
+    Texts are packed into batches within the provider's input and token
+    limits, and up to ``max_in_flight`` requests run at once. A failed
+    batch is retried on its own with exponential backoff; batches that
+    already succeeded are kept.
+
+    With a ``cache``, cached texts are served from disk and only new
+    texts are sent, each distinct text once; new vectors are cached as
+    their batches complete.
+    """
+
+    # Errors that will not go away by retrying
+    FATAL_ERRORS = _openai_errors(
+        "InvalidRequestError", "BadRequestError", "AuthenticationError", "PermissionError", "PermissionDeniedError"
+    )
+
+    def __init__(
+        self,
+        model: str = EMBEDDING_MODEL,
+        max_batch_inputs: int = MAX_BATCH_INPUTS,
+        max_batch_tokens: int = MAX_BATCH_TOKENS,
+        max_in_flight: int = 4,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        cache: EmbeddingCache = None,
+    ):
+        self.model = model
+        self.max_batch_inputs = max_batch_inputs
+        self.max_batch_tokens = max_batch_tokens
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache
+        self.stats = {"texts": 0, "cached": 0, "requests": 0, "retries": 0}
+
+    def _request(self, texts: List[str]) -> np.ndarray:
+        # Ask for base64 explicitly: the SDK then skips converting every
+        # vector to a Python list, and we decode straight into float32
+        response = openai.Embedding.create(
+            input=texts, model=self.model, encoding_format="base64"
+        )
+        data = sorted(response["data"], key=lambda item: item["index"])
+        vectors = [
+            np.frombuffer(base64.b64decode(item["embedding"]), dtype="float32")
+            if isinstance(item["embedding"], str)
+            else np.asarray(item["embedding"], dtype="float32")
+            for item in data
+        ]
+        return np.vstack(vectors)
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed one batch in a single request, retrying on failure."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.stats["requests"] += 1
+                return self._request(texts)
+            except self.FATAL_ERRORS:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logging.error(f"Embedding batch of {len(texts)} failed: {e}")
+                    raise
+                delay = random.uniform(0, self.backoff * 2 ** attempt)
+                logging.warning(
+                    f"Embedding batch of {len(texts)} failed ({e}); "
+                    f"retrying in {delay:.1f}s"
+                )
+                self.stats["retries"] += 1
+                time.sleep(delay)
+
+    def embed_stream(
+        self, texts: Sequence[str]
+    ) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """Yield (text indices, vectors) per batch, in completion order."""
+        todo = range(len(texts))
+        if self.cache is not None:
+            hits, vectors, todo = self.cache.lookup(texts)
+            if hits:
+                self.stats["cached"] += len(hits)
+                self.stats["texts"] += len(hits)
+                yield hits, vectors
+
+        # Embed each distinct text once and copy it to its duplicates
+        first, unique, duplicates = {}, [], {}
+        for i in todo:
+            if texts[i] in first:
+                duplicates.setdefault(first[texts[i]], []).append(i)
+            else:
+                first[texts[i]] = i
+                unique.append(i)
+        batches = iter(
+            [unique[j] for j in batch]
+            for batch in make_batches(
+                [texts[i] for i in unique],
+                self.max_batch_inputs,
+                self.max_batch_tokens,
+            )
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            pending = {}
+
+            def submit_next() -> None:
+                batch = next(batches, None)
+                if batch is not None:
+                    future = pool.submit(
+                        self.embed_batch, [texts[i] for i in batch]
+                    )
+                    pending[future] = batch
+
+            for _ in range(self.max_in_flight):
+                submit_next()
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch = pending.pop(future)
+                        vectors = future.result()
+                        submit_next()
+                        if self.cache is not None:
+                            self.cache.put([texts[i] for i in batch], vectors)
+                        copies = [
+                            (row, duplicate)
+                            for row, i in enumerate(batch)
+                            for duplicate in duplicates.get(i, ())
+                        ]
+                        if copies:
+                            batch = batch + [d for _, d in copies]
+                            vectors = np.vstack(
+                                [vectors, vectors[[row for row, _ in copies]]]
+                            )
+                        self.stats["texts"] += len(batch)
+                        yield batch, vectors
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed all texts; rows are in the order of ``texts``."""
+        vectors = None
+        for batch, batch_vectors in self.embed_stream(texts):
+            if vectors is None:
+                vectors = np.empty(
+                    (len(texts), batch_vectors.shape[1]), dtype="float32"
+                )
+            vectors[batch] = batch_vectors
+        if vectors is None:
+            return np.empty((0, 0), dtype="float32")
+        return vectors
@@ -0,0 +1,126 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from src.data.loader import read_document, scan_documents
+from src.rag.rag import RAGPipeline
+
+
+@dataclass
+class SyncStats:
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    chunks_added: int = 0
+    chunks_removed: int = 0
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+class IncrementalIndexer:
+    """Keeps a pipeline's index in step with a folder of documents.
+
+    Files whose mtime and size match the pipeline's record are skipped
+    without being read; others are hashed, and only files whose content
+    changed are re-chunked and re-embedded. The chunks of changed and
+    deleted files are removed by id. After changes the index is saved to
+    ``index_dir`` if one is given.
+    """
+
+    def __init__(self, rag: RAGPipeline, folder_path: str, index_dir: Optional[str] = None):
+        self.rag = rag
+        self.folder_path = folder_path
+        self.index_dir = index_dir
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync(self) -> SyncStats:
+        """Apply the changes in the folder since the last sync."""
+        with self._sync_lock:
+            return self._sync()
+
+    def _sync(self) -> SyncStats:
+        rag = self.rag
+        stats = SyncStats()
+        found = scan_documents(self.folder_path)
+
+        for name in sorted(set(rag.sources) - set(found)):
+            ids = rag.sources[name]["ids"]
+            rag.remove_ids(ids)
+            with rag.lock:
+                del rag.sources[name]
+            stats.removed += 1
+            stats.chunks_removed += len(ids)
+            logging.info(f"Removed {name} ({len(ids)} chunks) from the index.")
+
+        updates = []
+        for name, (mtime_ns, size) in sorted(found.items()):
+            record = rag.sources.get(name)
+            if record and record["mtime_ns"] == mtime_ns and record["size"] == size:
+                stats.unchanged += 1
+                continue
+            try:
+                text, digest = read_document(os.path.join(self.folder_path, name))
+            except (OSError, UnicodeDecodeError) as e:
+                logging.warning(f"Skipping {name}: {e}")
+                continue
+            if record and record["sha256"] == digest:
+                # Touched but not changed
+                record.update(mtime_ns=mtime_ns, size=size)
+                stats.unchanged += 1
+                continue
+            updates.append((name, record, {"mtime_ns": mtime_ns, "size": size, "sha256": digest}, rag.chunk_documents([text])))
+
+        # Embed all new chunks together, so they share batches and an
+        # empty index is sized for all of them, then swap files over;
+        # queries see the old chunks until the new ones are ready
+        ids = rag.add_texts([chunk for *_, chunks in updates for chunk in chunks])
+        start = 0
+        for name, record, new_record, chunks in updates:
+            new_record["ids"] = ids[start:start + len(chunks)]
+            start += len(chunks)
+            old_ids = record["ids"] if record else []
+            rag.remove_ids(old_ids)
+            with rag.lock:
+                rag.sources[name] = new_record
+            if record:
+                stats.changed += 1
+            else:
+                stats.added += 1
+            stats.chunks_added += len(chunks)
+            stats.chunks_removed += len(old_ids)
+            logging.info(f"Indexed {name} ({len(chunks)} chunks, {len(old_ids)} replaced).")
+
+        if stats.dirty and self.index_dir:
+            rag.save(self.index_dir)
+        return stats
+
+    def watch(self, interval: float = 2.0) -> threading.Thread:
+        """Sync every ``interval`` seconds in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return self._thread
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.sync()
+                except Exception as e:
+                    logging.error(f"Re-indexing {self.folder_path} failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="rag-indexer", daemon=True)
+        self._thread.start()
+        logging.info(f"Watching {self.folder_path} for changes every {interval}s.")
+        return self._thread
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
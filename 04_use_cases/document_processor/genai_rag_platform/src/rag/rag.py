@@ -1,18 +1,58 @@
 import faiss
 import numpy as np
 import openai
-from typing import List
+import os
+import threading
+from typing import Dict, List
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.schema import Document
-from src.config.settings import OPENAI_API_KEY
+from src.config.settings import OPENAI_API_KEY, OPENAI_API_BASE, EMBEDDING_MAX_IN_FLIGHT, EMBEDDING_CACHE_DIR, INDEX_TYPE
+from src.rag.embedding_cache import EmbeddingCache
+from src.rag.embeddings import BatchEmbedder, EMBEDDING_MODEL
+from src.rag.store import ChunkStore, INDEX_FILE, read_manifest, replace_directory, write_manifest
+from src.rag.vector_index import (
+    RESIZE_FACTOR, index_type_of, layout_fits, make_index, normalize, search_parameters, stored_vectors,
+    supports_remove, train
+)
 import logging
 
 openai.api_key = OPENAI_API_KEY
+if OPENAI_API_BASE:
+    openai.api_base = OPENAI_API_BASE
+
+# Rebuild an HNSW index once this share of its vectors are removed ids
+COMPACT_FRACTION = 0.2
 
 class RAGPipeline:
-    def __init__(self, dimension: int = 1536):
-        self.index = faiss.IndexFlatL2(dimension)
-        self.texts: List[str] = []
+    def __init__(self, dimension: int = 1536, embedder: BatchEmbedder = None, index_type: str = INDEX_TYPE):
+        # "flat", "hnsw", "ivf_flat", "ivf_pq" or "auto". The index is
+        # laid out for the number of chunks it holds, and rebuilt when that
+        # grows or shrinks by RESIZE_FACTOR and calls for another type or
+        # number of IVF lists (see layout_fits). Vectors are normalized and searched by inner
+        # product (cosine similarity). Vector ids are positions in the
+        # chunk store.
+        self.index_type = index_type
+        self.index = make_index("flat", dimension, 0)
+        self._sized_for = 0
+        self.texts = ChunkStore()
+        if embedder is None:
+            cache = EmbeddingCache(EMBEDDING_CACHE_DIR, EMBEDDING_MODEL, dimension) if EMBEDDING_CACHE_DIR else None
+            embedder = BatchEmbedder(max_in_flight=EMBEDDING_MAX_IN_FLIGHT, cache=cache)
+        self.embedder = embedder
+        self.dimension = dimension
+        # Set when the index is a read-only memory map of this file
+        self._mapped_from = None
+        self.manifest = None
+        # Source file -> {"mtime_ns", "size", "sha256", "ids"}, for
+        # incremental indexing
+        self.sources: Dict[str, Dict] = {}
+        # Ids removed from an index that cannot drop vectors (HNSW); they
+        # are filtered out of search results until the index is compacted
+        self.removed = set()
+        self._search_params = None
+        # Held by queries and by changes to the index, so documents can be
+        # re-indexed while queries are being served
+        self.lock = threading.RLock()
 
     def chunk_documents(self, documents: List[str], chunk_size: int = 300, chunk_overlap: int = 50) -> List[str]:
         splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
@@ -22,27 +62,196 @@ class RAGPipeline:
 
     def embed_text(self, text: str) -> List[float]:
         try:
-            response = openai.Embedding.create(
-                input=[text],
-                model="text-embedding-ada-002"
-            )
-            return response['data'][0]['embedding']
+            return self.embedder.embed_batch([text])[0].tolist()
         except Exception as e:
             logging.error(f"Embedding failed: {e}")
             raise
 
+    def _writable_index(self) -> faiss.Index:
+        # A memory-mapped index cannot grow; read a private copy first
+        if self._mapped_from is not None:
+            logging.info("Reading the memory-mapped index into memory to modify it...")
+            self.index = faiss.read_index(self._mapped_from)
+            self._mapped_from = None
+        return self.index
+
+    def add_texts(self, texts: List[str]) -> List[int]:
+        """Embed and index texts; returns their ids, in the order given.
+
+        If embedding fails, the chunks already added are removed again
+        before the error is raised, so a retry does not index them twice.
+        """
+        if not texts:
+            return []
+        with self.lock:
+            if self.index.ntotal == 0 and not self.removed:
+                self.index = make_index(self.index_type, self.dimension, len(texts))
+                self._mapped_from = None
+                self._sized_for = len(texts)
+                logging.info(f"Using a {index_type_of(self.index)} index for {len(texts)} chunks.")
+        if not self.index.is_trained:
+            # IVF centroids are trained on the first texts, all at once
+            vectors = normalize(self.embedder.embed(texts))
+            train(self.index, vectors)
+            return self._add_vectors(list(range(len(texts))), vectors, texts)
+
+        ids = [-1] * len(texts)
+        added = []
+        # Vectors are added as batches complete
+        try:
+            for batch, vectors in self.embedder.embed_stream(texts):
+                batch_ids = self._add_vectors(batch, normalize(vectors), texts)
+                added.extend(batch_ids)
+                for i, chunk_id in zip(batch, batch_ids):
+                    ids[i] = chunk_id
+        except Exception:
+            logging.error(f"Embedding failed; removing the {len(added)} chunks already added.")
+            self.remove_ids(added)
+            raise
+        self._resize_if_needed()
+        return ids
+
+    def _add_vectors(self, batch: List[int], vectors: np.ndarray, texts: List[str]) -> List[int]:
+        # Each vector gets the id of the position its text is appended at
+        with self.lock:
+            start = len(self.texts)
+            batch_ids = np.arange(start, start + len(batch), dtype="int64")
+            self._writable_index().add_with_ids(vectors, batch_ids)
+            self.texts.extend(texts[i] for i in batch)
+        return batch_ids.tolist()
+
+    def remove_ids(self, ids: List[int]) -> None:
+        """Drop chunks from the index and the chunk store."""
+        if not ids:
+            return
+        with self.lock:
+            if supports_remove(self.index):
+                self._writable_index().remove_ids(np.asarray(ids, dtype="int64"))
+            else:
+                self.removed.update(ids)
+                self._search_params = None
+            for chunk_id in ids:
+                self.texts.discard(chunk_id)
+            if len(self.removed) > COMPACT_FRACTION * self.index.ntotal:
+                logging.info(f"Rebuilding the index without {len(self.removed)} removed chunks...")
+                self._rebuild()
+            else:
+                self._resize_if_needed()
+
+    def _resize_if_needed(self) -> None:
+        """Lay the index out again once the corpus outgrew (or shrank from) it."""
+        with self.lock:
+            count = self.index.ntotal - len(self.removed)
+            if self._sized_for / RESIZE_FACTOR < count < self._sized_for * RESIZE_FACTOR:
+                return
+            if layout_fits(self.index, self.index_type, count):
+                self._sized_for = count
+                return
+            logging.info(f"Rebuilding the {index_type_of(self.index)} index for {count} chunks...")
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Rebuild the index for its live chunks, dropping removed ids.
+
+        The type and number of IVF lists are chosen again for the current
+        number of chunks.
+        """
+        with self.lock:
+            ids, vectors = stored_vectors(self.index)
+            if self.removed:
+                keep = ~np.isin(ids, np.fromiter(self.removed, dtype="int64"))
+                ids = ids[keep]
+                vectors = vectors[keep] if vectors is not None else None
+            if vectors is None:
+                # PQ codes are lossy; embed the texts again (from the cache)
+                vectors = normalize(self.embedder.embed([self.texts[int(i)] for i in ids]))
+            index = make_index(self.index_type, self.dimension, len(ids))
+            if len(ids):
+                train(index, vectors)
+                index.add_with_ids(vectors, ids)
+            self.index = index
+            self._mapped_from = None
+            self.removed = set()
+            self._search_params = None
+            self._sized_for = len(ids)
+            logging.info(f"Rebuilt as a {index_type_of(index)} index for {len(ids)} chunks.")
+
     def build_index(self, texts: List[str]) -> None:
         logging.info("Building FAISS vector index...")
-        embeddings = [self.embed_text(text) for text in texts]
-        self.index.add(np.array(embeddings).astype("float32"))
-        self.texts.extend(texts)
-        logging.info("Index built successfully.")
+        self.add_texts(texts)
+        stats = self.embedder.stats
+        logging.info(f"Index built successfully ({len(texts)} chunks, {stats['cached']} from cache, {stats['requests']} requests).")
 
     def retrieve(self, query: str, top_k: int = 5) -> str:
         try:
-            query_vec = np.array([self.embed_text(query)]).astype("float32")
-            scores, indices = self.index.search(query_vec, top_k)
-            return "\n---\n".join([self.texts[i] for i in indices[0] if i < len(self.texts)])
+            query_vec = normalize([self.embed_text(query)])
+            with self.lock:
+                if self._search_params is None and self.removed:
+                    self._search_params = search_parameters(self.index, np.fromiter(self.removed, dtype="int64"))
+                scores, indices = self.index.search(query_vec, top_k, params=self._search_params)
+                return "\n---\n".join([self.texts[i] for i in indices[0] if 0 <= i < len(self.texts)])
         except Exception as e:
             logging.error(f"Retrieval failed: {e}")
             return "[Error] Retrieval failed."
+
+    def save(self, path: str) -> None:
+        """Write the index, chunk texts and a manifest to directory ``path``.
+
+        The manifest records the model, dimension and, per source file,
+        its hash and chunk ids, so a later run can tell which files
+        changed since.
+        """
+        staging = f"{path.rstrip(os.sep)}.tmp-{os.getpid()}"
+        os.makedirs(staging, exist_ok=True)
+        with self.lock:
+            faiss.write_index(self.index, os.path.join(staging, INDEX_FILE))
+            self.texts.write(staging)
+            write_manifest(
+                staging,
+                model=self.embedder.model,
+                dimension=self.dimension,
+                index_type=index_type_of(self.index),
+                count=self.index.ntotal,
+                sources=self.sources,
+                removed_ids=sorted(self.removed),
+                sized_for=self._sized_for,
+            )
+            replace_directory(staging, path)
+            # Texts added since loading now live in the written files
+            self.texts = ChunkStore(path)
+        logging.info(f"Saved index with {self.index.ntotal} chunks to {path}.")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, embedder: BatchEmbedder = None) -> "RAGPipeline":
+        """Open an index written by save().
+
+        With ``mmap`` the index vectors and chunk texts are memory-mapped
+        read-only, so loading is instant and worker processes share one
+        physical copy; the index is read into memory if it is modified.
+        """
+        manifest = read_manifest(path)
+        if manifest is None:
+            raise FileNotFoundError(f"No saved index in {path}")
+        rag = cls(dimension=manifest["dimension"], embedder=embedder)
+        if rag.embedder.model != manifest["model"]:
+            raise ValueError(
+                f"Index in {path} was built with {manifest['model']}, not {rag.embedder.model}"
+            )
+        index_path = os.path.join(path, INDEX_FILE)
+        if mmap:
+            flags = faiss.IO_FLAG_MMAP
+            # IVF lists are mapped by IO_FLAG_MMAP alone; other indexes
+            # map their vectors with IO_FLAG_MMAP_IFC
+            if not manifest["index_type"].startswith("ivf"):
+                flags |= getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+            rag.index = faiss.read_index(index_path, flags)
+            rag._mapped_from = index_path
+        else:
+            rag.index = faiss.read_index(index_path)
+        rag.texts = ChunkStore(path)
+        rag.manifest = manifest
+        rag.sources = manifest["sources"]
+        rag.removed = set(manifest["removed_ids"])
+        rag._sized_for = manifest["sized_for"]
+        logging.info(f"Loaded index with {rag.index.ntotal} chunks from {path}.")
+        return rag
@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "texts.idx"
+FORMAT_VERSION = 4
+
+
+class ChunkStore:
+    """Chunk texts in one UTF-8 blob, addressed by a uint64 offset table.
+
+    Both files are memory-mapped, so opening a store of any size is
+    instant and processes reading the same files share one copy in the
+    page cache. Texts added after opening are held in memory until the
+    store is written again. Positions never change: a discarded text
+    reads as an empty string and is written as zero bytes.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._blob = None
+        self._offsets = np.zeros(1, dtype="uint64")
+        self._added: List[str] = []
+        self._discarded = set()
+        if directory is not None:
+            self._offsets = np.memmap(
+                os.path.join(directory, OFFSETS_FILE), dtype="uint64", mode="r"
+            )
+            if self._offsets[-1]:
+                self._blob = np.memmap(
+                    os.path.join(directory, TEXTS_FILE), dtype="uint8", mode="r"
+                )
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1 + len(self._added)
+
+    def __getitem__(self, i: int) -> str:
+        stored = len(self._offsets) - 1
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"chunk {i} out of range")
+        if i in self._discarded:
+            return ""
+        if i >= stored:
+            return self._added[i - stored]
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, text: str) -> None:
+        self._added.append(text)
+
+    def extend(self, texts: Iterable[str]) -> None:
+        self._added.extend(texts)
+
+    def discard(self, i: int) -> None:
+        self._discarded.add(i)
+
+    def write(self, directory: str) -> None:
+        """Write all texts, stored and added, into ``directory``."""
+        offsets = np.zeros(len(self) + 1, dtype="uint64")
+        with open(os.path.join(directory, TEXTS_FILE), "wb") as f:
+            for i, text in enumerate(self):
+                data = text.encode("utf-8")
+                f.write(data)
+                offsets[i + 1] = offsets[i] + len(data)
+        offsets.tofile(os.path.join(directory, OFFSETS_FILE))
+
+
+def read_manifest(directory: str) -> Optional[Dict]:
+    """The manifest of a saved index, or None if there is none."""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(directory: str, **fields) -> None:
+    manifest = {"format_version": FORMAT_VERSION, "created_at": time.time(), **fields}
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def replace_directory(staging: str, directory: str) -> None:
+    """Move a fully written staging directory into place.
+
+    Processes that have the old files mapped keep reading them until
+    they load again.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    old = os.path.join(parent, f".{os.path.basename(directory)}.old-{os.getpid()}")
+    if os.path.exists(directory):
+        os.replace(directory, old)
+    os.replace(staging, directory)
+    shutil.rmtree(old, ignore_errors=True)
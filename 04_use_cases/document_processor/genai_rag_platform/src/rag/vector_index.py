@@ -0,0 +1,209 @@
+import logging
+import math
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+# Corpus sizes up to which "auto" picks flat, HNSW and IVF-Flat; IVF-PQ above
+FLAT_MAX_VECTORS = 50_000
+HNSW_MAX_VECTORS = 500_000
+IVF_FLAT_MAX_VECTORS = 2_000_000
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 128
+# Training points per IVF list; faiss wants at least 39
+IVF_TRAIN_PER_LIST = 50
+IVF_TRAIN_MAX_PER_LIST = 64
+# IVF lists scanned per query: a share of them, but at least a few
+IVF_NPROBE_FRACTION = 1 / 128
+IVF_MIN_NPROBE = 8
+PQ_BITS = 8
+# Fewest vectors 4-bit PQ codebooks can be trained on
+PQ_MIN_VECTORS = 2 ** 4
+# How far the corpus may grow or shrink from the size its index was laid
+# out for before the layout is chosen again
+RESIZE_FACTOR = 2
+
+
+def choose_index_type(count: int) -> str:
+    """The index type "auto" resolves to for a corpus of ``count`` vectors.
+
+    Exact search is fast enough for small corpora. HNSW needs no
+    training, so it suits mid-sized corpora that grow by incremental
+    adds; at a million vectors IVF-Flat gives better recall for the same
+    latency and builds faster. Past that, IVF-PQ keeps the index in
+    memory at 1/16 of the size, at a cost in recall.
+    """
+    if count <= FLAT_MAX_VECTORS:
+        return "flat"
+    if count <= HNSW_MAX_VECTORS:
+        return "hnsw"
+    if count <= IVF_FLAT_MAX_VECTORS:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def resolve_index_type(index_type: str, count: int) -> str:
+    """The type an index configured as ``index_type`` gets for ``count`` vectors."""
+    if index_type == "auto":
+        return choose_index_type(count)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected 'auto' or one of {INDEX_TYPES}")
+    if index_type == "ivf_pq" and count < PQ_MIN_VECTORS:
+        # Too few vectors to train PQ codebooks on, and exact search of
+        # so few is instant
+        return "flat"
+    return index_type
+
+
+def layout_fits(index: faiss.Index, index_type: str, count: int) -> bool:
+    """Whether ``index`` is still the right layout for ``count`` vectors.
+
+    It has to be of the type ``index_type`` resolves to, and IVF indexes
+    need a number of lists within RESIZE_FACTOR of ivf_lists(count).
+    """
+    index_type = resolve_index_type(index_type, count)
+    if index_type_of(index) != index_type:
+        return False
+    if not index_type.startswith("ivf"):
+        return True
+    nlist, wanted = faiss.extract_index_ivf(index).nlist, ivf_lists(count)
+    return max(nlist, wanted) < RESIZE_FACTOR * min(nlist, wanted)
+
+
+def ivf_lists(count: int) -> int:
+    """Number of IVF lists for ``count`` vectors, ~4*sqrt(N)."""
+    return max(1, min(int(4 * math.sqrt(count)), count // IVF_TRAIN_PER_LIST))
+
+
+def pq_subquantizers(dimension: int) -> int:
+    """Sub-vectors per PQ code, ~4 dimensions each; must divide dimension.
+
+    One byte per 4 float32 dimensions stores vectors in 1/16 of the
+    space; coarser codes lose too much recall on embeddings.
+    """
+    m = max(1, dimension // 4)
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def make_index(index_type: str, dimension: int, count: int) -> faiss.Index:
+    """An empty inner-product index of ``index_type`` sized for ``count``.
+
+    Every index returned takes ``add_with_ids``: IVF indexes store ids
+    themselves, flat and HNSW are wrapped in an IndexIDMap. IVF indexes
+    need ``train()`` before vectors are added.
+    """
+    index_type = resolve_index_type(index_type, count)
+    if index_type == "flat":
+        return faiss.IndexIDMap(faiss.IndexFlatIP(dimension))
+    if index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        hnsw.hnsw.efSearch = HNSW_EF_SEARCH
+        return faiss.IndexIDMap(hnsw)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = ivf_lists(count)
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            # Each PQ codebook also needs ~39 training points per centroid
+            bits = PQ_BITS
+            while bits > 4 and count < 39 * 2 ** bits:
+                bits -= 1
+            index = faiss.IndexIVFPQ(
+                quantizer, dimension, nlist, pq_subquantizers(dimension), bits, faiss.METRIC_INNER_PRODUCT
+            )
+        index.nprobe = min(nlist, max(IVF_MIN_NPROBE, int(nlist * IVF_NPROBE_FRACTION)))
+        return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """The INDEX_TYPES name of an index built by make_index()."""
+    if isinstance(index, faiss.IndexIDMap):
+        index = index.index
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(base, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(base, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def train(index: faiss.Index, vectors: np.ndarray, seed: int = 0) -> None:
+    """Train an IVF index on a sample of ``vectors``."""
+    if index.is_trained:
+        return
+    ivf = faiss.extract_index_ivf(index)
+    sample_size = min(len(vectors), ivf.nlist * IVF_TRAIN_MAX_PER_LIST)
+    if sample_size < ivf.nlist:
+        raise ValueError(f"Need at least {ivf.nlist} vectors to train, got {len(vectors)}")
+    if sample_size < len(vectors):
+        rows = np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False)
+        vectors = vectors[np.sort(rows)]
+    logging.info(f"Training {index_type_of(index)} index with {ivf.nlist} lists on {len(vectors)} vectors...")
+    index.train(vectors)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Unit-length float32 rows, so inner product is cosine similarity."""
+    vectors = np.array(vectors, dtype="float32", order="C")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """HNSW graphs cannot drop vectors; removed ids are filtered instead."""
+    return index_type_of(index) != "hnsw"
+
+
+def search_parameters(index: faiss.Index, excluded: np.ndarray) -> Optional[faiss.SearchParameters]:
+    """Parameters that keep ``excluded`` ids out of search results."""
+    if not len(excluded):
+        return None
+    excluded_ids = faiss.IDSelectorBatch(np.asarray(excluded, dtype="int64"))
+    selector = faiss.IDSelectorNot(excluded_ids)
+    index_type = index_type_of(index)
+    if index_type == "hnsw":
+        ef_search = faiss.downcast_index(index.index).hnsw.efSearch
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(index).nprobe)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    # The parameters hold plain pointers; keep the selectors alive with them
+    params.referenced_objects = [excluded_ids, selector]
+    return params
+
+
+def stored_vectors(index: faiss.Index) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """The ids in an index and their vectors, in the same order.
+
+    Flat, HNSW and IVF-Flat indexes keep full vectors. IVF-PQ only keeps
+    lossy codes, so its vectors are None and must come from elsewhere.
+    """
+    if isinstance(index, faiss.IndexIDMap):
+        ids = faiss.vector_to_array(index.id_map)
+        return ids, index.index.reconstruct_n(0, index.ntotal)
+    ivf = faiss.extract_index_ivf(index)
+    invlists = ivf.invlists
+    ids, vectors = [np.empty(0, dtype="int64")], [np.empty((0, index.d), dtype="float32")]
+    for i in range(ivf.nlist):
+        size = invlists.list_size(i)
+        if not size:
+            continue
+        ids.append(faiss.rev_swig_ptr(invlists.get_ids(i), size).copy())
+        if index_type_of(index) == "ivf_flat":
+            # IVF-Flat codes are the raw float32 vectors
+            codes = faiss.rev_swig_ptr(invlists.get_codes(i), size * invlists.code_size)
+            vectors.append(codes.copy().view("float32").reshape(size, index.d))
+    if index_type_of(index) != "ivf_flat":
+        return np.concatenate(ids), None
+    return np.concatenate(ids), np.concatenate(vectors)
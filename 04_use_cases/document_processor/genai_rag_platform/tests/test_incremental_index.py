@@ -0,0 +1,204 @@
+"""Tests for incremental re-indexing and the saved index round trip.
+
+Embeddings come from a stub that hashes each text to a random vector,
+so every chunk is its own nearest neighbour. Run from the platform root:
+
+    python -m pytest tests
+"""
+import hashlib
+import os
+import sys
+
+import faiss
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rag.embeddings import BatchEmbedder
+from src.rag.indexer import IncrementalIndexer
+from src.rag.rag import RAGPipeline
+
+DIMENSION = 64
+
+
+class StubEmbedder(BatchEmbedder):
+    def _request(self, texts):
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vectors.append(np.random.default_rng(seed).standard_normal(DIMENSION))
+        return np.asarray(vectors, dtype="float32")
+
+
+def document(name: str, paragraphs: int, version: int = 0) -> str:
+    # Each paragraph is one chunk, and no two chunks are alike
+    return "\n\n".join(
+        f"{name} v{version} paragraph {i}: " + " ".join(f"{name}{i}w{j}" for j in range(25))
+        for i in range(paragraphs)
+    )
+
+
+def stored_ids(index: faiss.Index) -> set:
+    if hasattr(index, "id_map"):
+        return set(faiss.vector_to_array(index.id_map).tolist())
+    ivf = faiss.extract_index_ivf(index)
+    ids = set()
+    for i in range(ivf.nlist):
+        size = ivf.invlists.list_size(i)
+        if size:
+            ids.update(faiss.rev_swig_ptr(ivf.invlists.get_ids(i), size).tolist())
+    return ids
+
+
+def check_index(rag: RAGPipeline) -> None:
+    """Every live chunk is indexed once and retrieves itself; nothing else is."""
+    live = [chunk_id for record in rag.sources.values() for chunk_id in record["ids"]]
+    assert len(live) == len(set(live))
+    assert stored_ids(rag.index) - rag.removed == set(live)
+    assert rag.index.ntotal - len(rag.removed) == len(live)
+    for chunk_id in live:
+        text = rag.texts[chunk_id]
+        assert text
+        assert rag.retrieve(text, top_k=1) == text
+
+
+def live_texts(rag: RAGPipeline) -> set:
+    return {rag.texts[i] for record in rag.sources.values() for i in record["ids"]}
+
+
+@pytest.fixture
+def folder(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for name in ("a", "b", "c", "d", "e"):
+        (docs / f"{name}.md").write_text(document(name, 10))
+    return docs
+
+
+@pytest.fixture(params=["flat", "hnsw", "ivf_flat"])
+def rag(request):
+    return RAGPipeline(dimension=DIMENSION, embedder=StubEmbedder(), index_type=request.param)
+
+
+def test_initial_sync(folder, rag):
+    stats = IncrementalIndexer(rag, str(folder)).sync()
+
+    assert (stats.added, stats.chunks_added) == (5, 50)
+    assert sorted(rag.sources) == ["a.md", "b.md", "c.md", "d.md", "e.md"]
+    check_index(rag)
+
+
+def test_changed_file_replaces_its_chunks(folder, rag):
+    indexer = IncrementalIndexer(rag, str(folder))
+    indexer.sync()
+    old_ids = rag.sources["a.md"]["ids"]
+    old_texts = {rag.texts[i] for i in old_ids}
+
+    (folder / "a.md").write_text(document("a", 12, version=1))
+    stats = indexer.sync()
+
+    assert (stats.changed, stats.unchanged) == (1, 4)
+    assert (stats.chunks_added, stats.chunks_removed) == (12, 10)
+    assert not set(rag.sources["a.md"]["ids"]) & set(old_ids)
+    assert not old_texts & live_texts(rag)
+    for text in old_texts:
+        assert text not in rag.retrieve(text, top_k=5).split("\n---\n")
+    check_index(rag)
+
+
+def test_deleted_file_is_removed(folder, rag):
+    indexer = IncrementalIndexer(rag, str(folder))
+    indexer.sync()
+    old_texts = {rag.texts[i] for i in rag.sources["b.md"]["ids"]}
+
+    os.remove(folder / "b.md")
+    stats = indexer.sync()
+
+    assert (stats.removed, stats.chunks_removed) == (1, 10)
+    assert "b.md" not in rag.sources
+    for text in old_texts:
+        assert text not in rag.retrieve(text, top_k=5).split("\n---\n")
+    check_index(rag)
+
+
+def test_touched_file_is_not_re_embedded(folder, rag):
+    indexer = IncrementalIndexer(rag, str(folder))
+    indexer.sync()
+    requests = rag.embedder.stats["requests"]
+    ids = rag.sources["c.md"]["ids"]
+
+    os.utime(folder / "c.md", ns=(1, 1))
+    stats = indexer.sync()
+
+    assert (stats.unchanged, stats.changed) == (5, 0)
+    assert not stats.dirty
+    assert rag.embedder.stats["requests"] == requests
+    assert rag.sources["c.md"]["ids"] == ids
+    assert rag.sources["c.md"]["mtime_ns"] == 1
+    check_index(rag)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_reload_and_keep_syncing(folder, rag, tmp_path, mmap):
+    index_dir = str(tmp_path / "index")
+    IncrementalIndexer(rag, str(folder), index_dir).sync()
+    # A file change before the save leaves tombstones in an HNSW index
+    (folder / "a.md").write_text(document("a", 10, version=1))
+    IncrementalIndexer(rag, str(folder), index_dir).sync()
+
+    loaded = RAGPipeline.load(index_dir, mmap=mmap, embedder=StubEmbedder())
+    assert loaded.sources == rag.sources
+    assert loaded.removed == rag.removed
+    check_index(loaded)
+
+    indexer = IncrementalIndexer(loaded, str(folder), index_dir)
+    assert not indexer.sync().dirty
+    (folder / "d.md").write_text(document("d", 3, version=2))
+    os.remove(folder / "e.md")
+    (folder / "f.md").write_text(document("f", 4))
+    stats = indexer.sync()
+
+    assert (stats.added, stats.changed, stats.removed, stats.unchanged) == (1, 1, 1, 3)
+    check_index(loaded)
+    reloaded = RAGPipeline.load(index_dir, embedder=StubEmbedder())
+    assert sorted(reloaded.sources) == ["a.md", "b.md", "c.md", "d.md", "f.md"]
+    check_index(reloaded)
+
+
+class FailingEmbedder(StubEmbedder):
+    """Fails its ``fail_at``-th request, once, after earlier batches were added."""
+
+    def __init__(self, fail_at: int):
+        super().__init__(max_batch_inputs=8, max_in_flight=1, max_retries=0)
+        self.fail_at = fail_at
+
+    def _request(self, texts):
+        if self.stats["requests"] == self.fail_at:
+            self.fail_at = None
+            raise RuntimeError("Embedding service unavailable")
+        return super()._request(texts)
+
+
+def test_failed_sync_is_retried_without_duplicates(folder, rag):
+    indexer = IncrementalIndexer(rag, str(folder))
+    indexer.sync()
+    sources = {name: dict(record) for name, record in rag.sources.items()}
+    size = rag.index.ntotal - len(rag.removed)
+
+    (folder / "a.md").write_text(document("a", 12, version=1))
+    (folder / "f.md").write_text(document("f", 20))
+    rag.embedder = FailingEmbedder(fail_at=3)
+    with pytest.raises(RuntimeError):
+        indexer.sync()
+
+    # Two batches were embedded and indexed before the failure
+    assert rag.embedder.stats["requests"] == 3
+    assert rag.sources == sources
+    assert rag.index.ntotal - len(rag.removed) == size
+    check_index(rag)
+
+    stats = indexer.sync()
+    assert (stats.added, stats.changed, stats.chunks_added) == (1, 1, 32)
+    assert rag.index.ntotal - len(rag.removed) == size + 22
+    check_index(rag)
@@ -0,0 +1,141 @@
+"""Tests for choosing, and re-choosing, the index layout by corpus size.
+
+Run from the platform root:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import faiss
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rag import vector_index
+from src.rag.rag import RAGPipeline
+from src.rag.vector_index import index_type_of, make_index, normalize, train
+from test_incremental_index import DIMENSION, StubEmbedder, stored_ids
+
+
+def chunks(start: int, count: int) -> list:
+    return [f"chunk {i}: " + " ".join(f"w{i}x{j}" for j in range(10)) for i in range(start, start + count)]
+
+
+def ivf_lists_of(rag: RAGPipeline) -> int:
+    return faiss.extract_index_ivf(rag.index).nlist
+
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    """"auto" limits low enough to cross with a few hundred chunks."""
+    monkeypatch.setattr(vector_index, "FLAT_MAX_VECTORS", 20)
+    monkeypatch.setattr(vector_index, "HNSW_MAX_VECTORS", 60)
+    monkeypatch.setattr(vector_index, "IVF_FLAT_MAX_VECTORS", 300)
+
+
+@pytest.mark.parametrize("count", [0, 1, 15])
+def test_ivf_pq_falls_back_to_flat_for_a_handful_of_vectors(count):
+    assert index_type_of(make_index("ivf_pq", DIMENSION, count)) == "flat"
+
+
+def test_ivf_pq_trains_on_the_fewest_vectors_it_accepts():
+    count = vector_index.PQ_MIN_VECTORS
+    index = make_index("ivf_pq", DIMENSION, count)
+    vectors = normalize(np.random.default_rng(0).standard_normal((count, DIMENSION)))
+
+    assert index_type_of(index) == "ivf_pq"
+    train(index, vectors)
+    index.add_with_ids(vectors, np.arange(count, dtype="int64"))
+    assert index.ntotal == count
+
+
+def test_unknown_index_type():
+    with pytest.raises(ValueError, match="Unknown index type"):
+        make_index("annoy", DIMENSION, 10)
+
+
+def test_ivf_pq_pipeline_with_one_chunk():
+    # The shipped sample_docs is a single chunk
+    rag = RAGPipeline(dimension=DIMENSION, embedder=StubEmbedder(), index_type="ivf_pq")
+    text = chunks(0, 1)[0]
+    rag.add_texts([text])
+
+    assert index_type_of(rag.index) == "flat"
+    assert rag.retrieve(text, top_k=1) == text
+
+
+def test_auto_index_follows_the_corpus_as_it_grows(small_limits):
+    rag = RAGPipeline(dimension=DIMENSION, embedder=StubEmbedder(), index_type="auto")
+    types = []
+    for start in range(0, 400, 10):
+        rag.add_texts(chunks(start, 10))
+        types.append(index_type_of(rag.index))
+    check_index_ids(rag, 400)
+
+    # Each type in turn, picked up by the time the corpus doubled past its limit
+    assert sorted(set(types), key=types.index) == ["flat", "hnsw", "ivf_flat", "ivf_pq"]
+    assert types[:2] == ["flat"] * 2
+    assert types[4] == "hnsw"
+    assert types[12] == "ivf_flat"
+    assert types[-1] == "ivf_pq"
+
+
+def test_ivf_lists_grow_with_the_corpus():
+    rag = RAGPipeline(dimension=DIMENSION, embedder=StubEmbedder(), index_type="ivf_flat")
+    rag.add_texts(chunks(0, 100))
+    assert ivf_lists_of(rag) == 2
+
+    for start in range(100, 1000, 100):
+        rag.add_texts(chunks(start, 100))
+    assert vector_index.ivf_lists(1000) / vector_index.RESIZE_FACTOR < ivf_lists_of(rag)
+    check_index_ids(rag, 1000)
+
+
+def test_ivf_pq_is_rebuilt_from_its_texts():
+    rag = RAGPipeline(dimension=DIMENSION, embedder=StubEmbedder(), index_type="ivf_pq")
+    rag.add_texts(chunks(0, 10))
+    assert index_type_of(rag.index) == "flat"
+    rag.add_texts(chunks(10, 10))
+    assert index_type_of(rag.index) == "ivf_pq"
+
+    for start in range(20, 400, 20):
+        rag.add_texts(chunks(start, 20))
+    assert vector_index.ivf_lists(400) / vector_index.RESIZE_FACTOR < ivf_lists_of(rag)
+    check_index_ids(rag, 400)
+
+
+def test_index_shrinks_with_the_corpus(small_limits):
+    rag = RAGPipeline(dimension=DIMENSION, embedder=StubEmbedder(), index_type="auto")
+    ids = rag.add_texts(chunks(0, 100))
+    assert index_type_of(rag.index) == "ivf_flat"
+
+    rag.remove_ids(ids[10:])
+    assert index_type_of(rag.index) == "flat"
+    assert not rag.removed
+    check_index_ids(rag, 10, ids[:10])
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_saved_index_is_resized_after_loading(small_limits, tmp_path, mmap):
+    rag = RAGPipeline(dimension=DIMENSION, embedder=StubEmbedder(), index_type="auto")
+    rag.add_texts(chunks(0, 15))
+    rag.save(str(tmp_path))
+
+    loaded = RAGPipeline.load(str(tmp_path), mmap=mmap, embedder=StubEmbedder())
+    loaded.add_texts(chunks(15, 10))
+    assert index_type_of(loaded.index) == "flat"
+    loaded.add_texts(chunks(25, 10))
+    assert index_type_of(loaded.index) == "hnsw"
+    check_index_ids(loaded, 35)
+
+
+def check_index_ids(rag: RAGPipeline, count: int, ids=None) -> None:
+    """The index holds exactly the live chunk ids, each retrieving itself
+    unless it is compressed by IVF-PQ."""
+    assert stored_ids(rag.index) - rag.removed == set(range(count) if ids is None else ids)
+    if index_type_of(rag.index) == "ivf_pq":
+        return
+    for chunk_id in stored_ids(rag.index) - rag.removed:
+        assert rag.retrieve(rag.texts[chunk_id], top_k=1) == rag.texts[chunk_id]